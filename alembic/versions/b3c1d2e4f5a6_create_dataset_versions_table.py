@@ -0,0 +1,37 @@
+"""create_dataset_versions_table
+
+Revision ID: b3c1d2e4f5a6
+Revises: 86aa7d48de09
+Create Date: 2026-10-17 10:12:41.503218
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3c1d2e4f5a6'
+down_revision: Union[str, None] = '86aa7d48de09'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'dataset_versions',
+        sa.Column('id',         sa.Integer(),    nullable=False),
+        sa.Column('table_name', sa.String(64),   nullable=False),
+        sa.Column('millesime',  sa.String(16),   nullable=False, server_default=''),
+        sa.Column('row_count',  sa.Integer(),    nullable=True),
+        sa.Column('checksum',   sa.String(64),   nullable=True),
+        sa.Column('version',    sa.Integer(),    nullable=False, server_default='1'),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('table_name', 'millesime', name='uq_dataset_versions_table_millesime'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('dataset_versions')
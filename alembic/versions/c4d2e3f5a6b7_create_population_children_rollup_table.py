@@ -0,0 +1,34 @@
+"""create_population_children_rollup_table
+
+Revision ID: c4d2e3f5a6b7
+Revises: b3c1d2e4f5a6
+Create Date: 2026-10-17 14:03:27.118402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4d2e3f5a6b7'
+down_revision: Union[str, None] = 'b3c1d2e4f5a6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'population_children_rollup',
+        sa.Column('level',         sa.String(16), nullable=False),
+        sa.Column('code',          sa.String(16), nullable=False),
+        sa.Column('total',         sa.Float(),    nullable=False),
+        sa.Column('under_3',       sa.Float(),    nullable=False),
+        sa.Column('three_to_five', sa.Float(),    nullable=False),
+        sa.PrimaryKeyConstraint('level', 'code'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('population_children_rollup')
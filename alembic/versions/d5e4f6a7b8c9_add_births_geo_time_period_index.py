@@ -0,0 +1,30 @@
+"""add_births_geo_time_period_index
+
+Revision ID: d5e4f6a7b8c9
+Revises: c4d2e3f5a6b7
+Create Date: 2026-10-17 16:41:09.527318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5e4f6a7b8c9'
+down_revision: Union[str, None] = 'c4d2e3f5a6b7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_births_geo_object_geo_time_period', 'births',
+        ['geo_object', 'geo', 'time_period'],
+        postgresql_include=['obs_value'],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_births_geo_object_geo_time_period', table_name='births')
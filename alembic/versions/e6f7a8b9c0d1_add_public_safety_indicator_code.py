@@ -0,0 +1,55 @@
+"""add_public_safety_indicator_code
+
+Revision ID: e6f7a8b9c0d1
+Revises: d5e4f6a7b8c9
+Create Date: 2026-10-17 18:12:44.208163
+
+"""
+import re
+import unicodedata
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6f7a8b9c0d1'
+down_revision: Union[str, None] = 'd5e4f6a7b8c9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Copie figée de public_safety_service.indicator_code telle qu'à cette révision :
+# la migration ne doit ni importer l'application ni suivre ses évolutions
+def _indicator_code(label) -> str:
+    ascii_label = unicodedata.normalize("NFKD", str(label)).encode("ascii", "ignore").decode()
+    code = re.sub(r"[^a-z0-9]+", "_", ascii_label.lower()).strip("_")
+    if "famili" in code:
+        return "violences_intrafamiliales"
+    if re.search(r"violen.*(intraf|conjug)", code):
+        return "violences_conjugales"
+    return code[:80]
+
+
+def upgrade() -> None:
+    op.add_column('public_safety', sa.Column('indicator_code', sa.String(80), nullable=True))
+
+    # Renseigner le code des données déjà importées (une mise à jour par libellé distinct)
+    conn = op.get_bind()
+    labels = conn.execute(sa.text("SELECT DISTINCT indicator_class FROM public_safety")).scalars().all()
+    for label in labels:
+        conn.execute(
+            sa.text("UPDATE public_safety SET indicator_code = :code WHERE indicator_class = :label"),
+            {"code": _indicator_code(label), "label": label}
+        )
+
+    op.create_index(
+        'ix_public_safety_indicator_code_type_code', 'public_safety',
+        ['indicator_code', 'territory_type', 'territory_code']
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_public_safety_indicator_code_type_code', table_name='public_safety')
+    op.drop_column('public_safety', 'indicator_code')
@@ -1,7 +1,9 @@
 from fastapi import APIRouter
-from app.routers import epci
+from app.routers import epci, batch, profile
 # Ajoutez d'autres routeurs au fur et à mesure
 
 api_router = APIRouter()
 api_router.include_router(epci.router)
+api_router.include_router(batch.router)
+api_router.include_router(profile.router)
 # include_router pour d'autres routeurs
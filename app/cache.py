@@ -0,0 +1,284 @@
+"""
+app/cache.py
+------------
+Outils de mise en cache partagés par les services.
+
+`shared_cache` est un cache LRU unique pour le processus : durée de vie (TTL),
+budget mémoire en octets, compteurs hit/miss/éviction et invalidation par
+jeu de données et millésime. Le décorateur `cached()` l'applique aux méthodes
+des services, synchrones comme asynchrones.
+
+`single_flight` regroupe les calculs identiques simultanés : sur un défaut de
+cache, une seule requête SQL part et son résultat est partagé par tous les
+appelants arrivés entre-temps.
+"""
+import asyncio
+import functools
+import inspect
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+CACHE_MAX_BYTES = int(os.environ.get("CACHE_MAX_BYTES", 128 * 1024 * 1024))
+CACHE_TTL = float(os.environ.get("CACHE_TTL", 6 * 3600))
+
+
+def _sizeof(obj) -> int:
+    """Estimation de l'empreinte mémoire d'un résultat (dict/list imbriqués)."""
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_sizeof(k) + _sizeof(v) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(_sizeof(item) for item in obj)
+    return size
+
+
+class _Entry:
+    __slots__ = ("value", "size", "expires_at", "dataset", "year")
+
+    def __init__(self, value, size, expires_at, dataset, year):
+        self.value = value
+        self.size = size
+        self.expires_at = expires_at
+        self.dataset = dataset
+        self.year = year
+
+
+class TTLCache:
+    """
+    Cache LRU borné en octets, avec expiration et invalidation ciblée.
+
+    Chaque entrée est étiquetée par son jeu de données (table) et son millésime ;
+    une entrée sans millésime (« dernier millésime disponible ») est invalidée
+    par toute nouvelle version du jeu de données.
+    """
+
+    def __init__(self, max_bytes: int, ttl: float):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.rejected = 0
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self.current_bytes -= entry.size
+        return entry
+
+    def get(self, key):
+        """Retourne (trouvé, valeur)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            if entry.expires_at <= time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry.value
+
+    def set(self, key, value, dataset: str = None, year=None, ttl: float = None):
+        size = _sizeof(value)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if size > self.max_bytes:
+                self.rejected += 1
+                return
+            expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+            self._entries[key] = _Entry(value, size, expires_at, dataset, year)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, dataset: str, year=None) -> int:
+        """
+        Supprime les entrées d'un jeu de données : toutes si `year` est None,
+        sinon celles du millésime `year` et celles sans millésime explicite.
+        """
+        with self._lock:
+            keys = [
+                key for key, entry in self._entries.items()
+                if entry.dataset == dataset
+                and (year is None or entry.year is None or entry.year == year)
+            ]
+            for key in keys:
+                self._remove(key)
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            by_dataset = defaultdict(lambda: {"entries": 0, "bytes": 0})
+            for entry in self._entries.values():
+                by_dataset[entry.dataset]["entries"] += 1
+                by_dataset[entry.dataset]["bytes"] += entry.size
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "rejected": self.rejected,
+                "datasets": dict(by_dataset),
+            }
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalescence des appels identiques en cours (« single flight »).
+
+    `do()` sert les threads (endpoints synchrones du threadpool) ; `do_async()`
+    sert la boucle asyncio. Le premier appelant d'une clé exécute le calcul,
+    les suivants attendent son résultat (ou son exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._tasks = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    async def do_async(self, key, fn, *args, **kwargs):
+        task = self._tasks.get(key)
+        with self._lock:
+            if task is None:
+                self.leaders += 1
+            else:
+                self.coalesced += 1
+        if task is None:
+            task = asyncio.ensure_future(fn(*args, **kwargs))
+            self._tasks[key] = task
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        # shield : l'annulation d'un appelant (client déconnecté) n'annule pas le calcul partagé
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "leaders": self.leaders,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._calls) + len(self._tasks),
+            }
+
+shared_cache = TTLCache(CACHE_MAX_BYTES, CACHE_TTL)
+single_flight = SingleFlight()
+
+
+def invalidate_dataset(table_name: str, millesime: str):
+    """Abonné de dataset_watcher : "" = table entière, sinon un millésime."""
+    shared_cache.invalidate(table_name, int(millesime) if millesime else None)
+
+
+def cached(dataset: str, ttl: float = None):
+    """
+    Met en cache le résultat d'une méthode de service (sync ou async) dans
+    `shared_cache`, étiqueté par `dataset` et par l'argument `year` s'il existe.
+
+    La clé ne dépend pas de `self` : les services mis en cache sont sans état.
+    Les défauts de cache simultanés sur une même clé passent par `single_flight`.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+        skip = 1 if next(iter(signature.parameters), None) == "self" else 0
+        name = f"{func.__module__}.{func.__qualname__}"
+
+        def make_key(args, kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            values = tuple(bound.arguments.values())[skip:]
+            return (name, values), bound.arguments.get("year")
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                key, year = make_key(args, kwargs)
+                found, value = shared_cache.get(key)
+                if found:
+                    return value
+
+                async def compute():
+                    value = await func(*args, **kwargs)
+                    shared_cache.set(key, value, dataset=dataset, year=year, ttl=ttl)
+                    return value
+
+                return await single_flight.do_async(key, compute)
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                key, year = make_key(args, kwargs)
+                found, value = shared_cache.get(key)
+                if found:
+                    return value
+
+                def compute():
+                    value = func(*args, **kwargs)
+                    shared_cache.set(key, value, dataset=dataset, year=year, ttl=ttl)
+                    return value
+
+                return single_flight.do(key, compute)
+
+        return wrapper
+
+    return decorator
@@ -1,9 +1,17 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, exc, text
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+import itertools
 import os
+import threading
+import time
 from dotenv import load_dotenv
 
+from app.request_status import mark_failed
+
 # Charger les variables d'environnement depuis .env
 load_dotenv()
 
@@ -13,13 +21,322 @@ DATABASE_URL = os.environ.get("DATABASE_URL")
 if not DATABASE_URL:
     raise ValueError("La variable d'environnement DATABASE_URL n'est pas définie")
 
-# Correction pour Heroku PostgreSQL (qui utilise postgres:// au lieu de postgresql://)
-if DATABASE_URL and DATABASE_URL.startswith("postgres://"):
-    DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
 
-engine = create_engine(DATABASE_URL)
+def _fix_heroku_url(url: str) -> str:
+    """Correction pour Heroku PostgreSQL (qui utilise postgres:// au lieu de postgresql://)"""
+    if url and url.startswith("postgres://"):
+        return url.replace("postgres://", "postgresql://", 1)
+    return url
+
+
+DATABASE_URL = _fix_heroku_url(DATABASE_URL)
+
+# Réplicas en lecture seule (optionnel) : URLs séparées par des virgules
+DATABASE_REPLICA_URLS = [
+    _fix_heroku_url(url.strip())
+    for url in os.environ.get("DATABASE_REPLICA_URLS", "").split(",")
+    if url.strip()
+]
+REPLICA_HEALTH_CHECK_INTERVAL = float(os.environ.get("DB_REPLICA_HEALTH_CHECK_INTERVAL", 15))
+
+
+def _to_async_url(url: str):
+    """
+    Convertit une URL PostgreSQL synchrone en URL asyncpg.
+
+    asyncpg ne comprend pas le paramètre `sslmode` (utilisé par Heroku) :
+    il est retiré de l'URL et traduit en argument `ssl` de connexion.
+    """
+    parts = urlsplit(url)
+    scheme = "postgresql+asyncpg"
+    query = dict(parse_qsl(parts.query))
+    connect_args = {}
+    sslmode = query.pop("sslmode", None)
+    if sslmode and sslmode != "disable":
+        connect_args["ssl"] = sslmode
+    return urlunsplit((scheme, parts.netloc, parts.path, urlencode(query), parts.fragment)), connect_args
+
+
+# Configuration du pool de connexions (surchargeable par variables d'environnement).
+#
+# DB_POOL_SIZE / DB_MAX_OVERFLOW forment le budget de connexions d'un processus
+# vers une base (le primaire, puis chaque réplica) : au plus
+# DB_POOL_SIZE + DB_MAX_OVERFLOW connexions, 15 par défaut comme le pool par
+# défaut de SQLAlchemy. Ce budget est partagé entre les deux moteurs :
+# DB_ASYNC_POOL_SIZE / DB_ASYNC_MAX_OVERFLOW pour le moteur asynchrone (endpoints
+# `async def`), le reste pour le moteur synchrone. Sur Heroku Postgres (souvent
+# 20 connexions), nombre de dynos × processus × budget doit rester sous la limite.
+#
+# Chaque requête synchrone tient une connexion le temps de la requête ;
+# pool_recycle et pre_ping évitent les connexions coupées par Heroku Postgres
+# après une période d'inactivité.
+POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 5))
+MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 10))
+ASYNC_POOL_SIZE = int(os.environ.get("DB_ASYNC_POOL_SIZE", 2))
+ASYNC_MAX_OVERFLOW = int(os.environ.get("DB_ASYNC_MAX_OVERFLOW", 3))
+
+if not (0 < ASYNC_POOL_SIZE < POOL_SIZE and 0 <= ASYNC_MAX_OVERFLOW <= MAX_OVERFLOW):
+    raise ValueError(
+        "DB_ASYNC_POOL_SIZE / DB_ASYNC_MAX_OVERFLOW doivent être une part de DB_POOL_SIZE / DB_MAX_OVERFLOW"
+    )
+POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 30))
+POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", 1800))
+POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "True").lower() == "true"
+
+
+class PoolStats:
+    """Compteurs cumulés d'attente au checkout d'un pool de connexions."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+
+    def record(self, elapsed: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_time += elapsed
+            self.max_wait_time = max(self.max_wait_time, elapsed)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            attempts = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_time_total_ms": round(self.wait_time * 1000, 3),
+                "wait_time_max_ms": round(self.max_wait_time * 1000, 3),
+                "wait_time_avg_ms": round(self.wait_time * 1000 / attempts, 3) if attempts else 0.0,
+            }
+
+
+class _TimedPoolMixin:
+    """Mesure le temps passé à attendre une connexion disponible dans le pool."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def recreate(self):
+        # pool.recreate() (dispose, fork...) conserve les compteurs cumulés
+        new_pool = super().recreate()
+        new_pool.stats = self.stats
+        return new_pool
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.stats.record(time.perf_counter() - start)
+        return conn
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def _pool_options(asynchronous: bool = False) -> dict:
+    """Options du pool d'un moteur : sa part du budget de connexions de la base."""
+    if asynchronous:
+        pool_size, max_overflow = ASYNC_POOL_SIZE, ASYNC_MAX_OVERFLOW
+    else:
+        pool_size, max_overflow = POOL_SIZE - ASYNC_POOL_SIZE, MAX_OVERFLOW - ASYNC_MAX_OVERFLOW
+    return {
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": POOL_TIMEOUT,
+        "pool_recycle": POOL_RECYCLE,
+        "pool_pre_ping": POOL_PRE_PING,
+    }
+
+
+def pool_status(bind) -> dict:
+    """État instantané et compteurs cumulés du pool d'un moteur (sync ou async)."""
+    pool = bind.pool
+    checked_out = pool.checkedout()
+    return {
+        "pool_size": pool.size(),
+        "max_overflow": pool._max_overflow,
+        "checked_out": checked_out,
+        "idle": pool.checkedin(),
+        # overflow() est négatif tant que le pool n'a pas atteint pool_size
+        "overflow": max(pool.overflow(), 0),
+        **(pool.stats.snapshot() if hasattr(pool, "stats") else {}),
+    }
+
+
+engine = create_engine(DATABASE_URL, poolclass=TimedQueuePool, **_pool_options())
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
 
+# Moteur asynchrone (SQLAlchemy asyncio + asyncpg) pour les endpoints `async def`
+ASYNC_DATABASE_URL, _async_connect_args = _to_async_url(
+    os.environ.get("ASYNC_DATABASE_URL", DATABASE_URL)
+)
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    connect_args=_async_connect_args,
+    poolclass=TimedAsyncQueuePool,
+    **_pool_options(asynchronous=True)
+)
+AsyncSessionLocal = sessionmaker(
+    bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
+
+
+# ---------------------------------------------------------------------------
+# Réplicas en lecture : les services (lecture seule) passent par ReadSessionLocal /
+# AsyncReadSessionLocal ; l'authentification et les écritures restent sur le
+# primaire via SessionLocal / get_db.
+# ---------------------------------------------------------------------------
+
+class Replica:
+    """Un réplica en lecture : moteurs sync/async et état de santé."""
+
+    def __init__(self, url: str):
+        self.engine = create_engine(url, poolclass=TimedQueuePool, **_pool_options())
+        async_url, connect_args = _to_async_url(url)
+        self.async_engine = create_async_engine(
+            async_url,
+            connect_args=connect_args,
+            poolclass=TimedAsyncQueuePool,
+            **_pool_options(asynchronous=True)
+        )
+        self.name = f"{self.engine.url.host}:{self.engine.url.port or 5432}/{self.engine.url.database}"
+        self.healthy = True
+        self.last_error = None
+        # Une déconnexion en cours de requête sort le réplica de la rotation
+        # sans attendre le prochain health check
+        event.listen(self.engine, "handle_error", self._on_error)
+        event.listen(self.async_engine.sync_engine, "handle_error", self._on_error)
+
+    def _on_error(self, context):
+        if context.is_disconnect:
+            self._mark_down(context.original_exception)
+
+    def _mark_down(self, error):
+        if self.healthy:
+            print(f"⚠️ Réplica {self.name} indisponible, lectures redirigées : {error}")
+        self.healthy = False
+        self.last_error = str(error)
+
+    def check(self):
+        """Health check : SELECT 1 sur une connexion du pool."""
+        try:
+            with self.engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+        except Exception as e:
+            self._mark_down(e)
+            return
+        if not self.healthy:
+            print(f"✅ Réplica {self.name} de nouveau disponible")
+        self.healthy = True
+        self.last_error = None
+
+
+class ReplicaRouter:
+    """
+    Répartit les lectures en round-robin sur les réplicas sains.
+
+    Les health checks tournent dans un thread démon démarré à la première
+    lecture (les scripts d'import qui importent ce module n'en lancent pas).
+    Sans réplica configuré ou sain, les lectures retombent sur le primaire.
+    """
+
+    def __init__(self, urls, interval: float):
+        self.replicas = [Replica(url) for url in urls]
+        self.interval = interval
+        self._counter = itertools.count()
+        self._monitor = None
+        self._lock = threading.Lock()
+
+    def _ensure_monitor(self):
+        if self._monitor is not None or not self.replicas:
+            return
+        with self._lock:
+            if self._monitor is None:
+                self._monitor = threading.Thread(
+                    target=self._run_health_checks, name="replica-health-check", daemon=True
+                )
+                self._monitor.start()
+
+    def _run_health_checks(self):
+        while True:
+            time.sleep(self.interval)
+            for replica in self.replicas:
+                replica.check()
+
+    def pick(self):
+        self._ensure_monitor()
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        return healthy[next(self._counter) % len(healthy)]
+
+    def read_engine(self):
+        replica = self.pick()
+        return replica.engine if replica else engine
+
+    def async_read_engine(self):
+        replica = self.pick()
+        return replica.async_engine if replica else async_engine
+
+    def status(self) -> list:
+        return [
+            {
+                "replica": replica.name,
+                "healthy": replica.healthy,
+                "last_error": replica.last_error,
+                "sync": pool_status(replica.engine),
+                "async": pool_status(replica.async_engine),
+            }
+            for replica in self.replicas
+        ]
+
+
+class _ReadSessionFactory:
+    """Fabrique de sessions liée, à chaque appel, au moteur de lecture choisi par le routeur."""
+
+    def __init__(self, factory, pick_engine):
+        self._factory = factory
+        self._pick_engine = pick_engine
+
+    def __call__(self, **kwargs):
+        return self._factory(bind=self._pick_engine(), **kwargs)
+
+
+replica_router = ReplicaRouter(DATABASE_REPLICA_URLS, REPLICA_HEALTH_CHECK_INTERVAL)
+
+
+def _on_query_error(context):
+    # Les services répondent souvent à une erreur SQL par un repli en 200 :
+    # la requête en cours est signalée (ni cache des réponses, ni ETag).
+    # L'échec d'un pre-ping est rattrapé par le pool et ne compte pas
+    # (is_pre_ping n'existe qu'à partir de SQLAlchemy 2.0.5).
+    if not getattr(context, "is_pre_ping", False):
+        mark_failed()
+
+
+for _engine in [engine, async_engine.sync_engine] + [
+    bind for replica in replica_router.replicas for bind in (replica.engine, replica.async_engine.sync_engine)
+]:
+    event.listen(_engine, "handle_error", _on_query_error)
+
+ReadSessionLocal = _ReadSessionFactory(SessionLocal, replica_router.read_engine)
+AsyncReadSessionLocal = _ReadSessionFactory(AsyncSessionLocal, replica_router.async_read_engine)
+
 Base = declarative_base()
 
 def get_db():
@@ -28,3 +345,19 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def get_read_db():
+    """Session de lecture (réplica si configuré) pour les endpoints statistiques."""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_read_db():
+    async with AsyncReadSessionLocal() as db:
+        yield db
@@ -0,0 +1,164 @@
+"""
+app/datasets.py
+---------------
+Registre des versions de jeux de données (table dataset_versions).
+
+- Côté scripts d'import : `record_dataset_version()` est appelé en fin de
+  transaction d'import, avant le commit, pour enregistrer la table, le
+  millésime, le nombre de lignes et la somme de contrôle du fichier source.
+- Côté API : `dataset_watcher` interroge périodiquement le registre et
+  notifie les abonnés (caches, index territorial) des seuls jeux de données
+  qui ont changé.
+"""
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+
+from sqlalchemy import text
+
+from app.database import replica_router
+
+WATCH_INTERVAL = float(os.environ.get("DATASET_WATCH_INTERVAL", 30))
+
+_UPSERT_SQL = """
+    INSERT INTO dataset_versions (table_name, millesime, row_count, checksum, version, updated_at)
+    VALUES (:table_name, :millesime, :row_count, :checksum, 1, now())
+    ON CONFLICT (table_name, millesime) DO UPDATE SET
+        row_count = EXCLUDED.row_count,
+        checksum = EXCLUDED.checksum,
+        version = dataset_versions.version + 1,
+        updated_at = now()
+"""
+
+_SNAPSHOT_SQL = text("""
+    SELECT table_name, millesime, version, updated_at
+    FROM dataset_versions
+""")
+
+_IDENTIFIER = re.compile(r"^[a-z_][a-z0-9_]*$")
+
+
+# ---------------------------------------------------------------------------
+# Écriture (scripts d'import)
+# ---------------------------------------------------------------------------
+
+def file_checksum(*paths) -> str:
+    """SHA-256 d'un ou plusieurs fichiers source (lus par blocs)."""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def _execute(db, sql: str, params: dict):
+    """Exécute une requête sur un curseur psycopg2 ou une session/connexion SQLAlchemy."""
+    if hasattr(db, "mogrify"):
+        db.execute(re.sub(r":(\w+)", r"%(\1)s", sql), params)
+        return db.fetchone() if db.description else None
+    result = db.execute(text(sql), params)
+    return result.fetchone() if result.returns_rows else None
+
+
+def record_dataset_version(db, table_name: str, millesime=None, row_count: int = None, checksum: str = None):
+    """
+    Enregistre (ou incrémente) la version d'un jeu de données.
+
+    À appeler dans la transaction d'import, juste avant le commit : la nouvelle
+    version devient visible en même temps que les données.
+    `millesime` à None désigne la table entière ; `row_count` à None est calculé
+    (sur la colonne `year` pour un millésime).
+    """
+    if not _IDENTIFIER.match(table_name):
+        raise ValueError(f"Nom de table invalide : {table_name}")
+    if row_count is None:
+        if millesime is None:
+            row_count = _execute(db, f"SELECT COUNT(*) FROM {table_name}", {})[0]
+        else:
+            row_count = _execute(db, f"SELECT COUNT(*) FROM {table_name} WHERE year = :year", {"year": int(millesime)})[0]
+    _execute(db, _UPSERT_SQL, {
+        "table_name": table_name,
+        "millesime": "" if millesime is None else str(millesime),
+        "row_count": int(row_count),
+        "checksum": checksum,
+    })
+
+
+# ---------------------------------------------------------------------------
+# Lecture (API)
+# ---------------------------------------------------------------------------
+
+class DatasetWatcher:
+    """
+    Surveille dataset_versions par sondage et notifie les abonnés des
+    (table, millésime) modifiés. Le sondage lit le moteur de lecture (réplica
+    si configuré) : la nouvelle version n'y apparaît qu'avec les données.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._versions = {}
+        self._initialized = False
+        self._subscribers = defaultdict(list)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def subscribe(self, table_name: str, callback):
+        """`callback(table_name, millesime)` est appelé à chaque nouvelle version ("" = table entière)."""
+        self._subscribers[table_name].append(callback)
+
+    def version(self, table_name: str) -> str:
+        """Jeton de version courant d'une table (tous millésimes confondus)."""
+        versions = sorted(
+            f"{millesime}:{version}"
+            for (table, millesime), (version, _) in self._versions.items()
+            if table == table_name
+        )
+        return ",".join(versions) or "0"
+
+    def poll(self) -> list:
+        """Relit le registre et retourne les (table, millésime) modifiés depuis le dernier sondage."""
+        with replica_router.read_engine().connect() as conn:
+            rows = conn.execute(_SNAPSHOT_SQL).all()
+
+        with self._lock:
+            previous, first_poll = self._versions, not self._initialized
+            self._initialized = True
+            self._versions = {
+                (table_name, millesime): (version, updated_at)
+                for table_name, millesime, version, updated_at in rows
+            }
+        if first_poll:
+            return []
+
+        changed = [key for key, value in self._versions.items() if previous.get(key) != value]
+        for table_name, millesime in changed:
+            print(f"🔄 Nouvelle version du jeu de données {table_name} {millesime or ''}".rstrip())
+            for callback in self._subscribers.get(table_name, []):
+                try:
+                    callback(table_name, millesime)
+                except Exception as e:
+                    print(f"⚠️ Erreur lors de l'invalidation pour {table_name}: {e}")
+        return changed
+
+    def _run(self):
+        while True:
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"⚠️ Lecture de dataset_versions impossible : {e}")
+            time.sleep(self.interval)
+
+    def start(self):
+        """Démarre le sondage dans un thread démon (idempotent)."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="dataset-watcher", daemon=True)
+                self._thread.start()
+
+
+dataset_watcher = DatasetWatcher(WATCH_INTERVAL)
@@ -0,0 +1,81 @@
+"""
+app/dependencies.py
+-------------------
+Fournisseurs de services par requête pour FastAPI.
+
+Chaque requête reçoit sa propre instance de service, construite sur la session
+de lecture ouverte par `get_read_db` (réplica si DATABASE_REPLICA_URLS est
+défini) : la session est refermée (et la connexion rendue au pool) à la fin de
+la requête, même en cas d'exception. Les endpoints synchrones
+s'exécutant dans le threadpool, aucune session n'est partagée entre threads.
+"""
+from fastapi import Depends
+from sqlalchemy.orm import Session
+
+from app.database import get_read_db
+from app.services.population_service import PopulationService
+from app.services.historical_service import HistoricalService
+from app.services.birth_service import BirthService
+from app.services.geocode_service import GeoCodeService
+from app.services.revenue_service import RevenueService
+from app.services.family_service import FamilyService
+from app.services.childcare_service import ChildcareService
+from app.services.public_safety_service import PublicSafetyService
+from app.services.employment_service import EmploymentService
+from app.services.schooling_service import SchoolingService
+from app.services.family_employment_service import FamilyEmploymentService
+from app.services.batch_service import BatchService
+
+
+def get_population_service(db: Session = Depends(get_read_db)) -> PopulationService:
+    return PopulationService(db)
+
+
+def get_async_population_service() -> PopulationService:
+    # Endpoints async : l'AsyncSession (get_async_read_db) est passée aux méthodes
+    # *_async, aucune session synchrone n'est ouverte
+    return PopulationService()
+
+
+def get_historical_service(db: Session = Depends(get_read_db)) -> HistoricalService:
+    return HistoricalService(db)
+
+
+def get_birth_service(db: Session = Depends(get_read_db)) -> BirthService:
+    return BirthService(db)
+
+
+def get_geocode_service(db: Session = Depends(get_read_db)) -> GeoCodeService:
+    return GeoCodeService(db)
+
+
+def get_revenue_service(db: Session = Depends(get_read_db)) -> RevenueService:
+    return RevenueService(db)
+
+
+def get_family_service(db: Session = Depends(get_read_db)) -> FamilyService:
+    return FamilyService(db)
+
+
+def get_childcare_service(db: Session = Depends(get_read_db)) -> ChildcareService:
+    return ChildcareService(db)
+
+
+def get_public_safety_service(db: Session = Depends(get_read_db)) -> PublicSafetyService:
+    return PublicSafetyService(db)
+
+
+def get_employment_service(db: Session = Depends(get_read_db)) -> EmploymentService:
+    return EmploymentService(db)
+
+
+def get_schooling_service(db: Session = Depends(get_read_db)) -> SchoolingService:
+    return SchoolingService(db)
+
+
+def get_family_employment_service(db: Session = Depends(get_read_db)) -> FamilyEmploymentService:
+    return FamilyEmploymentService(db)
+
+
+def get_batch_service(db: Session = Depends(get_read_db)) -> BatchService:
+    return BatchService(db)
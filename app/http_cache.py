@@ -0,0 +1,138 @@
+"""
+app/http_cache.py
+-----------------
+Requêtes conditionnelles HTTP (ETag / If-None-Match / Cache-Control).
+
+Les statistiques ne changent qu'à l'import d'un nouveau millésime : l'ETag
+(fort) d'une réponse est un hash du chemin, des paramètres de requête et des
+versions des jeux de données lus par la route (dataset_versions, via
+dataset_watcher).
+
+Seules les réponses réussies reçoivent ETag et Cache-Control : statut 200 et
+aucun échec signalé pendant la requête (request_status.mark_failed, toute
+erreur SQL). Un ETag émis est enregistré comme validé ; si le client renvoie
+un ETag validé dans If-None-Match, le middleware répond 304 sans appeler
+l'endpoint, donc sans requête SQL. Un ETag jamais validé par ce processus
+fait exécuter l'endpoint, et le 304 n'est envoyé qu'après une réponse réussie.
+
+Le jeton JWT est vérifié (signature et expiration, sans lecture de la table
+users) avant de répondre 304 ; sinon la requête suit le chemin normal.
+"""
+import hashlib
+import json
+import os
+
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import Response
+
+from app.cache import shared_cache
+from app.datasets import dataset_watcher
+from app.request_status import track
+from app.security import verify_token
+
+HTTP_CACHE_MAX_AGE = int(os.environ.get("HTTP_CACHE_MAX_AGE", 300))
+# "private" : réponses authentifiées ; "public" seulement derrière un CDN qui varie sur Authorization
+HTTP_CACHE_SCOPE = os.environ.get("HTTP_CACHE_SCOPE", "private")
+CACHE_CONTROL = f"{HTTP_CACHE_SCOPE}, max-age={HTTP_CACHE_MAX_AGE}, must-revalidate"
+# Version du schéma d'ETag : les ETags émis avant qu'une réponse de repli soit
+# exclue (et donc peut-être attachés à une erreur) ne correspondent plus
+ETAG_SCHEME = 2
+
+# Préfixe de chemin → jeux de données lus par les routes correspondantes.
+# Le premier préfixe qui correspond l'emporte ; /epci/... suit la même table
+# une fois le préfixe retiré. geo_codes est ajouté partout (rattachements).
+_ROUTE_DATASETS = (
+    ("/iris/population", ("iris_population",)),
+    ("/iris/families", ("iris_families",)),
+    ("/iris/housing", ("iris_housing",)),
+    ("/iris/education", ("iris_education",)),
+    ("/iris/activity", ("iris_activity",)),
+    ("/population", ("populations",)),
+    ("/historical", ("historical",)),
+    ("/geocodes/", ("births",)),
+    ("/births", ("births",)),
+    ("/revenues", ("revenues",)),
+    ("/childcare", ("childcare", "populations")),
+    ("/families/employment", ("family_employment",)),
+    ("/families", ("families",)),
+    ("/public-safety", ("public_safety", "populations")),
+    ("/employment", ("employment",)),
+    ("/education/schooling", ("schooling",)),
+)
+
+
+def route_datasets(path: str):
+    """Jeux de données d'une route (None si la route n'est pas une statistique)."""
+    if path.startswith("/epci/"):
+        path = path[len("/epci"):]
+    for prefix, datasets in _ROUTE_DATASETS:
+        if path.startswith(prefix):
+            return datasets + ("geo_codes",)
+    return None
+
+
+def compute_etag(path: str, params, datasets):
+    """ETag fort de la réponse, ou None si aucun jeu de données n'est versionné."""
+    versions = [dataset_watcher.version(name) for name in datasets]
+    if all(version == "0" for version in versions):
+        return None
+    raw = json.dumps([ETAG_SCHEME, path, sorted(params), list(zip(datasets, versions))], default=str)
+    return '"' + hashlib.sha256(raw.encode()).hexdigest()[:32] + '"'
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    # Comparaison faible (RFC 9110 §13.1.2) : W/"x" correspond à "x"
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def _etag_key(etag: str) -> str:
+    return "etag:" + etag
+
+
+def is_validated(etag: str) -> bool:
+    """Vrai si une réponse réussie a été servie avec cet ETag."""
+    found, _ = shared_cache.get(_etag_key(etag))
+    return found
+
+
+def mark_validated(etag: str):
+    shared_cache.set(_etag_key(etag), True)
+
+
+def _bearer_token(request):
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    return token if scheme.lower() == "bearer" and token else None
+
+
+class ConditionalRequestMiddleware(BaseHTTPMiddleware):
+    """Ajoute ETag / Cache-Control aux réponses réussies et répond 304 quand un ETag validé correspond."""
+
+    async def dispatch(self, request, call_next):
+        if request.method not in ("GET", "HEAD"):
+            return await call_next(request)
+        datasets = route_datasets(request.url.path)
+        if datasets is None:
+            return await call_next(request)
+        etag = compute_etag(request.url.path, request.query_params.multi_items(), datasets)
+        if etag is None:
+            return await call_next(request)
+
+        headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL, "Vary": "Authorization"}
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and _matches(if_none_match, etag) and is_validated(etag):
+            token = _bearer_token(request)
+            if token and verify_token(token):
+                return Response(status_code=304, headers=headers)
+
+        with track() as status:
+            response = await call_next(request)
+        if response.status_code != 200 or status.failed:
+            return response
+
+        mark_validated(etag)
+        if if_none_match and _matches(if_none_match, etag):
+            # Réponse réussie identique à celle du client : le corps est abandonné
+            return Response(status_code=304, headers=headers)
+        response.headers.update(headers)
+        return response
@@ -2,11 +2,12 @@
 import os
 from fastapi.middleware.cors import CORSMiddleware
 from typing import List
-from fastapi import FastAPI, HTTPException, Depends, status, APIRouter, Request
+from fastapi import FastAPI, HTTPException, Depends, status, APIRouter, Request, Query
 from fastapi.staticfiles import StaticFiles
 from datetime import timedelta
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from dotenv import load_dotenv
 import redis
 from fastapi.responses import JSONResponse
@@ -18,7 +19,7 @@ from slowapi.errors import RateLimitExceeded
 from limits.storage import RedisStorage
 
 # 3. Imports des modules internes
-from .services.population_service import PopulationService
+from .services.population_service import PopulationService, CHILDREN_SORT_KEYS
 from .services.historical_service import HistoricalService
 from .services.birth_service import BirthService
 from .services.geocode_service import GeoCodeService
@@ -27,7 +28,7 @@ from .services.family_service import FamilyService
 from .services.childcare_service import ChildcareService
 from .services.public_safety_service import PublicSafetyService
 from .services.employment_service import EmploymentService
-from .services.schooling_service import SchoolingService
+from .services.schooling_service import SchoolingService, SCHOOLING_SORT_KEYS
 from .services.family_employment_service import FamilyEmploymentService
 
 from .routers.iris import router as iris_router
@@ -42,15 +43,32 @@ from app.schemas import BirthSchema, FamilySchema
 from app.schemas import (
     Population, HistoricalData, PopulationChildrenRate, PopulationChildrenEPCI,
     PopulationChildrenDepartment, PopulationChildrenRegion, PopulationChildrenFrance,
-    Revenue, Childcare, PublicSafetyResponse,
+    DepartmentPopulationResponse, RegionPopulationResponse, FrancePopulationResponse,
+    DepartmentCommunesChildrenResponse, RegionCommunesChildrenResponse,
+    DepartmentCommunesBirthsResponse,
+    DepartmentFamilyEmploymentResponse, DepartmentFamilyEmploymentAllAgesResponse,
+    Revenue, Childcare, PublicSafetyResponse, PublicSafetyCommunesResponse,
     EmploymentResponse, SchoolingResponse, SchoolingData,
+    DepartmentCommunesSchoolingResponse, RegionCommunesSchoolingResponse,
     FamilyEmploymentResponse, FamilyEmploymentDistribution
 )
 
-from app.database import get_db
+from app.cache import shared_cache, single_flight
+from app.response_cache import response_cache, cached_response
+from app.http_cache import ConditionalRequestMiddleware
+from app.datasets import dataset_watcher
+from app.territory import get_territory_index
+from app.rollup_engine import warm_rollups
+from app.database import get_db, get_async_read_db, engine, async_engine, pool_status, replica_router
+from app.dependencies import (
+    get_population_service, get_async_population_service, get_historical_service, get_birth_service,
+    get_geocode_service, get_revenue_service, get_family_service,
+    get_childcare_service, get_public_safety_service, get_employment_service,
+    get_schooling_service, get_family_employment_service,
+)
 from app.security import (
     Token, User, authenticate_user, create_access_token,
-    get_current_user, ACCESS_TOKEN_EXPIRE_MINUTES
+    get_current_user, get_internal_user, ACCESS_TOKEN_EXPIRE_MINUTES
 )
 
 # 4. Charger les variables d'environnement en premier
@@ -107,6 +125,25 @@ app.include_router(iris_housing_router)
 app.include_router(iris_education_router)
 app.include_router(iris_activity_router)
 
+# Préchargement de l'index territorial et des agrégats du moteur (app/rollup_engine.py) :
+# leur chargement (lecture complète de tables) ne doit pas avoir lieu dans une requête.
+# Les versions courantes sont lues d'abord : elles servent de clé aux agrégats.
+@app.on_event("startup")
+def warm_caches():
+    try:
+        dataset_watcher.poll()
+        get_territory_index()
+    except Exception as e:
+        print(f"⚠️ Index territorial non préchargé (chargé à la première requête) : {str(e)}")
+    else:
+        warm_rollups()
+
+# Surveillance de dataset_versions : invalide les caches des jeux de données réimportés
+# et recalcule les agrégats du moteur
+@app.on_event("startup")
+def start_dataset_watcher():
+    dataset_watcher.start()
+
 # 9. Ajouter le gestionnaire d'erreur pour le rate limiting
 app.state.limiter = limiter
 # app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)  # Commentez ou supprimez cette ligne
@@ -121,6 +158,9 @@ async def rate_limit_handler(request: Request, exc: RateLimitExceeded):
 # Enregistrez correctement le gestionnaire
 app.add_exception_handler(RateLimitExceeded, rate_limit_handler)
 
+# ETag / 304 sur les routes statistiques (avant CORS, pour que les 304 portent les en-têtes CORS)
+app.add_middleware(ConditionalRequestMiddleware)
+
 # 10. Configurer CORS
 if DEBUG:
     # En mode développement, autoriser tous les domaines
@@ -141,26 +181,18 @@ app.add_middleware(
 # 11. Monter les fichiers statiques
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
-# 12. Initialiser les services
-population_service = PopulationService()
-historical_service = HistoricalService()
-birth_service = BirthService()
-geocode_service = GeoCodeService()
-revenue_service = RevenueService()
-family_service = FamilyService()
-childcare_service = ChildcareService()
-public_safety_service = PublicSafetyService()
-employment_service = EmploymentService()
-schooling_service = SchoolingService()
-family_employment_service = FamilyEmploymentService()
+# 12. Services : une instance par requête, sur la session de lecture de get_read_db (voir app/dependencies.py)
 
 # 13. Créer un router protégé pour tous les autres endpoints
 protected_router = APIRouter(dependencies=[Depends(get_current_user)])
 
+# Router des métriques d'exploitation : utilisateurs de INTERNAL_API_USERS seulement
+internal_router = APIRouter(prefix="/internal", tags=["Internal"], dependencies=[Depends(get_internal_user)])
+
 # 14. Endpoints
 @app.post("/token", response_model=Token)
 # @limiter.limit(AUTH_RATE)
-async def login_for_access_token(request: Request, form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+def login_for_access_token(request: Request, form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
     user = authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
@@ -179,13 +211,44 @@ async def login_for_access_token(request: Request, form_data: OAuth2PasswordRequ
 async def root():
     return {"message": "API Population 2021"}
 
+@internal_router.get("/pool",
+    summary="État des pools de connexions",
+    description="Connexions utilisées, inactives et en overflow, et temps d'attente cumulé au checkout, pour les moteurs synchrone et asynchrone",
+    response_description="Métriques instantanées et cumulées de chaque pool")
+async def get_pool_status():
+    """
+    Permet de dimensionner DB_POOL_SIZE / DB_MAX_OVERFLOW (budget par base) et sa
+    part asynchrone DB_ASYNC_POOL_SIZE / DB_ASYNC_MAX_OVERFLOW à partir des données :
+    un temps d'attente ou un nombre de timeouts qui croît indique un pool sous-dimensionné.
+    """
+    return {
+        "sync": pool_status(engine),
+        "async": pool_status(async_engine),
+        "replicas": replica_router.status(),
+    }
+
+@internal_router.get("/cache",
+    summary="État du cache partagé",
+    description="Cache partagé en mémoire (taille en octets, entrées par jeu de données, hit/miss/éviction), cache des réponses L1/L2 (Redis) et requêtes regroupées (single flight)",
+    response_description="Métriques instantanées et cumulées du cache")
+async def get_cache_status():
+    """
+    Permet d'ajuster CACHE_MAX_BYTES / CACHE_TTL : un nombre d'évictions qui croît
+    avec un taux de hit faible indique un budget mémoire trop petit.
+    """
+    return {
+        "shared": shared_cache.stats(),
+        "responses": response_cache.stats(),
+        "single_flight": single_flight.stats(),
+    }
+
 @protected_router.get("/population/{code}",
     response_model=List[Population],
     summary="Obtenir la structure de la population d'une commune",
     description="Récupère la répartition détaillée de la population d'une commune par sexe et par âge (de 0 à 100 ans)",
     response_description="Liste détaillée des effectifs de population par sexe et âge")
 @limiter.limit(HIGH_LOAD_RATE)
-async def get_population_by_code(request: Request, code: str):
+async def get_population_by_code(request: Request, code: str, db: AsyncSession = Depends(get_async_read_db), population_service: PopulationService = Depends(get_async_population_service)):
     """
     Récupère la pyramide des âges d'une commune :
 
@@ -199,7 +262,7 @@ async def get_population_by_code(request: Request, code: str):
     - L'âge (AGED100) : de 0 à 100 ans
     - Le nombre de personnes (NB)
     """
-    data = population_service.get_by_code(code)
+    data = await population_service.get_by_code_async(db, code)
     if not data:
         raise HTTPException(status_code=404, detail="Code non trouvé")
     return data
@@ -210,13 +273,13 @@ async def get_population_by_code(request: Request, code: str):
     description="Récupère les statistiques sur les enfants de moins de 3 ans et de 3 à 5 ans pour une commune",
     response_description="Les données démographiques incluant la population totale, le nombre d'enfants par tranche d'âge et leurs taux")
 @limiter.limit(DEFAULT_RATE)
-async def get_commune_children(request: Request, code: str):
+async def get_commune_children(request: Request, code: str, db: AsyncSession = Depends(get_async_read_db), population_service: PopulationService = Depends(get_async_population_service)):
     """
     Obtient les statistiques des enfants pour une commune :
 
     - **code**: Code INSEE de la commune
     """
-    return population_service.get_population_and_children_rate(code)
+    return await population_service.get_population_and_children_rate_async(db, code)
 
 @protected_router.get("/population/children/epci/{epci}",
     response_model=PopulationChildrenEPCI,
@@ -224,13 +287,13 @@ async def get_commune_children(request: Request, code: str):
     description="Agrège les statistiques sur les enfants de moins de 3 ans et de 3 à 5 ans pour toutes les communes d'un EPCI",
     response_description="Les données démographiques incluant la population totale de l'EPCI, le nombre d'enfants par tranche d'âge, leurs taux et le nombre de communes")
 @limiter.limit(DEFAULT_RATE)
-async def get_epci_children(request: Request, epci: str):
+async def get_epci_children(request: Request, epci: str, db: AsyncSession = Depends(get_async_read_db), population_service: PopulationService = Depends(get_async_population_service)):
     """
     Agrège les statistiques des enfants pour un EPCI :
 
     - **epci**: Code de l'EPCI
     """
-    return population_service.aggregate_children_by_epci(epci, geocode_service)
+    return await population_service.aggregate_children_by_epci_async(db, epci)
 
 @protected_router.get("/population/children/department/{dep}",
     response_model=PopulationChildrenDepartment,
@@ -238,13 +301,13 @@ async def get_epci_children(request: Request, epci: str):
     description="Agrège les statistiques sur les enfants de moins de 3 ans et de 3 à 5 ans pour toutes les communes d'un département",
     response_description="Les données démographiques incluant la population totale du département, le nombre d'enfants par tranche d'âge, leurs taux et le nombre de communes")
 @limiter.limit(DEFAULT_RATE)
-async def get_department_children(request: Request, dep: str):
+async def get_department_children(request: Request, dep: str, db: AsyncSession = Depends(get_async_read_db), population_service: PopulationService = Depends(get_async_population_service)):
     """
     Agrège les statistiques des enfants pour un département :
 
     - **dep**: Code du département
     """
-    return population_service.aggregate_children_by_department(dep, geocode_service)
+    return await population_service.aggregate_children_by_department_async(db, dep)
 
 @protected_router.get("/population/children/region/{reg}",
     response_model=PopulationChildrenRegion,
@@ -252,13 +315,13 @@ async def get_department_children(request: Request, dep: str):
     description="Agrège les statistiques sur les enfants de moins de 3 ans et de 3 à 5 ans pour toutes les communes d'une région",
     response_description="Les données démographiques incluant la population totale de la région, le nombre d'enfants par tranche d'âge, leurs taux, le nombre de communes et de départements")
 @limiter.limit(DEFAULT_RATE)
-async def get_region_children(request: Request, reg: str):
+async def get_region_children(request: Request, reg: str, db: AsyncSession = Depends(get_async_read_db), population_service: PopulationService = Depends(get_async_population_service)):
     """
     Agrège les statistiques des enfants pour une région :
 
     - **reg**: Code de la région
     """
-    return population_service.aggregate_children_by_region(reg, geocode_service)
+    return await population_service.aggregate_children_by_region_async(db, reg)
 
 @protected_router.get("/population/children/france",
     response_model=PopulationChildrenFrance,
@@ -266,11 +329,115 @@ async def get_region_children(request: Request, reg: str):
     description="Agrège les statistiques sur les enfants de moins de 3 ans et de 3 à 5 ans pour l'ensemble de la France",
     response_description="Les données démographiques incluant la population totale nationale, le nombre d'enfants par tranche d'âge, leurs taux, le nombre de communes, de départements et de régions")
 @limiter.limit(DEFAULT_RATE)
-async def get_france_children(request: Request):
+@cached_response("populations", "geo_codes")
+async def get_france_children(request: Request, db: AsyncSession = Depends(get_async_read_db), population_service: PopulationService = Depends(get_async_population_service)):
     """
     Agrège les statistiques des enfants au niveau national
     """
-    return population_service.aggregate_children_france(geocode_service)
+    return await population_service.aggregate_children_france_async(db)
+
+_COMMUNES_SORT_QUERY = Query("total_population", description="Critère de tri : " + ", ".join(CHILDREN_SORT_KEYS))
+_COMMUNES_ORDER_QUERY = Query("desc", description="Ordre de tri : asc ou desc")
+_COMMUNES_LIMIT_QUERY = Query(100, ge=1, le=1000, description="Nombre de communes par page (1 à 1000)")
+_COMMUNES_OFFSET_QUERY = Query(0, ge=0, description="Nombre de communes à sauter")
+
+def _check_communes_sort(sort_by: str, order: str):
+    if sort_by not in CHILDREN_SORT_KEYS or order not in ("asc", "desc"):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Tri invalide : sort_by parmi {', '.join(CHILDREN_SORT_KEYS)}, order parmi asc, desc"
+        )
+
+@protected_router.get("/population/children/department/{dep}/communes",
+    response_model=DepartmentCommunesChildrenResponse,
+    summary="Obtenir les données des enfants de 0-5 ans pour les communes d'un département",
+    description="Liste triée et paginée des communes d'un département avec la population totale, le nombre d'enfants de moins de 3 ans et de 3 à 5 ans et leurs taux. Toutes les communes sont servies par une seule requête (agrégats précalculés).",
+    response_description="Page de communes avec leurs statistiques enfants et le nombre total de communes du département")
+@limiter.limit(DEFAULT_RATE)
+def get_department_communes_children(
+    request: Request,
+    dep: str,
+    sort_by: str = _COMMUNES_SORT_QUERY,
+    order: str = _COMMUNES_ORDER_QUERY,
+    limit: int = _COMMUNES_LIMIT_QUERY,
+    offset: int = _COMMUNES_OFFSET_QUERY,
+    population_service: PopulationService = Depends(get_population_service)
+):
+    """
+    Récupère les statistiques des enfants pour les communes d'un département :
+
+    - **dep**: Code du département
+    - **sort_by** / **order**: Critère et ordre de tri
+    - **limit** / **offset**: Pagination
+    """
+    _check_communes_sort(sort_by, order)
+    return population_service.get_children_by_department_communes(dep, sort_by, order, limit, offset)
+
+@protected_router.get("/population/children/region/{reg}/communes",
+    response_model=RegionCommunesChildrenResponse,
+    summary="Obtenir les données des enfants de 0-5 ans pour les communes d'une région",
+    description="Liste triée et paginée des communes d'une région avec la population totale, le nombre d'enfants de moins de 3 ans et de 3 à 5 ans et leurs taux. Toutes les communes sont servies par une seule requête (agrégats précalculés).",
+    response_description="Page de communes avec leurs statistiques enfants et le nombre total de communes de la région")
+@limiter.limit(DEFAULT_RATE)
+def get_region_communes_children(
+    request: Request,
+    reg: str,
+    sort_by: str = _COMMUNES_SORT_QUERY,
+    order: str = _COMMUNES_ORDER_QUERY,
+    limit: int = _COMMUNES_LIMIT_QUERY,
+    offset: int = _COMMUNES_OFFSET_QUERY,
+    population_service: PopulationService = Depends(get_population_service)
+):
+    """
+    Récupère les statistiques des enfants pour les communes d'une région :
+
+    - **reg**: Code de la région
+    - **sort_by** / **order**: Critère et ordre de tri
+    - **limit** / **offset**: Pagination
+    """
+    _check_communes_sort(sort_by, order)
+    return population_service.get_children_by_region_communes(reg, sort_by, order, limit, offset)
+
+@protected_router.get("/population/pyramid/department/{dep}",
+    response_model=DepartmentPopulationResponse,
+    summary="Obtenir la pyramide des âges d'un département",
+    description="Récupère la structure de la population d'un département par sexe et par âge (de 0 à 100 ans), ainsi que la population de chacune de ses communes",
+    response_description="Structure démographique du département avec pyramide des âges détaillée et liste des communes triée par population décroissante")
+@limiter.limit(DEFAULT_RATE)
+def get_department_population(request: Request, dep: str, population_service: PopulationService = Depends(get_population_service)):
+    """
+    Obtient la pyramide des âges d'un département :
+
+    - **dep**: Code du département
+    """
+    return population_service.get_department_population(dep)
+
+@protected_router.get("/population/pyramid/region/{reg}",
+    response_model=RegionPopulationResponse,
+    summary="Obtenir la pyramide des âges d'une région",
+    description="Récupère la structure de la population d'une région par sexe et par âge (de 0 à 100 ans), ainsi que la population de chacun de ses départements",
+    response_description="Structure démographique de la région avec pyramide des âges détaillée et liste des départements triée par population décroissante")
+@limiter.limit(DEFAULT_RATE)
+def get_region_population(request: Request, reg: str, population_service: PopulationService = Depends(get_population_service)):
+    """
+    Obtient la pyramide des âges d'une région :
+
+    - **reg**: Code de la région
+    """
+    return population_service.get_region_population(reg)
+
+@protected_router.get("/population/pyramid/france",
+    response_model=FrancePopulationResponse,
+    summary="Obtenir la pyramide des âges de la France entière",
+    description="Récupère la structure de la population nationale par sexe et par âge (de 0 à 100 ans), ainsi que la population de chaque région",
+    response_description="Structure démographique nationale avec pyramide des âges détaillée et liste des régions triée par population décroissante")
+@limiter.limit(DEFAULT_RATE)
+@cached_response("populations", "geo_codes")
+def get_france_population(request: Request, population_service: PopulationService = Depends(get_population_service)):
+    """
+    Obtient la pyramide des âges de la France entière
+    """
+    return population_service.get_france_population()
 
 @protected_router.get("/historical/{code}",
     response_model=List[HistoricalData],
@@ -288,7 +455,7 @@ async def get_france_children(request: Request):
 Cette évolution permet d'observer les tendances démographiques sur plus de 50 ans.""",
     response_description="Les données de population pour chaque recensement depuis 1968")
 @limiter.limit(DEFAULT_RATE)
-async def get_historical_by_code(request: Request, code: str):
+def get_historical_by_code(request: Request, code: str, historical_service: HistoricalService = Depends(get_historical_service)):
     """
     Obtient l'évolution historique de la population d'une commune :
 
@@ -309,15 +476,15 @@ async def get_historical_by_code(request: Request, code: str):
 
 
 @protected_router.get("/geocodes/{code}")
-async def get_geocode(code: str):
+def get_geocode(code: str, geocode_service: GeoCodeService = Depends(get_geocode_service)):
    return geocode_service.get_by_code(code)
 
 @protected_router.get("/geocodes/region/{reg}")
-async def get_by_region(reg: str):
+def get_by_region(reg: str, geocode_service: GeoCodeService = Depends(get_geocode_service)):
    return geocode_service.get_by_region(reg)
 
 @protected_router.get("/geocodes/department/{dep}")
-async def get_by_department(dep: str):
+def get_by_department(dep: str, geocode_service: GeoCodeService = Depends(get_geocode_service)):
    return geocode_service.get_by_department(dep)
 
 @protected_router.get("/births/{code}",
@@ -326,7 +493,7 @@ async def get_by_department(dep: str):
     description="Récupère les données historiques des naissances pour une commune spécifique",
     response_description="Les données de naissance annuelles pour la commune")
 @limiter.limit(DEFAULT_RATE)
-async def get_births_by_code(request: Request, code: str):
+def get_births_by_code(request: Request, code: str, birth_service: BirthService = Depends(get_birth_service)):
     """
     Récupère les données de naissance pour une commune :
 
@@ -339,57 +506,78 @@ async def get_births_by_code(request: Request, code: str):
     description="Récupère et agrège les données de naissance pour toutes les communes d'un EPCI",
     response_description="Les données de naissance agrégées incluant le nombre total de naissances, le nombre de communes et l'évolution par année")
 @limiter.limit(DEFAULT_RATE)
-async def get_epci_births(request: Request, epci: str):
+def get_epci_births(request: Request, epci: str, geocode_service: GeoCodeService = Depends(get_geocode_service)):
     """
     Agrège les naissances au niveau EPCI :
 
     - **epci**: Code de l'EPCI
     """
-    return geocode_service.aggregate_births_by_epci(epci, birth_service)
+    return geocode_service.aggregate_births_by_epci(epci)
 
 @protected_router.get("/geocodes/department/{dep}/births",
     summary="Obtenir les naissances agrégées par département",
     description="Récupère et agrège les données de naissance pour toutes les communes d'un département",
     response_description="Les données de naissance agrégées incluant le nombre total de naissances, le nombre de communes et l'évolution par année")
 @limiter.limit(DEFAULT_RATE)
-async def get_department_births(request: Request, dep: str):
+def get_department_births(request: Request, dep: str, geocode_service: GeoCodeService = Depends(get_geocode_service)):
     """
     Agrège les naissances au niveau départemental :
 
     - **dep**: Code du département
     """
-    return geocode_service.aggregate_births_by_department(dep, birth_service)
+    return geocode_service.aggregate_births_by_department(dep)
 
 @protected_router.get("/geocodes/region/{reg}/births",
     summary="Obtenir les naissances agrégées par région",
     description="Récupère et agrège les données de naissance pour toutes les communes d'une région",
     response_description="Les données de naissance agrégées incluant le nombre total de naissances, le nombre de communes, le nombre de départements et l'évolution par année")
 @limiter.limit(DEFAULT_RATE)
-async def get_region_births(request: Request, reg: str):
+def get_region_births(request: Request, reg: str, geocode_service: GeoCodeService = Depends(get_geocode_service)):
     """
     Agrège les naissances au niveau régional :
 
     - **reg**: Code de la région
     """
-    return geocode_service.aggregate_births_by_region(reg, birth_service)
+    return geocode_service.aggregate_births_by_region(reg)
 
 @protected_router.get("/geocodes/france/births",
     summary="Obtenir les naissances agrégées pour la France entière",
     description="Récupère et agrège les données de naissance pour toutes les communes de France",
     response_description="Les données de naissance agrégées incluant le nombre total de naissances, le nombre de communes, le nombre de départements, le nombre de régions et l'évolution par année")
 @limiter.limit(DEFAULT_RATE)
-async def get_france_births(request: Request):
+def get_france_births(request: Request, geocode_service: GeoCodeService = Depends(get_geocode_service)):
     """
     Agrège les naissances au niveau national
     """
-    return geocode_service.aggregate_births_france(birth_service)
+    return geocode_service.aggregate_births_france()
+
+@protected_router.get("/births/department/{dep}/communes",
+    response_model=DepartmentCommunesBirthsResponse,
+    summary="Obtenir les naissances pour toutes les communes d'un département",
+    description="Récupère les naissances par année de chaque commune d'un département (une seule requête pour tout le département), avec le total par année du département et la commune ayant le plus de naissances",
+    response_description="Liste des communes avec leurs données de naissances, triée par nombre de naissances décroissant")
+@limiter.limit(DEFAULT_RATE)
+def get_department_communes_births(
+    request: Request,
+    dep: str,
+    start_year: int = Query(None, description="Année de début (incluse)"),
+    end_year: int = Query(None, description="Année de fin (incluse)"),
+    birth_service: BirthService = Depends(get_birth_service)
+):
+    """
+    Récupère les naissances de chaque commune d'un département :
+
+    - **dep**: Code du département
+    - **start_year** / **end_year**: Période (optionnelle)
+    """
+    return birth_service.get_births_by_department_communes(dep, start_year, end_year)
 
 @protected_router.get("/revenues/median/commune/{code}",
     summary="Obtenir les revenus médians d'une commune",
     description="Récupère l'historique des revenus médians et des taux de pauvreté d'une commune depuis 2017",
     response_description="Les revenus médians et taux de pauvreté par année pour la commune")
 @limiter.limit(DEFAULT_RATE)
-async def get_commune_median_revenues(request: Request, code: str):
+def get_commune_median_revenues(request: Request, code: str, revenue_service: RevenueService = Depends(get_revenue_service)):
     """
     Obtient les données de revenus pour une commune :
 
@@ -406,7 +594,7 @@ async def get_commune_median_revenues(request: Request, code: str):
     description="Récupère l'historique des revenus médians et des taux de pauvreté d'un EPCI depuis 2017",
     response_description="Les revenus médians et taux de pauvreté par année pour l'EPCI")
 @limiter.limit(DEFAULT_RATE)
-async def get_epci_median_revenues(request: Request, code: str):
+def get_epci_median_revenues(request: Request, code: str, revenue_service: RevenueService = Depends(get_revenue_service)):
     """
     Obtient les données de revenus agrégées pour un EPCI :
 
@@ -423,7 +611,7 @@ async def get_epci_median_revenues(request: Request, code: str):
     description="Récupère l'historique des revenus médians et des taux de pauvreté d'un département depuis 2017",
     response_description="Les revenus médians et taux de pauvreté par année pour le département")
 @limiter.limit(DEFAULT_RATE)
-async def get_department_median_revenues(request: Request, code: str):
+def get_department_median_revenues(request: Request, code: str, revenue_service: RevenueService = Depends(get_revenue_service)):
     """
     Obtient les données de revenus agrégées pour un département :
 
@@ -440,7 +628,7 @@ async def get_department_median_revenues(request: Request, code: str):
     description="Récupère l'historique des revenus médians et des taux de pauvreté d'une région depuis 2017",
     response_description="Les revenus médians et taux de pauvreté par année pour la région")
 @limiter.limit(DEFAULT_RATE)
-async def get_region_median_revenues(request: Request, code: str):
+def get_region_median_revenues(request: Request, code: str, revenue_service: RevenueService = Depends(get_revenue_service)):
     """
     Obtient les données de revenus agrégées pour une région :
 
@@ -457,7 +645,7 @@ async def get_region_median_revenues(request: Request, code: str):
     description="Récupère l'historique des revenus médians et des taux de pauvreté au niveau national depuis 2017",
     response_description="Les revenus médians et taux de pauvreté par année pour la France entière")
 @limiter.limit(DEFAULT_RATE)
-async def get_france_median_revenues(request: Request):
+def get_france_median_revenues(request: Request, revenue_service: RevenueService = Depends(get_revenue_service)):
     """
     Obtient les données de revenus agrégées au niveau national
 
@@ -487,11 +675,12 @@ Les modes d'accueil incluent :
 - Couverture globale (tous modes d'accueil)""",
     response_description="Les taux de couverture par année et par mode d'accueil")
 @limiter.limit(DEFAULT_RATE)
-async def get_commune_childcare(
+def get_commune_childcare(
     request: Request,
     code: str,
     start_year: int = None,
-    end_year: int = None
+    end_year: int = None,
+    childcare_service: ChildcareService = Depends(get_childcare_service)
 ):
     """
     Obtient les taux de couverture pour une commune :
@@ -521,11 +710,12 @@ Les modes d'accueil incluent :
 Inclut également les informations sur le département de rattachement.""",
     response_description="Les taux de couverture par année et par mode d'accueil, avec les informations territoriales")
 @limiter.limit(DEFAULT_RATE)
-async def get_epci_childcare(
+def get_epci_childcare(
     request: Request,
     epci: str,
     start_year: int = None,
-    end_year: int = None
+    end_year: int = None,
+    childcare_service: ChildcareService = Depends(get_childcare_service)
 ):
     """
     Obtient les taux de couverture pour un EPCI :
@@ -554,11 +744,12 @@ Les modes d'accueil incluent :
 Inclut également les informations sur la région de rattachement.""",
     response_description="Les taux de couverture par année et par mode d'accueil, avec les informations territoriales")
 @limiter.limit(DEFAULT_RATE)
-async def get_department_childcare(
+def get_department_childcare(
     request: Request,
     dep: str,
     start_year: int = None,
-    end_year: int = None
+    end_year: int = None,
+    childcare_service: ChildcareService = Depends(get_childcare_service)
 ):
     """
     Obtient les taux de couverture pour un département :
@@ -585,11 +776,12 @@ Les modes d'accueil incluent :
 - Couverture globale (tous modes d'accueil)""",
     response_description="Les taux de couverture par année et par mode d'accueil")
 @limiter.limit(DEFAULT_RATE)
-async def get_region_childcare(
+def get_region_childcare(
     request: Request,
     reg: str,
     start_year: int = None,
-    end_year: int = None
+    end_year: int = None,
+    childcare_service: ChildcareService = Depends(get_childcare_service)
 ):
     """
     Obtient les taux de couverture pour une région :
@@ -616,10 +808,12 @@ Les modes d'accueil incluent :
 - Couverture globale (tous modes d'accueil)""",
     response_description="Les taux de couverture par année et par mode d'accueil pour la France entière")
 @limiter.limit(DEFAULT_RATE)
-async def get_france_childcare(
+@cached_response("childcare")
+def get_france_childcare(
     request: Request,
     start_year: int = None,
-    end_year: int = None
+    end_year: int = None,
+    childcare_service: ChildcareService = Depends(get_childcare_service)
 ):
     """
     Obtient les taux de couverture pour la France entière :
@@ -641,11 +835,12 @@ Les données incluent pour chaque année :
 
 Les données sont accompagnées d'une analyse de l'évolution entre les années sélectionnées.""")
 @limiter.limit(DEFAULT_RATE)
-async def get_commune_families(
+def get_commune_families(
     request: Request,
     code: str,
     start_year: int = None,
-    end_year: int = None
+    end_year: int = None,
+    family_service: FamilyService = Depends(get_family_service)
 ):
     """
     Obtient les statistiques des familles pour une commune :
@@ -668,11 +863,12 @@ Les données sont agrégées pour toutes les communes de l'EPCI et incluent pour
 
 Les données sont accompagnées d'une analyse de l'évolution entre les années sélectionnées.""")
 @limiter.limit(DEFAULT_RATE)
-async def get_epci_families(
+def get_epci_families(
     request: Request,
     epci: str,
     start_year: int = None,
-    end_year: int = None
+    end_year: int = None,
+    family_service: FamilyService = Depends(get_family_service)
 ):
     """
     Obtient les statistiques des familles agrégées pour un EPCI :
@@ -695,11 +891,12 @@ Les données sont agrégées pour toutes les communes du département et incluen
 
 Les données sont accompagnées d'une analyse de l'évolution entre les années sélectionnées.""")
 @limiter.limit(DEFAULT_RATE)
-async def get_department_families(
+def get_department_families(
     request: Request,
     dep: str,
     start_year: int = None,
-    end_year: int = None
+    end_year: int = None,
+    family_service: FamilyService = Depends(get_family_service)
 ):
     """
     Obtient les statistiques des familles agrégées pour un département :
@@ -722,11 +919,12 @@ Les données sont agrégées pour toutes les communes de la région et incluent
 
 Les données sont accompagnées d'une analyse de l'évolution entre les années sélectionnées.""")
 @limiter.limit(DEFAULT_RATE)
-async def get_region_families(
+def get_region_families(
     request: Request,
     reg: str,
     start_year: int = None,
-    end_year: int = None
+    end_year: int = None,
+    family_service: FamilyService = Depends(get_family_service)
 ):
     """
     Obtient les statistiques des familles agrégées pour une région :
@@ -751,10 +949,11 @@ Les données sont accompagnées d'une analyse de l'évolution entre les années
 les tendances démographiques nationales sur la structure des familles.""",
     response_description="Statistiques nationales annuelles avec analyse de l'évolution")
 @limiter.limit(DEFAULT_RATE)
-async def get_france_families(
+def get_france_families(
     request: Request,
     start_year: int = None,
-    end_year: int = None
+    end_year: int = None,
+    family_service: FamilyService = Depends(get_family_service)
 ):
     """
     Obtient les statistiques des familles agrégées au niveau national :
@@ -778,7 +977,7 @@ Les données incluent pour chaque année :
 Les données communales sont comparées avec celles du département et de la région pour permettre une mise en perspective territoriale.""",
    response_description="Indicateurs de sécurité communaux, départementaux et régionaux")
 @limiter.limit(DEFAULT_RATE)
-async def get_commune_public_safety(request: Request, code: str):
+def get_commune_public_safety(request: Request, code: str, public_safety_service: PublicSafetyService = Depends(get_public_safety_service)):
    """
    Obtient les indicateurs de sécurité pour une commune :
 
@@ -791,6 +990,38 @@ async def get_commune_public_safety(request: Request, code: str):
    """
    return public_safety_service.get_by_commune(code)
 
+# Nombre maximal de communes par appel de /public-safety/communes
+PUBLIC_SAFETY_MAX_COMMUNES = 500
+
+@protected_router.get("/public-safety/communes",
+   response_model=PublicSafetyCommunesResponse,
+   summary="Obtenir les indicateurs de sécurité de plusieurs communes",
+   description=f"""Récupère en un seul appel les indicateurs de sécurité publique de plusieurs communes (au plus {PUBLIC_SAFETY_MAX_COMMUNES}), chacune comparée à son département et à sa région.
+
+Toutes les séries (communes, départements et régions concernés) sont lues par une seule requête.""",
+   response_description="Indicateurs de sécurité communaux, départementaux et régionaux, dans l'ordre des codes demandés")
+@limiter.limit(DEFAULT_RATE)
+def get_communes_public_safety(
+   request: Request,
+   codes: str = Query(..., description="Codes INSEE des communes, séparés par des virgules"),
+   public_safety_service: PublicSafetyService = Depends(get_public_safety_service)
+):
+   """
+   Obtient les indicateurs de sécurité de plusieurs communes :
+
+   - **codes**: Codes INSEE séparés par des virgules (ex. 75056,69123,13055)
+
+   Une commune inconnue est retournée avec des données vides.
+   """
+   requested = [code.strip() for code in codes.split(",") if code.strip()]
+   if not requested or len(requested) > PUBLIC_SAFETY_MAX_COMMUNES:
+       raise HTTPException(
+           status_code=400,
+           detail=f"Indiquer entre 1 et {PUBLIC_SAFETY_MAX_COMMUNES} codes de communes"
+       )
+   results = public_safety_service.get_by_communes(requested)
+   return {"count": len(results), "results": results}
+
 @protected_router.get("/public-safety/department/{dep}",
     response_model=PublicSafetyResponse,
     summary="Obtenir les indicateurs de sécurité d'un département",
@@ -805,7 +1036,7 @@ Les données incluent pour chaque année :
 Les données départementales sont comparées avec celles de la région parente.""",
     response_description="Indicateurs de sécurité départementaux et régionaux")
 @limiter.limit(DEFAULT_RATE)
-async def get_department_public_safety(request: Request, dep: str):
+def get_department_public_safety(request: Request, dep: str, public_safety_service: PublicSafetyService = Depends(get_public_safety_service)):
     """
     Obtient les indicateurs de sécurité pour un département :
 
@@ -825,7 +1056,7 @@ Les données incluent pour chaque année :
 - Les taux d'infractions économiques et financières""",
     response_description="Indicateurs de sécurité régionaux")
 @limiter.limit(DEFAULT_RATE)
-async def get_region_public_safety(request: Request, reg: str):
+def get_region_public_safety(request: Request, reg: str, public_safety_service: PublicSafetyService = Depends(get_public_safety_service)):
     """
     Obtient les indicateurs de sécurité pour une région :
 
@@ -833,103 +1064,121 @@ async def get_region_public_safety(request: Request, reg: str):
     """
     return public_safety_service.get_by_region(reg)
 
+_EMPLOYMENT_YEAR_QUERY = Query(None, description="Année des données (si non spécifiée, l'année la plus récente disponible est utilisée)")
+
 @protected_router.get("/employment/rates/commune/{code}",
     response_model=EmploymentResponse,
     summary="Obtenir les taux d'emploi des femmes pour une commune",
-    description="""Récupère les indicateurs d'emploi des femmes pour une commune en 2021.
+    description="""Récupère les indicateurs d'emploi des femmes pour une commune.
 
 Les données incluent :
 - Taux d'activité (femmes actives / population totale)
 - Taux d'emploi (femmes ayant un emploi / population totale)
 - Taux de temps partiel pour les 25-54 ans
-- Taux de temps partiel pour les 15-64 ans""",
+- Taux de temps partiel pour les 15-64 ans
+
+Les taux de l'année demandée (par défaut la plus récente) sont complétés par la série de toutes les années disponibles (rates_by_year).""",
     response_description="Indicateurs d'emploi des femmes de la commune")
 @limiter.limit(DEFAULT_RATE)
-async def get_commune_employment_rates(request: Request, code: str):
+def get_commune_employment_rates(request: Request, code: str, year: int = _EMPLOYMENT_YEAR_QUERY, employment_service: EmploymentService = Depends(get_employment_service)):
     """
     Obtient les statistiques d'emploi des femmes pour une commune :
 
     - **code**: Code INSEE de la commune
+    - **year**: Année des données (optionnelle)
     """
-    return employment_service.get_commune_rates(code)
+    return employment_service.get_commune_rates(code, year)
 
 @protected_router.get("/employment/rates/epci/{epci}",
     response_model=EmploymentResponse,
     summary="Obtenir les taux d'emploi des femmes pour un EPCI",
-    description="""Récupère les indicateurs d'emploi des femmes agrégés pour un EPCI (Établissement Public de Coopération Intercommunale) en 2021.
+    description="""Récupère les indicateurs d'emploi des femmes agrégés pour un EPCI (Établissement Public de Coopération Intercommunale).
 
 Les données incluent :
 - Taux d'activité (femmes actives / population totale)
 - Taux d'emploi (femmes ayant un emploi / population totale)
 - Taux de temps partiel pour les 25-54 ans
-- Taux de temps partiel pour les 15-64 ans""",
+- Taux de temps partiel pour les 15-64 ans
+
+Les taux de l'année demandée (par défaut la plus récente) sont complétés par la série de toutes les années disponibles (rates_by_year).""",
     response_description="Indicateurs d'emploi des femmes agrégés pour l'EPCI")
 @limiter.limit(DEFAULT_RATE)
-async def get_epci_employment_rates(request: Request, epci: str):
+def get_epci_employment_rates(request: Request, epci: str, year: int = _EMPLOYMENT_YEAR_QUERY, employment_service: EmploymentService = Depends(get_employment_service)):
     """
     Obtient les statistiques d'emploi des femmes agrégées pour un EPCI :
 
     - **epci**: Code de l'EPCI
+    - **year**: Année des données (optionnelle)
     """
-    return employment_service.get_epci_rates(epci)
+    return employment_service.get_epci_rates(epci, year)
 
 @protected_router.get("/employment/rates/department/{dep}",
     response_model=EmploymentResponse,
     summary="Obtenir les taux d'emploi des femmes pour un département",
-    description="""Récupère les indicateurs d'emploi des femmes agrégés pour un département en 2021.
+    description="""Récupère les indicateurs d'emploi des femmes agrégés pour un département.
 
 Les données incluent :
 - Taux d'activité (femmes actives / population totale)
 - Taux d'emploi (femmes ayant un emploi / population totale)
 - Taux de temps partiel pour les 25-54 ans
-- Taux de temps partiel pour les 15-64 ans""",
+- Taux de temps partiel pour les 15-64 ans
+
+Les taux de l'année demandée (par défaut la plus récente) sont complétés par la série de toutes les années disponibles (rates_by_year).""",
     response_description="Indicateurs d'emploi des femmes agrégés pour le département")
 @limiter.limit(DEFAULT_RATE)
-async def get_department_employment_rates(request: Request, dep: str):
+def get_department_employment_rates(request: Request, dep: str, year: int = _EMPLOYMENT_YEAR_QUERY, employment_service: EmploymentService = Depends(get_employment_service)):
     """
     Obtient les statistiques d'emploi des femmes agrégées pour un département :
 
     - **dep**: Code du département
+    - **year**: Année des données (optionnelle)
     """
-    return employment_service.get_department_rates(dep)
+    return employment_service.get_department_rates(dep, year)
 
 @protected_router.get("/employment/rates/region/{reg}",
     response_model=EmploymentResponse,
     summary="Obtenir les taux d'emploi des femmes pour une région",
-    description="""Récupère les indicateurs d'emploi des femmes agrégés pour une région en 2021.
+    description="""Récupère les indicateurs d'emploi des femmes agrégés pour une région.
 
 Les données incluent :
 - Taux d'activité (femmes actives / population totale)
 - Taux d'emploi (femmes ayant un emploi / population totale)
 - Taux de temps partiel pour les 25-54 ans
-- Taux de temps partiel pour les 15-64 ans""",
+- Taux de temps partiel pour les 15-64 ans
+
+Les taux de l'année demandée (par défaut la plus récente) sont complétés par la série de toutes les années disponibles (rates_by_year).""",
     response_description="Indicateurs d'emploi des femmes agrégés pour la région")
 @limiter.limit(DEFAULT_RATE)
-async def get_region_employment_rates(request: Request, reg: str):
+def get_region_employment_rates(request: Request, reg: str, year: int = _EMPLOYMENT_YEAR_QUERY, employment_service: EmploymentService = Depends(get_employment_service)):
     """
     Obtient les statistiques d'emploi des femmes agrégées pour une région :
 
     - **reg**: Code de la région
+    - **year**: Année des données (optionnelle)
     """
-    return employment_service.get_region_rates(reg)
+    return employment_service.get_region_rates(reg, year)
 
 @protected_router.get("/employment/rates/france",
     response_model=EmploymentResponse,
     summary="Obtenir les taux d'emploi des femmes pour la France",
-    description="""Récupère les indicateurs d'emploi des femmes au niveau national en 2021.
+    description="""Récupère les indicateurs d'emploi des femmes au niveau national.
 
 Les données incluent :
 - Taux d'activité (femmes actives / population totale)
 - Taux d'emploi (femmes ayant un emploi / population totale)
 - Taux de temps partiel pour les 25-54 ans
-- Taux de temps partiel pour les 15-64 ans""",
+- Taux de temps partiel pour les 15-64 ans
+
+Les taux de l'année demandée (par défaut la plus récente) sont complétés par la série de toutes les années disponibles (rates_by_year).""",
     response_description="Indicateurs d'emploi des femmes au niveau national")
 @limiter.limit(DEFAULT_RATE)
-async def get_france_employment_rates(request: Request):
+def get_france_employment_rates(request: Request, year: int = _EMPLOYMENT_YEAR_QUERY, employment_service: EmploymentService = Depends(get_employment_service)):
     """
     Obtient les statistiques d'emploi des femmes au niveau national
+
+    - **year**: Année des données (optionnelle)
     """
-    return employment_service.get_france_rates()
+    return employment_service.get_france_rates(year)
 
 @protected_router.get("/education/schooling/commune/{code}",
    response_model=SchoolingResponse,
@@ -947,7 +1196,7 @@ Les données incluent pour chaque année :
  * Taux de scolarisation""",
    response_description="Statistiques annuelles de scolarisation pour la commune")
 @limiter.limit(DEFAULT_RATE)
-async def get_commune_schooling(request: Request, code: str):
+def get_commune_schooling(request: Request, code: str, schooling_service: SchoolingService = Depends(get_schooling_service)):
    """
    Obtient les taux de scolarisation pour une commune :
 
@@ -971,7 +1220,7 @@ Les données incluent pour chaque année :
  * Taux de scolarisation""",
    response_description="Statistiques annuelles de scolarisation agrégées pour l'EPCI")
 @limiter.limit(DEFAULT_RATE)
-async def get_epci_schooling(request: Request, epci: str):
+def get_epci_schooling(request: Request, epci: str, schooling_service: SchoolingService = Depends(get_schooling_service)):
    """
    Obtient les taux de scolarisation agrégés pour un EPCI :
 
@@ -995,7 +1244,7 @@ Les données incluent pour chaque année :
  * Taux de scolarisation""",
    response_description="Statistiques annuelles de scolarisation agrégées pour le département")
 @limiter.limit(DEFAULT_RATE)
-async def get_department_schooling(request: Request, dep: str):
+def get_department_schooling(request: Request, dep: str, schooling_service: SchoolingService = Depends(get_schooling_service)):
    """
    Obtient les taux de scolarisation agrégés pour un département :
 
@@ -1019,7 +1268,7 @@ Les données incluent pour chaque année :
  * Taux de scolarisation""",
    response_description="Statistiques annuelles de scolarisation agrégées pour la région")
 @limiter.limit(DEFAULT_RATE)
-async def get_region_schooling(request: Request, reg: str):
+def get_region_schooling(request: Request, reg: str, schooling_service: SchoolingService = Depends(get_schooling_service)):
    """
    Obtient les taux de scolarisation agrégés pour une région :
 
@@ -1027,6 +1276,72 @@ async def get_region_schooling(request: Request, reg: str):
    """
    return schooling_service.get_region_schooling(reg)
 
+_SCHOOLING_SORT_QUERY = Query("2y", description="Critère de tri : " + ", ".join(SCHOOLING_SORT_KEYS))
+_SCHOOLING_YEAR_QUERY = Query(None, description="Année des données (si non spécifiée, l'année la plus récente disponible est utilisée)")
+
+def _check_schooling_sort(sort_by: str, order: str):
+    if sort_by not in SCHOOLING_SORT_KEYS or order not in ("asc", "desc"):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Tri invalide : sort_by parmi {', '.join(SCHOOLING_SORT_KEYS)}, order parmi asc, desc"
+        )
+
+@protected_router.get("/education/schooling/department/{dep}/communes",
+   response_model=DepartmentCommunesSchoolingResponse,
+   summary="Obtenir les taux de scolarisation des communes d'un département",
+   description="Liste triée et paginée des communes d'un département avec les taux de scolarisation des enfants de 2 ans et de 3 à 5 ans pour une année, ainsi que les taux moyens du département. Toutes les communes sont servies par une seule requête sur la partition de l'année.",
+   response_description="Page de communes avec leurs taux de scolarisation et le nombre total de communes du département")
+@limiter.limit(DEFAULT_RATE)
+def get_department_communes_schooling(
+   request: Request,
+   dep: str,
+   sort_by: str = _SCHOOLING_SORT_QUERY,
+   order: str = _COMMUNES_ORDER_QUERY,
+   limit: int = _COMMUNES_LIMIT_QUERY,
+   offset: int = _COMMUNES_OFFSET_QUERY,
+   year: int = _SCHOOLING_YEAR_QUERY,
+   schooling_service: SchoolingService = Depends(get_schooling_service)
+):
+   """
+   Obtient les taux de scolarisation des communes d'un département :
+
+   - **dep**: Code du département
+   - **sort_by**: Critère de tri ('2y' ou '3_5y')
+   - **order**: Ordre de tri ('asc' ou 'desc')
+   - **limit** / **offset**: Pagination
+   - **year**: Année des données (optionnelle)
+   """
+   _check_schooling_sort(sort_by, order)
+   return schooling_service.get_communes_schooling_by_department(dep, sort_by, order, limit, offset, year)
+
+@protected_router.get("/education/schooling/region/{reg}/communes",
+   response_model=RegionCommunesSchoolingResponse,
+   summary="Obtenir les taux de scolarisation des communes d'une région",
+   description="Liste triée et paginée des communes d'une région avec les taux de scolarisation des enfants de 2 ans et de 3 à 5 ans pour une année, ainsi que les taux moyens de la région. Toutes les communes sont servies par une seule requête sur la partition de l'année.",
+   response_description="Page de communes avec leurs taux de scolarisation et le nombre total de communes de la région")
+@limiter.limit(DEFAULT_RATE)
+def get_region_communes_schooling(
+   request: Request,
+   reg: str,
+   sort_by: str = _SCHOOLING_SORT_QUERY,
+   order: str = _COMMUNES_ORDER_QUERY,
+   limit: int = _COMMUNES_LIMIT_QUERY,
+   offset: int = _COMMUNES_OFFSET_QUERY,
+   year: int = _SCHOOLING_YEAR_QUERY,
+   schooling_service: SchoolingService = Depends(get_schooling_service)
+):
+   """
+   Obtient les taux de scolarisation des communes d'une région :
+
+   - **reg**: Code de la région
+   - **sort_by**: Critère de tri ('2y' ou '3_5y')
+   - **order**: Ordre de tri ('asc' ou 'desc')
+   - **limit** / **offset**: Pagination
+   - **year**: Année des données (optionnelle)
+   """
+   _check_schooling_sort(sort_by, order)
+   return schooling_service.get_communes_schooling_by_region(reg, sort_by, order, limit, offset, year)
+
 @protected_router.get("/education/schooling/france",
    response_model=SchoolingResponse,
    summary="Obtenir les taux de scolarisation pour la France",
@@ -1043,7 +1358,8 @@ Les données incluent pour chaque année :
  * Taux de scolarisation""",
    response_description="Statistiques annuelles de scolarisation au niveau national")
 @limiter.limit(DEFAULT_RATE)
-async def get_france_schooling(request: Request):
+@cached_response("schooling")
+def get_france_schooling(request: Request, schooling_service: SchoolingService = Depends(get_schooling_service)):
    """
    Obtient les taux de scolarisation au niveau national
    """
@@ -1068,7 +1384,7 @@ Les situations analysées sont :
  * Aucun parent actif ayant un emploi""",
    response_description="Distribution des situations d'emploi des familles avec leur pourcentage")
 @limiter.limit(DEFAULT_RATE)
-async def get_commune_family_employment_under3(request: Request, code: str):
+def get_commune_family_employment_under3(request: Request, code: str, family_employment_service: FamilyEmploymentService = Depends(get_family_employment_service)):
    """
    Obtient la répartition des situations d'emploi pour une commune :
 
@@ -1094,7 +1410,7 @@ Les situations analysées sont :
  * Aucun parent actif ayant un emploi""",
    response_description="Distribution agrégée des situations d'emploi des familles avec leur pourcentage")
 @limiter.limit(DEFAULT_RATE)
-async def get_epci_family_employment_under3(request: Request, epci: str):
+def get_epci_family_employment_under3(request: Request, epci: str, family_employment_service: FamilyEmploymentService = Depends(get_family_employment_service)):
    """
    Obtient la répartition agrégée des situations d'emploi pour un EPCI :
 
@@ -1120,7 +1436,7 @@ Les situations analysées sont :
  * Aucun parent actif ayant un emploi""",
    response_description="Distribution agrégée des situations d'emploi des familles avec leur pourcentage")
 @limiter.limit(DEFAULT_RATE)
-async def get_department_family_employment_under3(request: Request, dep: str):
+def get_department_family_employment_under3(request: Request, dep: str, family_employment_service: FamilyEmploymentService = Depends(get_family_employment_service)):
    """
    Obtient la répartition agrégée des situations d'emploi pour un département :
 
@@ -1146,7 +1462,7 @@ Les situations analysées sont :
  * Aucun parent actif ayant un emploi""",
    response_description="Distribution agrégée des situations d'emploi des familles avec leur pourcentage")
 @limiter.limit(DEFAULT_RATE)
-async def get_region_family_employment_under3(request: Request, reg: str):
+def get_region_family_employment_under3(request: Request, reg: str, family_employment_service: FamilyEmploymentService = Depends(get_family_employment_service)):
    """
    Obtient la répartition agrégée des situations d'emploi pour une région :
 
@@ -1172,7 +1488,7 @@ Les situations analysées sont :
  * Aucun parent actif ayant un emploi""",
    response_description="Distribution nationale des situations d'emploi des familles avec leur pourcentage")
 @limiter.limit(DEFAULT_RATE)
-async def get_france_family_employment_under3(request: Request):
+def get_france_family_employment_under3(request: Request, family_employment_service: FamilyEmploymentService = Depends(get_family_employment_service)):
    """
    Obtient la répartition des situations d'emploi au niveau national
    """
@@ -1201,7 +1517,7 @@ Pour chaque situation, les données indiquent :
 - Le pourcentage par rapport au total des familles de la commune""",
    response_description="Distribution des situations d'emploi des familles avec leur nombre et pourcentage")
 @limiter.limit(DEFAULT_RATE)
-async def get_commune_family_employment_3to5(request: Request, code: str):
+def get_commune_family_employment_3to5(request: Request, code: str, family_employment_service: FamilyEmploymentService = Depends(get_family_employment_service)):
    """
    Obtient la répartition des situations d'emploi pour une commune :
 
@@ -1231,7 +1547,7 @@ Pour chaque situation, les données agrégées indiquent :
 - Le pourcentage par rapport au total des familles de l'EPCI""",
    response_description="Distribution agrégée des situations d'emploi des familles avec leur nombre et pourcentage")
 @limiter.limit(DEFAULT_RATE)
-async def get_epci_family_employment_3to5(request: Request, epci: str):
+def get_epci_family_employment_3to5(request: Request, epci: str, family_employment_service: FamilyEmploymentService = Depends(get_family_employment_service)):
    """
    Obtient la répartition agrégée des situations d'emploi pour un EPCI :
 
@@ -1261,7 +1577,7 @@ Pour chaque situation, les données agrégées indiquent :
 - Le pourcentage par rapport au total des familles du département""",
    response_description="Distribution agrégée des situations d'emploi des familles avec leur nombre et pourcentage")
 @limiter.limit(DEFAULT_RATE)
-async def get_department_family_employment_3to5(request: Request, dep: str):
+def get_department_family_employment_3to5(request: Request, dep: str, family_employment_service: FamilyEmploymentService = Depends(get_family_employment_service)):
    """
    Obtient la répartition agrégée des situations d'emploi pour un département :
 
@@ -1291,7 +1607,7 @@ Pour chaque situation, les données agrégées indiquent :
 - Le pourcentage par rapport au total des familles de la région""",
    response_description="Distribution agrégée des situations d'emploi des familles avec leur nombre et pourcentage")
 @limiter.limit(DEFAULT_RATE)
-async def get_region_family_employment_3to5(request: Request, reg: str):
+def get_region_family_employment_3to5(request: Request, reg: str, family_employment_service: FamilyEmploymentService = Depends(get_family_employment_service)):
    """
    Obtient la répartition agrégée des situations d'emploi pour une région :
 
@@ -1321,12 +1637,59 @@ Pour chaque situation, les données indiquent :
 - Le pourcentage par rapport au total des familles en France""",
    response_description="Distribution nationale des situations d'emploi des familles avec leur nombre et pourcentage")
 @limiter.limit(DEFAULT_RATE)
-async def get_france_family_employment_3to5(request: Request):
+def get_france_family_employment_3to5(request: Request, family_employment_service: FamilyEmploymentService = Depends(get_family_employment_service)):
    """
    Obtient la répartition des situations d'emploi au niveau national
    """
    return family_employment_service.get_france_distribution(age_group="3")
 
+_FAMILY_EMPLOYMENT_YEAR_QUERY = Query(None, description="Année des données (si non spécifiée, l'année la plus récente disponible est utilisée)")
+
+@protected_router.get("/families/employment/under3/department/{dep}/communes",
+   response_model=DepartmentFamilyEmploymentResponse,
+   summary="Obtenir les statistiques d'emploi des familles avec enfants de moins de 3 ans pour toutes les communes d'un département",
+   description="Récupère, pour chaque commune du département, le nombre de familles avec enfants de moins de 3 ans, la part des couples biactifs, la part des familles monoparentales dont le parent travaille et la distribution détaillée des situations d'emploi (une seule requête pour tout le département)",
+   response_description="Liste des communes avec leurs statistiques d'emploi des familles, triée par taux de double activité décroissant")
+@limiter.limit(DEFAULT_RATE)
+def get_department_communes_family_employment_under3(request: Request, dep: str, year: int = _FAMILY_EMPLOYMENT_YEAR_QUERY, family_employment_service: FamilyEmploymentService = Depends(get_family_employment_service)):
+   """
+   Obtient les statistiques d'emploi des familles (moins de 3 ans) pour chaque commune d'un département :
+
+   - **dep**: Code du département
+   - **year**: Année des données (optionnel)
+   """
+   return family_employment_service.get_communes_distribution_by_department(dep, age_group="0", year=year)
+
+@protected_router.get("/families/employment/3to5/department/{dep}/communes",
+   response_model=DepartmentFamilyEmploymentResponse,
+   summary="Obtenir les statistiques d'emploi des familles avec enfants de 3 à 5 ans pour toutes les communes d'un département",
+   description="Récupère, pour chaque commune du département, le nombre de familles avec enfants de 3 à 5 ans, la part des couples biactifs, la part des familles monoparentales dont le parent travaille et la distribution détaillée des situations d'emploi (une seule requête pour tout le département)",
+   response_description="Liste des communes avec leurs statistiques d'emploi des familles, triée par taux de double activité décroissant")
+@limiter.limit(DEFAULT_RATE)
+def get_department_communes_family_employment_3to5(request: Request, dep: str, year: int = _FAMILY_EMPLOYMENT_YEAR_QUERY, family_employment_service: FamilyEmploymentService = Depends(get_family_employment_service)):
+   """
+   Obtient les statistiques d'emploi des familles (3 à 5 ans) pour chaque commune d'un département :
+
+   - **dep**: Code du département
+   - **year**: Année des données (optionnel)
+   """
+   return family_employment_service.get_communes_distribution_by_department(dep, age_group="3", year=year)
+
+@protected_router.get("/families/employment/department/{dep}/communes",
+   response_model=DepartmentFamilyEmploymentAllAgesResponse,
+   summary="Obtenir les statistiques d'emploi des familles (moins de 3 ans et 3 à 5 ans) pour toutes les communes d'un département",
+   description="Regroupe les deux listes précédentes en une seule réponse, calculée à partir d'une seule requête",
+   response_description="Statistiques d'emploi des familles par commune pour les deux groupes d'âge")
+@limiter.limit(DEFAULT_RATE)
+def get_department_communes_family_employment(request: Request, dep: str, year: int = _FAMILY_EMPLOYMENT_YEAR_QUERY, family_employment_service: FamilyEmploymentService = Depends(get_family_employment_service)):
+   """
+   Obtient les statistiques d'emploi des familles des deux groupes d'âge pour chaque commune d'un département :
+
+   - **dep**: Code du département
+   - **year**: Année des données (optionnel)
+   """
+   return family_employment_service.get_communes_distributions_by_department(dep, year=year)
+
 @protected_router.get("/families/{level}/{code}",
   summary="Obtenir l'évolution de la composition des familles par niveau géographique",
   description="""Récupère l'évolution historique de la composition des familles depuis 2010 pour le niveau géographique choisi.
@@ -1349,12 +1712,13 @@ L'évolution est calculée entre les années spécifiées (start_year et end_yea
 - Le pourcentage d'évolution
 - La période concernée""")
 @limiter.limit(DEFAULT_RATE)
-async def get_families(
+def get_families(
    request: Request,
    level: str,
    code: str,
    start_year: int = None,
-   end_year: int = None
+   end_year: int = None,
+   family_service: FamilyService = Depends(get_family_service)
 ):
    """
    Obtient l'évolution de la composition des familles pour un territoire :
@@ -1367,13 +1731,14 @@ async def get_families(
    if level == "commune":
        return family_service.get_families_by_commune(code, start_year, end_year)
    elif level == "epci":
-       return family_service.get_families_by_epci(code, geocode_service, start_year, end_year)
+       return family_service.get_families_by_epci(code, start_year, end_year)
    elif level == "department":
-       return family_service.get_families_by_department(code, geocode_service, start_year, end_year)
+       return family_service.get_families_by_department(code, start_year, end_year)
    elif level == "region":
-       return family_service.get_families_by_region(code, geocode_service, start_year, end_year)
+       return family_service.get_families_by_region(code, start_year, end_year)
    else:
        raise HTTPException(status_code=404, detail=f"Level {level} not found")
 
 # Inclure le router protégé dans l'app
 app.include_router(protected_router)
+app.include_router(internal_router)
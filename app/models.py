@@ -19,6 +19,13 @@ class Birth(Base):
     time_period = Column(Integer, nullable=False)
     obs_value = Column(Float, nullable=False)
 
+    __table_args__ = (
+        # Index composite pour les agrégats par année (GROUP BY time_period) ;
+        # obs_value inclus pour un parcours d'index seul
+        Index('ix_births_geo_object_geo_time_period', 'geo_object', 'geo', 'time_period',
+              postgresql_include=['obs_value']),
+    )
+
 class Family(Base):
     __tablename__ = "families"
 
@@ -74,10 +81,19 @@ class PublicSafety(Base):
     territory_code = Column(String(10), nullable=False, index=True)
     year = Column(Integer, nullable=False, index=True)
     indicator_class = Column(String(50), nullable=False)
+    # Code canonique de indicator_class, calculé à l'import (indicator_code())
+    indicator_code = Column(String(80), nullable=True)
     rate = Column(Float, nullable=False)
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
+    __table_args__ = (
+        # Index composite des séries d'un territoire (IN sur les couples (type, code))
+        Index('ix_public_safety_territory_year', 'territory_type', 'territory_code', 'year'),
+        # Index composite pour les séries d'un indicateur (ex. violences intrafamiliales des communes)
+        Index('ix_public_safety_indicator_code_type_code', 'indicator_code', 'territory_type', 'territory_code'),
+    )
+
 class Employment(Base):
     __tablename__ = "employment"
 
@@ -598,3 +614,34 @@ class IrisActivity(Base):
         Index("ix_iris_activity_reg_code",  "reg_code"),
         Index("ix_iris_activity_year",      "year"),
     )
+
+
+class DatasetVersion(Base):
+    """Registre des imports : une ligne par (table, millésime), mise à jour par chaque script d'import."""
+    __tablename__ = "dataset_versions"
+
+    id         = Column(Integer,     primary_key=True, autoincrement=True)
+    table_name = Column(String(64),  nullable=False)
+    millesime  = Column(String(16),  nullable=False, server_default="")  # "" = table entière
+    row_count  = Column(Integer,     nullable=True)
+    checksum   = Column(String(64),  nullable=True)   # SHA-256 du/des fichier(s) source
+    version    = Column(Integer,     nullable=False, server_default="1")
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("table_name", "millesime", name="uq_dataset_versions_table_millesime"),
+    )
+
+
+class PopulationChildrenRollup(Base):
+    """
+    Totaux précalculés (population, moins de 3 ans, 3-5 ans) par territoire,
+    reconstruits après chaque import de populations (app/rollups.py).
+    """
+    __tablename__ = "population_children_rollup"
+
+    level         = Column(String(16), primary_key=True)   # commune, epci, department, region, france
+    code          = Column(String(16), primary_key=True)   # "FR" pour la France
+    total         = Column(Float, nullable=False)
+    under_3       = Column(Float, nullable=False)
+    three_to_five = Column(Float, nullable=False)
@@ -0,0 +1,48 @@
+"""
+app/request_status.py
+---------------------
+Échec de la requête en cours.
+
+Beaucoup de services répondent à une erreur par une réponse de repli
+(valeurs à zéro, {"error": ...}) avec un statut 200. Une telle réponse ne doit
+ni entrer dans le cache des réponses (app/response_cache.py) ni recevoir
+d'ETag (app/http_cache.py) : `mark_failed()` la signale.
+
+L'état est un objet mutable porté par une ContextVar : il est partagé avec le
+threadpool et les tâches créées pendant la requête (qui reçoivent une copie du
+contexte), et une portée imbriquée (`track()`) signale aussi ses parents.
+Toute erreur levée par un moteur de base de données est signalée
+automatiquement (événement handle_error, app/database.py).
+"""
+import contextvars
+from contextlib import contextmanager
+
+
+class RequestStatus:
+    __slots__ = ("failed", "parent")
+
+    def __init__(self, parent=None):
+        self.failed = False
+        self.parent = parent
+
+
+_current = contextvars.ContextVar("request_status", default=None)
+
+
+@contextmanager
+def track():
+    """Ouvre une portée de suivi (requête HTTP, calcul mis en cache) et retourne son état."""
+    status = RequestStatus(_current.get())
+    token = _current.set(status)
+    try:
+        yield status
+    finally:
+        _current.reset(token)
+
+
+def mark_failed():
+    """Signale que la réponse en cours de calcul est une réponse de repli."""
+    status = _current.get()
+    while status is not None:
+        status.failed = True
+        status = status.parent
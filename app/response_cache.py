@@ -0,0 +1,226 @@
+"""
+app/response_cache.py
+---------------------
+Cache des réponses partagé entre workers et dynos.
+
+- L1 : `shared_cache` (app/cache.py), en mémoire dans chaque processus ;
+- L2 : Redis (optionnel, REDIS_URL), commun à tous les processus.
+
+Les clés combinent la route, les paramètres de la requête et la version des
+jeux de données utilisés (dataset_watcher) : un réimport change la clé, les
+anciennes entrées expirent d'elles-mêmes. Si Redis est absent ou tombe, le
+cache continue en mémoire seule et Redis est retenté après RESPONSE_CACHE_RETRY
+secondes.
+"""
+import functools
+import hashlib
+import inspect
+import json
+import os
+import threading
+import time
+
+import redis
+from fastapi.encoders import jsonable_encoder
+from starlette.concurrency import run_in_threadpool
+
+from app.cache import shared_cache, single_flight
+from app.database import AsyncReadSessionLocal
+from app.datasets import dataset_watcher
+from app.request_status import track, mark_failed
+
+RESPONSE_CACHE_TTL = int(os.environ.get("RESPONSE_CACHE_TTL", 24 * 3600))
+RESPONSE_CACHE_RETRY = float(os.environ.get("RESPONSE_CACHE_RETRY", 30))
+REDIS_TIMEOUT = float(os.environ.get("RESPONSE_CACHE_REDIS_TIMEOUT", 0.25))
+
+_KEY_PREFIX = "resp:"
+
+
+def _redis_from_url(url: str):
+    options = {"socket_timeout": REDIS_TIMEOUT, "socket_connect_timeout": REDIS_TIMEOUT}
+    if url.startswith("rediss://"):
+        # Heroku Redis : certificat auto-signé (voir la configuration du rate limiter)
+        options["ssl_cert_reqs"] = None
+    return redis.Redis.from_url(url, **options)
+
+
+class ResponseCache:
+    """
+    Cache à deux niveaux des réponses JSON.
+
+    `client` permet d'injecter un client compatible Redis (get / set avec `ex`),
+    par exemple fakeredis.FakeRedis() pour les essais locaux.
+    """
+
+    def __init__(self, url: str = None, client=None, ttl: int = RESPONSE_CACHE_TTL,
+                 retry_interval: float = RESPONSE_CACHE_RETRY):
+        self.url = url
+        self.ttl = ttl
+        self.retry_interval = retry_interval
+        self._client = client
+        self._down_until = 0.0
+        self._lock = threading.Lock()
+        self.l1_hits = 0
+        self.l2_hits = 0
+        self.misses = 0
+        self.l2_errors = 0
+
+    @property
+    def backend(self) -> str:
+        return "redis" if (self._client is not None or self.url) else "memory"
+
+    def _redis(self):
+        """Client Redis, ou None (non configuré, ou en pause après une erreur)."""
+        if self._down_until > time.monotonic():
+            return None
+        if self._client is None and self.url:
+            with self._lock:
+                if self._client is None:
+                    self._client = _redis_from_url(self.url)
+        return self._client
+
+    def _l2_failed(self, error):
+        with self._lock:
+            self.l2_errors += 1
+            if self._down_until <= time.monotonic():
+                print(f"⚠️ Redis indisponible pour le cache des réponses, fallback en mémoire : {error}")
+            self._down_until = time.monotonic() + self.retry_interval
+
+    def _count(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def make_key(self, route: str, params, datasets) -> str:
+        versions = "|".join(f"{name}={dataset_watcher.version(name)}" for name in datasets)
+        raw = json.dumps([route, sorted(params), versions], default=str)
+        return _KEY_PREFIX + hashlib.sha256(raw.encode()).hexdigest()
+
+    def get(self, key: str, dataset: str = None):
+        """Retourne (trouvé, valeur) : L1 puis L2 (une valeur trouvée en L2 remonte en L1)."""
+        found, value = shared_cache.get(key)
+        if found:
+            self._count("l1_hits")
+            return True, value
+
+        client = self._redis()
+        if client is not None:
+            try:
+                payload = client.get(key)
+            except (redis.RedisError, OSError) as e:
+                self._l2_failed(e)
+                payload = None
+            if payload is not None:
+                value = json.loads(payload)
+                shared_cache.set(key, value, dataset=dataset, ttl=self.ttl)
+                self._count("l2_hits")
+                return True, value
+
+        self._count("misses")
+        return False, None
+
+    def set(self, key: str, value, dataset: str = None):
+        shared_cache.set(key, value, dataset=dataset, ttl=self.ttl)
+        client = self._redis()
+        if client is None:
+            return
+        try:
+            client.set(key, json.dumps(value), ex=self.ttl)
+        except (redis.RedisError, OSError) as e:
+            self._l2_failed(e)
+
+    def stats(self) -> dict:
+        lookups = self.l1_hits + self.l2_hits + self.misses
+        return {
+            "backend": self.backend,
+            "redis_available": self.backend == "redis" and self._down_until <= time.monotonic(),
+            "ttl_seconds": self.ttl,
+            "l1_hits": self.l1_hits,
+            "l2_hits": self.l2_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.l1_hits + self.l2_hits) / lookups, 4) if lookups else 0.0,
+            "l2_errors": self.l2_errors,
+        }
+
+
+response_cache = ResponseCache(url=os.environ.get("REDIS_URL"))
+
+
+def _cacheable(value, status) -> bool:
+    # Réponse de repli (erreur de base signalée pendant le calcul) ou dict
+    # {"error": ...} : renvoyée à l'appelant mais jamais mise en cache
+    return not status.failed and not (isinstance(value, dict) and "error" in value)
+
+
+def cached_response(*datasets: str):
+    """
+    Met en cache la réponse d'un endpoint (sync ou async) qui reçoit `request: Request`.
+
+    La clé est construite à partir du chemin, des paramètres de requête et des
+    versions des jeux de données `datasets` ; sur un hit, l'endpoint n'est pas
+    appelé (aucune requête SQL). Sur un défaut, les requêtes identiques
+    simultanées partagent un seul appel de l'endpoint (`single_flight`).
+
+    Seuls les résultats réussis sont gardés : une exception n'est pas mise en
+    cache, ni une réponse signalée en échec (request_status.mark_failed, toute
+    erreur SQL) ; les appelants regroupés reçoivent alors le même signalement.
+
+    Un endpoint async qui reçoit `db` (session de la requête) est appelé avec
+    une session dédiée ouverte par le calcul partagé : ce calcul peut survivre
+    à la requête qui l'a lancé (déconnexion du client), dont la session est
+    alors fermée.
+    """
+    dataset = datasets[0] if datasets else None
+
+    def decorator(func):
+        def key_for(kwargs):
+            request = kwargs["request"]
+            return response_cache.make_key(request.url.path, request.query_params.multi_items(), datasets)
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                key = key_for(kwargs)
+                found, value = await run_in_threadpool(response_cache.get, key, dataset)
+                if found:
+                    return value
+
+                async def compute():
+                    with track() as status:
+                        if "db" in kwargs:
+                            async with AsyncReadSessionLocal() as db:
+                                value = jsonable_encoder(await func(*args, **{**kwargs, "db": db}))
+                        else:
+                            value = jsonable_encoder(await func(*args, **kwargs))
+                    ok = _cacheable(value, status)
+                    if ok:
+                        await run_in_threadpool(response_cache.set, key, value, dataset)
+                    return value, ok
+
+                value, ok = await single_flight.do_async(key, compute)
+                if not ok:
+                    mark_failed()
+                return value
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                key = key_for(kwargs)
+                found, value = response_cache.get(key, dataset)
+                if found:
+                    return value
+
+                def compute():
+                    with track() as status:
+                        value = jsonable_encoder(func(*args, **kwargs))
+                    ok = _cacheable(value, status)
+                    if ok:
+                        response_cache.set(key, value, dataset)
+                    return value, ok
+
+                value, ok = single_flight.do(key, compute)
+                if not ok:
+                    mark_failed()
+                return value
+
+        return wrapper
+
+    return decorator
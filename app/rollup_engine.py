@@ -0,0 +1,224 @@
+"""
+app/rollup_engine.py
+--------------------
+Moteur d'agrégation hiérarchique vectorisé (NumPy).
+
+Un service déclare ses mesures communales dans une `RollupSpec` (requête SQL
+qui retourne codgeo, éventuellement une clé comme l'année, puis les mesures)
+et les ratios dérivés. `get_rollup(spec)` charge la requête une fois, range
+les mesures dans une matrice NumPy et calcule en un passage (np.bincount sur
+les positions parentes de l'index territorial) les sommes de tous les niveaux :
+commune, EPCI, département, région et France. Les ratios sont calculés ensuite
+sur les sommes, niveau par niveau.
+
+Les specs déclarées par `register_rollup` sont préchargées au démarrage
+(`warm_rollups`) et recalculées par le watcher (dataset_watcher) quand la
+version du jeu de données ou de geo_codes change. `current_rollup(spec)` ne
+charge jamais rien dans une requête : il retourne None tant que l'agrégat de
+la version courante n'est pas prêt (reconstruction lancée en arrière-plan),
+et le service répond alors par ses requêtes SQL.
+"""
+import threading
+
+import numpy as np
+from sqlalchemy import text
+
+from app.database import replica_router
+from app.datasets import dataset_watcher
+from app.territory import get_territory_index
+
+_PARENT_LEVELS = ("epci", "department", "region")
+FRANCE_CODE = "FR"
+
+
+class RollupSpec:
+    """
+    Déclaration d'un agrégat hiérarchique.
+
+    - `sql` : requête retournant `codgeo`, puis `key` si défini, puis les mesures ;
+    - `measures` : noms des colonnes sommées ;
+    - `ratios` : {nom: (numérateur, dénominateur, échelle)}, 0 si dénominateur nul ;
+    - `key` : colonne de partition (ex. "year"), None pour un agrégat unique.
+    """
+
+    def __init__(self, name: str, dataset: str, sql: str, measures, ratios: dict = None, key: str = None):
+        self.name = name
+        self.dataset = dataset
+        self.sql = text(sql)
+        self.measures = tuple(measures)
+        self.ratios = dict(ratios or {})
+        self.key = key
+
+    @property
+    def columns(self):
+        return self.measures + tuple(self.ratios)
+
+
+class _LevelTable:
+    """Valeurs d'un niveau : codes, position de chaque code et matrice (territoires × colonnes)."""
+
+    __slots__ = ("codes", "positions", "values")
+
+    def __init__(self, codes, values):
+        self.codes = codes
+        self.positions = {code: i for i, code in enumerate(codes)}
+        self.values = values
+
+
+def _with_ratios(spec: RollupSpec, sums: np.ndarray) -> np.ndarray:
+    if not spec.ratios:
+        return sums
+    columns = [sums]
+    for numerator, denominator, scale in spec.ratios.values():
+        num = sums[:, spec.measures.index(numerator)] * scale
+        den = sums[:, spec.measures.index(denominator)]
+        ratio = np.divide(num, den, out=np.zeros_like(num), where=den > 0)
+        columns.append(ratio[:, None])
+    return np.hstack(columns)
+
+
+def aggregate(spec: RollupSpec, index, commune_codes, values: np.ndarray) -> dict:
+    """
+    Agrège une matrice de mesures communales (n communes × m mesures) à tous les
+    niveaux. Les communes absentes de geo_codes ne comptent que pour la France.
+    """
+    n = len(commune_codes)
+    positions = np.fromiter(
+        (index.communes.positions.get(code, -1) for code in commune_codes), dtype=np.int64, count=n
+    )
+    known = positions >= 0
+    tables = {"commune": _LevelTable(list(commune_codes), _with_ratios(spec, values))}
+
+    for level in _PARENT_LEVELS:
+        parent_of_commune = np.frombuffer(index.parent_of_commune[level], dtype=np.int32)
+        parents = np.full(n, -1, dtype=np.int64)
+        parents[known] = parent_of_commune[positions[known]]
+        mask = parents >= 0
+        size = index.size(level)
+        sums = np.column_stack([
+            np.bincount(parents[mask], weights=values[mask, j], minlength=size)
+            for j in range(values.shape[1])
+        ]) if values.shape[1] else np.zeros((size, 0))
+        present = np.flatnonzero(np.bincount(parents[mask], minlength=size))
+        level_codes = index.parents[level].codes
+        tables[level] = _LevelTable([level_codes[i] for i in present], _with_ratios(spec, sums[present]))
+
+    tables["france"] = _LevelTable([FRANCE_CODE], _with_ratios(spec, values.sum(axis=0, keepdims=True)))
+    return tables
+
+
+class Rollup:
+    """Agrégats d'une `RollupSpec` à tous les niveaux, pour chaque valeur de la clé."""
+
+    def __init__(self, spec: RollupSpec, rows, index=None):
+        self.spec = spec
+        index = index or get_territory_index()
+        offset = 2 if spec.key else 1
+
+        partitions = {}
+        for row in rows:
+            partitions.setdefault(row[1] if spec.key else None, []).append(row)
+
+        self._tables = {}
+        for key, part in partitions.items():
+            codes = [str(row[0]) for row in part]
+            values = np.array([row[offset:] for row in part], dtype=np.float64).reshape(len(part), len(spec.measures))
+            # Valeurs NULL comptées comme 0, comme dans les agrégats SQL des services
+            self._tables[key] = aggregate(spec, index, codes, np.nan_to_num(values))
+
+    @classmethod
+    def load(cls, spec: RollupSpec, bind=None, index=None):
+        with (bind or replica_router.read_engine()).connect() as conn:
+            return cls(spec, conn.execute(spec.sql).all(), index)
+
+    def keys(self) -> list:
+        return sorted(key for key in self._tables if key is not None)
+
+    def get(self, level: str, code: str = FRANCE_CODE, key=None):
+        """Mesures et ratios d'un territoire ({colonne: valeur}), ou None s'il n'a pas de données."""
+        table = self._tables.get(key, {}).get(level)
+        if table is None:
+            return None
+        pos = table.positions.get(str(code))
+        if pos is None:
+            return None
+        return dict(zip(self.spec.columns, table.values[pos].tolist()))
+
+    def items(self, level: str, key=None):
+        """Couples (code, {colonne: valeur}) de tous les territoires d'un niveau."""
+        table = self._tables.get(key, {}).get(level)
+        if table is None:
+            return
+        for code, row in zip(table.codes, table.values.tolist()):
+            yield code, dict(zip(self.spec.columns, row))
+
+
+# ---------------------------------------------------------------------------
+# Agrégats partagés par le processus
+# ---------------------------------------------------------------------------
+
+_specs = {}
+_rollups = {}
+_building = set()
+_lock = threading.Lock()
+
+
+def _version(spec: RollupSpec) -> str:
+    return f"{dataset_watcher.version(spec.dataset)}/{dataset_watcher.version('geo_codes')}"
+
+
+def refresh_rollup(spec: RollupSpec) -> Rollup:
+    """Recalcule et publie les agrégats de `spec` pour la version courante des données."""
+    version = _version(spec)
+    rollup = Rollup.load(spec)
+    with _lock:
+        _rollups[spec.name] = (version, rollup)
+    print(f"✅ Agrégats {spec.name} calculés (version {version})")
+    return rollup
+
+
+def _refresh_in_background(spec: RollupSpec):
+    with _lock:
+        if spec.name in _building:
+            return
+        _building.add(spec.name)
+
+    def run():
+        try:
+            refresh_rollup(spec)
+        except Exception as e:
+            print(f"⚠️ Calcul des agrégats {spec.name} impossible : {e}")
+        finally:
+            with _lock:
+                _building.discard(spec.name)
+
+    threading.Thread(target=run, name=f"rollup-{spec.name}", daemon=True).start()
+
+
+def register_rollup(spec: RollupSpec) -> RollupSpec:
+    """Déclare une spec : préchargée par warm_rollups et recalculée à chaque nouvelle version."""
+    _specs[spec.name] = spec
+    for table_name in (spec.dataset, "geo_codes"):
+        dataset_watcher.subscribe(table_name, lambda table_name, millesime: _refresh_in_background(spec))
+    return spec
+
+
+def warm_rollups():
+    """Calcule les agrégats de toutes les specs déclarées (démarrage de l'application)."""
+    for spec in list(_specs.values()):
+        try:
+            refresh_rollup(spec)
+        except Exception as e:
+            print(f"⚠️ Agrégats {spec.name} non préchargés : {e}")
+
+
+def current_rollup(spec: RollupSpec):
+    """
+    Agrégats de `spec` pour la version courante des données, sans attente ;
+    None s'ils ne sont pas prêts (leur calcul est alors lancé en arrière-plan).
+    """
+    cached = _rollups.get(spec.name)
+    if cached is not None and cached[0] == _version(spec):
+        return cached[1]
+    _refresh_in_background(spec)
+    return None
@@ -0,0 +1,68 @@
+"""
+app/rollups.py
+--------------
+Tables d'agrégats précalculés par territoire.
+
+population_children_rollup : population totale, moins de 3 ans et 3-5 ans pour
+chaque commune, EPCI, département, région et pour la France. La table est
+reconstruite en une requête GROUPING SETS après l'import de populations
+(scripts/import_population.py) ou de geo_codes (rattachements), dans la même transaction que l'enregistrement
+de la version du jeu de données : l'API lit ensuite une seule ligne par clé
+primaire (level, code) au lieu d'agréger ~7M lignes.
+"""
+from app.datasets import _execute, record_dataset_version
+
+POPULATION_CHILDREN_ROLLUP = "population_children_rollup"
+
+# Une ligne par commune (populations), rattachée à geo_codes puis agrégée à
+# tous les niveaux en un seul passage. La France somme toutes les communes de
+# populations, rattachées ou non (comme l'agrégat direct sur populations).
+_POPULATION_CHILDREN_SQL = """
+    INSERT INTO population_children_rollup (level, code, total, under_3, three_to_five)
+    SELECT level, code, total, under_3, three_to_five
+    FROM (
+        SELECT
+            CASE
+                WHEN GROUPING(c.codgeo) = 0 THEN 'commune'
+                WHEN GROUPING(g.epci) = 0 THEN 'epci'
+                WHEN GROUPING(g.dep) = 0 THEN 'department'
+                WHEN GROUPING(g.reg) = 0 THEN 'region'
+                ELSE 'france'
+            END AS level,
+            CASE
+                WHEN GROUPING(c.codgeo) = 0 THEN c.codgeo
+                WHEN GROUPING(g.epci) = 0 THEN g.epci
+                WHEN GROUPING(g.dep) = 0 THEN g.dep
+                WHEN GROUPING(g.reg) = 0 THEN g.reg
+                ELSE 'FR'
+            END AS code,
+            COALESCE(SUM(c.total), 0) AS total,
+            COALESCE(SUM(c.under_3), 0) AS under_3,
+            COALESCE(SUM(c.three_to_five), 0) AS three_to_five
+        FROM (
+            SELECT
+                codgeo,
+                SUM(nb) AS total,
+                SUM(CASE WHEN aged100 IN ('000', '001', '002') THEN nb ELSE 0 END) AS under_3,
+                SUM(CASE WHEN aged100 IN ('003', '004', '005') THEN nb ELSE 0 END) AS three_to_five
+            FROM populations
+            GROUP BY codgeo
+        ) c
+        LEFT JOIN geo_codes g ON g.codgeo = c.codgeo
+        GROUP BY GROUPING SETS ((c.codgeo), (g.epci), (g.dep), (g.reg), ())
+    ) r
+    WHERE code IS NOT NULL
+"""
+
+
+def refresh_population_children_rollup(db) -> int:
+    """
+    Reconstruit population_children_rollup (curseur psycopg2 ou session/connexion
+    SQLAlchemy). À appeler dans la transaction d'import, avant le commit : les
+    lecteurs voient l'ancienne table jusqu'au commit. Retourne le nombre de lignes.
+    """
+    _execute(db, f"DELETE FROM {POPULATION_CHILDREN_ROLLUP}", {})
+    _execute(db, _POPULATION_CHILDREN_SQL, {})
+    row_count = _execute(db, f"SELECT COUNT(*) FROM {POPULATION_CHILDREN_ROLLUP}", {})[0]
+    record_dataset_version(db, POPULATION_CHILDREN_ROLLUP, row_count=row_count)
+    return row_count
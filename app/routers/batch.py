@@ -0,0 +1,55 @@
+from fastapi import APIRouter, Depends, Request, HTTPException, status
+from app.security import get_current_user
+from slowapi import Limiter
+from slowapi.util import get_remote_address
+
+from app.schemas import BatchRequest, BatchResponse
+from app.services.batch_service import BatchService
+from app.dependencies import get_batch_service
+
+# Créer un routeur
+router = APIRouter(
+    tags=["Batch"],
+    dependencies=[Depends(get_current_user)]
+)
+
+# Définir les limites de taux
+DEFAULT_RATE = "60/minute"
+
+# Nombre maximal de demandes par appel
+BATCH_MAX_ITEMS = 1000
+
+# Créer une instance du limiter
+limiter = Limiter(key_func=get_remote_address)
+
+@router.post("/batch",
+    response_model=BatchResponse,
+    summary="Obtenir plusieurs indicateurs pour plusieurs territoires en un seul appel",
+    description="Accepte une liste de demandes (indicateur, niveau, code, année) et retourne tous les résultats dans une seule réponse. Les demandes sont regroupées par indicateur : chaque indicateur est servi par une seule requête, quel que soit le nombre de territoires demandés.",
+    response_description="Résultats dans l'ordre de la demande ; data vaut null si le territoire n'a pas de données")
+@limiter.limit(DEFAULT_RATE)
+def post_batch(request: Request, batch: BatchRequest, service: BatchService = Depends(get_batch_service)):
+    """
+    Indicateurs disponibles :
+
+    - **population_children** : population totale, enfants de moins de 3 ans et de 3 à 5 ans, et leurs taux
+    - **revenues** : revenus médians et taux de pauvreté par année
+    - **employment_rates** : taux d'activité, d'emploi et de temps partiel des femmes (dernière année si year est absent)
+    - **childcare_coverage** : taux de couverture des modes d'accueil par année
+
+    Niveaux : commune, epci, department, region, france.
+    """
+    if len(batch.items) > BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Au plus {BATCH_MAX_ITEMS} demandes par appel"
+        )
+    missing = [item for item in batch.items if item.level != "france" and not item.code]
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Le code du territoire est obligatoire hors niveau france"
+        )
+
+    results = service.run([(item.indicator, item.level, item.code, item.year) for item in batch.items])
+    return {"count": len(results), "results": results}
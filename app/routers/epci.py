@@ -10,8 +10,8 @@ from app.schemas import EPCICommunesRevenueResponse, CommuneRevenueData
 from app.schemas import EPCICommunesSchoolingResponse, CommuneSchoolingRate
 from app.schemas import EPCICoupleWithChildrenResponse, CommuneFamilyData
 from app.schemas import EPCISingleParentResponse, CommuneSingleParentData
-from app.schemas import EPCILargeFamiliesResponse, CommuneLargeFamilyData
-from app.schemas import EPCIFamilyEmploymentResponse, CommuneFamilyEmploymentData
+from app.schemas import EPCILargeFamiliesResponse, CommuneLargeFamilyData, EPCIFamilyStructureResponse
+from app.schemas import EPCIFamilyEmploymentResponse, CommuneFamilyEmploymentData, EPCIFamilyEmploymentAllAgesResponse
 from app.schemas import EPCICommunesEmploymentResponse, CommuneEmploymentRates
 from app.schemas import EPCIDomesticViolenceResponse, CommuneDomesticViolenceData
 from app.schemas import EPCIPopulationResponse, AgePopulationData, GenderRatio, CommunePopulationInfo
@@ -20,16 +20,21 @@ from app.schemas import EPCICommunesBirthsResponse, CommuneBirthData
 
 # Importer vos services
 from app.services.population_service import PopulationService
-from app.services.geocode_service import GeoCodeService
 from app.services.childcare_service import ChildcareService
 from app.services.revenue_service import RevenueService
-from app.services.schooling_service import SchoolingService
+from app.services.schooling_service import SchoolingService, SCHOOLING_SORT_KEYS
 from app.services.family_service import FamilyService
 from app.services.family_employment_service import FamilyEmploymentService
 from app.services.employment_service import EmploymentService
 from app.services.public_safety_service import PublicSafetyService
 from app.services.historical_service import HistoricalService
 from app.services.birth_service import BirthService
+from app.dependencies import (
+    get_population_service, get_childcare_service,
+    get_revenue_service, get_schooling_service, get_family_service,
+    get_family_employment_service, get_employment_service,
+    get_public_safety_service, get_historical_service, get_birth_service,
+)
 
 # Créer un routeur
 router = APIRouter(
@@ -38,11 +43,6 @@ router = APIRouter(
     dependencies=[Depends(get_current_user)]
 )
 
-# Créer des instances de vos services
-population_service = PopulationService()
-geocode_service = GeoCodeService()
-historical_service = HistoricalService()
-
 # Définir les limites de taux
 DEFAULT_RATE = "60/minute"
 
@@ -54,23 +54,24 @@ limiter = Limiter(key_func=get_remote_address)
     description="Récupère les statistiques sur les enfants de moins de 3 ans et de 3 à 5 ans pour chaque commune appartenant à l'EPCI spécifié",
     response_description="Liste des données démographiques par commune incluant la population totale, le nombre d'enfants par tranche d'âge et leurs taux")
 @limiter.limit(DEFAULT_RATE)
-async def get_epci_communes_children(request: Request, epci: str):
+def get_epci_communes_children(request: Request, epci: str, population_service: PopulationService = Depends(get_population_service)):
     """
     Récupère les statistiques des enfants pour chaque commune d'un EPCI :
 
     - **epci**: Code de l'EPCI
     """
-    return population_service.get_children_by_epci_communes(epci, geocode_service)
+    return population_service.get_children_by_epci_communes(epci)
 
 @router.get("/childcare/{epci}/communes",
     summary="Obtenir les taux de couverture globale des modes d'accueil pour toutes les communes d'un EPCI",
     description="Récupère les taux de couverture globale des différents modes d'accueil pour chaque commune appartenant à l'EPCI spécifié. Ces données permettent de comparer les niveaux d'accès aux services de garde d'enfants entre les communes d'un même territoire intercommunal.",
     response_description="Liste des communes avec leurs taux de couverture, triée par taux décroissant")
 @limiter.limit(DEFAULT_RATE)
-async def get_epci_communes_childcare(
+def get_epci_communes_childcare(
     request: Request,
     epci: str,
-    year: int = Query(None, description="Année des données (si non spécifiée, l'année la plus récente disponible est utilisée)")
+    year: int = Query(None, description="Année des données (si non spécifiée, l'année la plus récente disponible est utilisée)"),
+    service: ChildcareService = Depends(get_childcare_service)
 ):
     """
     Récupère les taux de couverture pour chaque commune d'un EPCI :
@@ -78,8 +79,6 @@ async def get_epci_communes_childcare(
     - **epci**: Code de l'EPCI
     - **year**: Année des données (optionnel)
     """
-    # Création d'une instance du service
-    service = ChildcareService()
     return service.get_communes_coverage_by_epci(epci, year)
 
 @router.get("/revenues/{epci}/communes",
@@ -87,45 +86,48 @@ async def get_epci_communes_childcare(
     description="Récupère les revenus médians et taux de pauvreté pour chaque commune appartenant à l'EPCI spécifié. Ces données permettent de comparer les niveaux de revenus entre les communes d'un même territoire intercommunal.",
     response_description="Liste des communes avec leurs revenus médians et taux de pauvreté, triée par revenu médian décroissant")
 @limiter.limit(DEFAULT_RATE)
-async def get_epci_communes_revenues(
+def get_epci_communes_revenues(
     request: Request,
-    epci: str
+    epci: str,
+    service: RevenueService = Depends(get_revenue_service)
 ):
     """
     Récupère les données de revenus pour chaque commune d'un EPCI :
 
     - **epci**: Code de l'EPCI
     """
-    # Création d'une instance du service
-    service = RevenueService()
     return service.get_communes_revenues_by_epci(epci)
 
 @router.get("/education/schooling/{epci}/communes",
     response_model=EPCICommunesSchoolingResponse,
     summary="Obtenir les taux de scolarisation des enfants de 2 ans et de 3 à 5 ans pour toutes les communes d'un EPCI",
-    description="""Récupère les taux de scolarisation des enfants de 2 ans et de 3 à 5 ans pour chaque commune appartenant à l'EPCI spécifié.""",
+    description="""Récupère les taux de scolarisation des enfants de 2 ans et de 3 à 5 ans pour chaque commune appartenant à l'EPCI spécifié. Toutes les communes sont servies par une seule requête, triée (et limitée aux N premières si demandé) côté base.""",
     response_description="Liste des communes avec leurs taux de scolarisation par tranche d'âge")
 @limiter.limit(DEFAULT_RATE)
-async def get_epci_communes_schooling(
+def get_epci_communes_schooling(
     request: Request,
     epci: str,
-    sort_by: str = Query("2y", description="Critère de tri ('2y' pour trier par taux à 2 ans, '3_5y' pour trier par taux à 3-5 ans)")
+    sort_by: str = Query("2y", description="Critère de tri ('2y' pour trier par taux à 2 ans, '3_5y' pour trier par taux à 3-5 ans)"),
+    order: str = Query("desc", description="Ordre de tri : asc ou desc"),
+    limit: int = Query(None, ge=1, le=1000, description="Nombre maximal de communes (top N) ; toutes les communes si absent"),
+    year: int = Query(None, description="Année des données (si non spécifiée, l'année la plus récente disponible est utilisée)"),
+    service: SchoolingService = Depends(get_schooling_service)
 ):
     """
     Récupère les taux de scolarisation des enfants par tranche d'âge pour chaque commune d'un EPCI :
 
     - **epci**: Code de l'EPCI
     - **sort_by**: Critère de tri ('2y' ou '3_5y')
+    - **order**: Ordre de tri ('asc' ou 'desc')
+    - **limit**: Nombre maximal de communes retournées (optionnel)
+    - **year**: Année des données (optionnelle)
     """
-    # Création d'une instance du service
-    service = SchoolingService()
-    data = service.get_communes_schooling_by_epci(epci)
-
-    # Trier selon le critère choisi
-    if sort_by == "3_5y" and "communes" in data:
-        data["communes"].sort(key=lambda x: x["schooling_rate_3_5y"], reverse=True)
-
-    return data
+    # Tri et top N appliqués en SQL ; un critère inconnu trie par taux à 2 ans
+    if sort_by not in SCHOOLING_SORT_KEYS:
+        sort_by = "2y"
+    if order not in ("asc", "desc"):
+        order = "desc"
+    return service.get_communes_schooling_by_epci(epci, sort_by, order, limit, 0, year)
 
 @router.get("/families/couples-with-children/{epci}",
     response_model=EPCICoupleWithChildrenResponse,
@@ -140,17 +142,16 @@ async def get_epci_communes_schooling(
     Ces données permettent d'analyser la structure familiale des communes d'un même territoire intercommunal.""",
     response_description="Liste des communes avec leurs statistiques de couples avec enfants, triée par pourcentage décroissant")
 @limiter.limit(DEFAULT_RATE)
-async def get_epci_couples_with_children(
+def get_epci_couples_with_children(
     request: Request,
-    epci: str
+    epci: str,
+    service: FamilyService = Depends(get_family_service)
 ):
     """
     Récupère les statistiques des couples avec enfants pour chaque commune d'un EPCI :
 
     - **epci**: Code de l'EPCI
     """
-    # Création d'une instance du service
-    service = FamilyService()
     return service.get_couples_with_children_by_epci(epci)
 
 @router.get("/families/single-parent/{epci}",
@@ -171,17 +172,16 @@ async def get_epci_couples_with_children(
     et d'identifier les zones avec une concentration plus élevée de familles monoparentales.""",
     response_description="Liste des communes avec leurs statistiques de familles monoparentales, triée par pourcentage décroissant")
 @limiter.limit(DEFAULT_RATE)
-async def get_epci_single_parent_families(
+def get_epci_single_parent_families(
     request: Request,
-    epci: str
+    epci: str,
+    service: FamilyService = Depends(get_family_service)
 ):
     """
     Récupère les statistiques des familles monoparentales pour chaque commune d'un EPCI :
 
     - **epci**: Code de l'EPCI
     """
-    # Création d'une instance du service
-    service = FamilyService()
     return service.get_single_parent_families_by_epci(epci)
 
 @router.get("/families/large-families/{epci}",
@@ -202,19 +202,41 @@ async def get_epci_single_parent_families(
     et d'identifier les zones nécessitant potentiellement plus d'infrastructures adaptées aux grandes familles.""",
     response_description="Liste des communes avec leurs statistiques de familles nombreuses, triée par pourcentage décroissant")
 @limiter.limit(DEFAULT_RATE)
-async def get_epci_large_families(
+def get_epci_large_families(
     request: Request,
-    epci: str
+    epci: str,
+    service: FamilyService = Depends(get_family_service)
 ):
     """
     Récupère les statistiques des familles nombreuses pour chaque commune d'un EPCI :
 
     - **epci**: Code de l'EPCI
     """
-    # Création d'une instance du service
-    service = FamilyService()
     return service.get_large_families_by_epci(epci)
 
+@router.get("/families/structure/{epci}",
+    response_model=EPCIFamilyStructureResponse,
+    summary="Obtenir la structure familiale complète pour toutes les communes d'un EPCI",
+    description="""Regroupe en une seule réponse les statistiques des couples avec enfants, des familles
+    monoparentales et des familles nombreuses de chaque commune de l'EPCI (dernier millésime disponible).
+
+    Chaque bloc a le même contenu que l'endpoint dédié (/families/couples-with-children,
+    /families/single-parent, /families/large-families) ; les trois sont calculés à partir
+    d'une seule requête sur les communes de l'EPCI.""",
+    response_description="Les trois vues de la structure familiale de l'EPCI, chacune avec sa liste de communes")
+@limiter.limit(DEFAULT_RATE)
+def get_epci_family_structure(
+    request: Request,
+    epci: str,
+    service: FamilyService = Depends(get_family_service)
+):
+    """
+    Récupère la structure familiale complète pour chaque commune d'un EPCI :
+
+    - **epci**: Code de l'EPCI
+    """
+    return service.get_family_structure_by_epci(epci)
+
 @router.get("/families/employment/under3/{epci}/communes",
     response_model=EPCIFamilyEmploymentResponse,
     summary="Obtenir les statistiques d'emploi des familles avec enfants de moins de 3 ans pour toutes les communes d'un EPCI",
@@ -231,10 +253,11 @@ Les données incluent pour chaque commune :
 Ces données permettent d'identifier les besoins en services de garde d'enfants et les disparités territoriales.""",
     response_description="Liste des communes avec leurs statistiques d'emploi des familles, triée par taux de double activité décroissant")
 @limiter.limit(DEFAULT_RATE)
-async def get_epci_communes_family_employment_under3(
+def get_epci_communes_family_employment_under3(
     request: Request,
     epci: str,
-    year: int = Query(None, description="Année des données (si non spécifiée, l'année la plus récente disponible est utilisée)")
+    year: int = Query(None, description="Année des données (si non spécifiée, l'année la plus récente disponible est utilisée)"),
+    service: FamilyEmploymentService = Depends(get_family_employment_service)
 ):
     """
     Récupère les statistiques d'emploi des familles avec enfants de moins de 3 ans pour chaque commune d'un EPCI :
@@ -242,8 +265,6 @@ async def get_epci_communes_family_employment_under3(
     - **epci**: Code de l'EPCI
     - **year**: Année des données (optionnel)
     """
-    # Création d'une instance du service
-    service = FamilyEmploymentService()
     return service.get_communes_distribution_by_epci(epci, age_group="0", year=year)
 
 @router.get("/families/employment/3to5/{epci}/communes",
@@ -262,10 +283,11 @@ Les données incluent pour chaque commune :
 Ces statistiques sont particulièrement utiles pour l'analyse des besoins en services périscolaires.""",
     response_description="Liste des communes avec leurs statistiques d'emploi des familles, triée par taux de double activité décroissant")
 @limiter.limit(DEFAULT_RATE)
-async def get_epci_communes_family_employment_3to5(
+def get_epci_communes_family_employment_3to5(
     request: Request,
     epci: str,
-    year: int = Query(None, description="Année des données (si non spécifiée, l'année la plus récente disponible est utilisée)")
+    year: int = Query(None, description="Année des données (si non spécifiée, l'année la plus récente disponible est utilisée)"),
+    service: FamilyEmploymentService = Depends(get_family_employment_service)
 ):
     """
     Récupère les statistiques d'emploi des familles avec enfants de 3 à 5 ans pour chaque commune d'un EPCI :
@@ -273,10 +295,32 @@ async def get_epci_communes_family_employment_3to5(
     - **epci**: Code de l'EPCI
     - **year**: Année des données (optionnel)
     """
-    # Création d'une instance du service
-    service = FamilyEmploymentService()
     return service.get_communes_distribution_by_epci(epci, age_group="3", year=year)
 
+@router.get("/families/employment/{epci}/communes",
+    response_model=EPCIFamilyEmploymentAllAgesResponse,
+    summary="Obtenir les statistiques d'emploi des familles (moins de 3 ans et 3 à 5 ans) pour toutes les communes d'un EPCI",
+    description="""Regroupe en une seule réponse les statistiques d'emploi des familles avec enfants de moins de 3 ans
+et avec enfants de 3 à 5 ans pour chaque commune de l'EPCI.
+
+Chaque bloc a le même contenu que l'endpoint dédié (/families/employment/under3/... et /families/employment/3to5/...) ;
+les deux groupes d'âge sont calculés à partir d'une seule requête.""",
+    response_description="Statistiques d'emploi des familles par commune pour les deux groupes d'âge")
+@limiter.limit(DEFAULT_RATE)
+def get_epci_communes_family_employment(
+    request: Request,
+    epci: str,
+    year: int = Query(None, description="Année des données (si non spécifiée, l'année la plus récente disponible est utilisée)"),
+    service: FamilyEmploymentService = Depends(get_family_employment_service)
+):
+    """
+    Récupère les statistiques d'emploi des familles des deux groupes d'âge pour chaque commune d'un EPCI :
+
+    - **epci**: Code de l'EPCI
+    - **year**: Année des données (optionnel)
+    """
+    return service.get_communes_distributions_by_epci(epci, year=year)
+
 @router.get("/employment/women/{epci}/communes",
     response_model=EPCICommunesEmploymentResponse,
     summary="Obtenir les taux d'emploi des femmes pour toutes les communes d'un EPCI",
@@ -292,14 +336,12 @@ Ces données permettent d'analyser les disparités territoriales en matière d'e
 d'identifier les zones où les besoins en services de garde d'enfants peuvent être plus importants.""",
     response_description="Liste des communes avec leurs statistiques d'emploi des femmes, triée par taux d'emploi décroissant")
 @limiter.limit(DEFAULT_RATE)
-async def get_epci_communes_women_employment(request: Request, epci: str):
+def get_epci_communes_women_employment(request: Request, epci: str, service: EmploymentService = Depends(get_employment_service)):
     """
     Récupère les statistiques d'emploi des femmes pour chaque commune d'un EPCI :
 
     - **epci**: Code de l'EPCI
     """
-    # Création d'une instance du service
-    service = EmploymentService()
     return service.get_communes_rates_by_epci(epci)
 
 @router.get("/public-safety/domestic-violence/{epci}",
@@ -316,14 +358,12 @@ Ces statistiques permettent d'identifier les disparités territoriales en matiè
 violences intrafamiliales et de cibler les actions préventives et d'accompagnement.""",
     response_description="Liste des communes avec leurs statistiques de violences intrafamiliales, triée par taux moyen décroissant")
 @limiter.limit(DEFAULT_RATE)
-async def get_epci_domestic_violence(request: Request, epci: str):
+def get_epci_domestic_violence(request: Request, epci: str, service: PublicSafetyService = Depends(get_public_safety_service)):
     """
     Récupère les statistiques de violences intrafamiliales pour chaque commune d'un EPCI :
 
     - **epci**: Code de l'EPCI
     """
-    # Création d'une instance du service
-    service = PublicSafetyService()
     return service.get_domestic_violence_by_epci(epci)
 
 @router.get("/population/{epci}",
@@ -343,14 +383,12 @@ Cette vue agrégée permet d'analyser la structure démographique d'un territoir
 et de comparer le poids démographique de chaque commune constituante.""",
     response_description="Structure démographique complète de l'EPCI avec pyramide des âges détaillée")
 @limiter.limit(DEFAULT_RATE)
-async def get_epci_population(request: Request, epci: str):
+def get_epci_population(request: Request, epci: str, service: PopulationService = Depends(get_population_service)):
     """
     Obtient la pyramide des âges pour un EPCI en agrégeant les données des communes membres :
 
     - **epci**: Code de l'EPCI
     """
-    # Création d'une instance du service
-    service = PopulationService()
     return service.get_epci_population(epci)
 
 @router.get("/historical/{epci}/communes",
@@ -365,14 +403,12 @@ Les données incluent pour chaque commune :
 L'endpoint identifie également la commune la plus peuplée et celle ayant connu la plus forte croissance sur la période complète.""",
     response_description="Liste des communes avec leur historique de population, triée par population décroissante")
 @limiter.limit(DEFAULT_RATE)
-async def get_epci_historical_population(request: Request, epci: str):
+def get_epci_historical_population(request: Request, epci: str, service: HistoricalService = Depends(get_historical_service)):
     """
     Récupère l'évolution historique de population pour chaque commune d'un EPCI :
 
     - **epci**: Code de l'EPCI
     """
-    # Création d'une instance du service
-    service = HistoricalService()
     return service.get_communes_historical_by_epci(epci)
 
 @router.get("/births/{epci}/communes",
@@ -388,12 +424,17 @@ Les données incluent pour chaque commune :
 L'endpoint identifie également la commune avec le plus grand nombre de naissances.""",
     response_description="Liste des communes avec leurs données de naissances, triée par nombre de naissances décroissant")
 @limiter.limit(DEFAULT_RATE)
-async def get_epci_communes_births(request: Request, epci: str):
+def get_epci_communes_births(
+    request: Request,
+    epci: str,
+    start_year: int = Query(None, description="Année de début (incluse)"),
+    end_year: int = Query(None, description="Année de fin (incluse)"),
+    service: BirthService = Depends(get_birth_service)
+):
     """
     Récupère les données de naissances pour chaque commune d'un EPCI :
 
     - **epci**: Code de l'EPCI
+    - **start_year** / **end_year**: Période (optionnelle)
     """
-    # Création d'une instance du service
-    service = BirthService()
-    return service.get_births_by_epci_communes(epci)
+    return service.get_births_by_epci_communes(epci, start_year, end_year)
@@ -37,7 +37,7 @@ _YEAR_QUERY = Query(
 )
 @limiter.limit(DEFAULT_RATE)
 async def get_available_years(request: Request):
-    years = iris_pop.get_available_years()
+    years = await iris_pop.get_available_years_async()
     return {
         "available_years": years,
         "latest_year":     max(years) if years else None,
@@ -60,7 +60,7 @@ async def get_iris_population(
     iris_code: str,
     year: Optional[int] = _YEAR_QUERY,
 ):
-    result = iris_pop.get_by_iris(iris_code, year)
+    result = await iris_pop.get_by_iris_async(iris_code, year)
     if not result:
         raise HTTPException(
             status_code=404,
@@ -84,7 +84,7 @@ async def get_commune_iris_population(
     com_code: str,
     year: Optional[int] = _YEAR_QUERY,
 ):
-    result = iris_pop.get_by_commune(com_code, year)
+    result = await iris_pop.get_by_commune_async(com_code, year)
     if not result["iris_list"]:
         raise HTTPException(
             status_code=404,
@@ -108,7 +108,7 @@ async def get_epci_iris_population(
     epci_code: str,
     year: Optional[int] = _YEAR_QUERY,
 ):
-    result = iris_pop.get_by_epci(epci_code, year)
+    result = await iris_pop.get_by_epci_async(epci_code, year)
     if not result["iris_list"]:
         raise HTTPException(
             status_code=404,
@@ -132,7 +132,7 @@ async def get_department_iris_population(
     dep_code: str,
     year: Optional[int] = _YEAR_QUERY,
 ):
-    result = iris_pop.get_by_department(dep_code, year)
+    result = await iris_pop.get_by_department_async(dep_code, year)
     if not result["iris_list"]:
         raise HTTPException(
             status_code=404,
@@ -156,7 +156,7 @@ async def get_region_iris_population(
     reg_code: str,
     year: Optional[int] = _YEAR_QUERY,
 ):
-    result = iris_pop.get_by_region(reg_code, year)
+    result = await iris_pop.get_by_region_async(reg_code, year)
     if not result["iris_list"]:
         raise HTTPException(
             status_code=404,
@@ -32,7 +32,7 @@ _YEAR_QUERY = Query(
 @router.get("/activity/years", summary="Millésimes disponibles — Activité")
 @limiter.limit(DEFAULT_RATE)
 async def get_activity_years(request: Request):
-    years = iris_activity_svc.get_available_years()
+    years = await iris_activity_svc.get_available_years_async()
     return {"available_years": years, "latest_year": max(years) if years else None}
 
 
@@ -41,7 +41,7 @@ async def get_activity_years(request: Request):
 async def get_iris_activity(
     request: Request, iris_code: str, year: Optional[int] = _YEAR_QUERY,
 ):
-    result = iris_activity_svc.get_by_iris(iris_code, year)
+    result = await iris_activity_svc.get_by_iris_async(iris_code, year)
     if not result:
         raise HTTPException(status_code=404, detail=f"IRIS {iris_code!r} introuvable")
     return result
@@ -52,7 +52,7 @@ async def get_iris_activity(
 async def get_commune_iris_activity(
     request: Request, com_code: str, year: Optional[int] = _YEAR_QUERY,
 ):
-    result = iris_activity_svc.get_by_commune(com_code, year)
+    result = await iris_activity_svc.get_by_commune_async(com_code, year)
     if not result["iris_list"]:
         raise HTTPException(status_code=404, detail=f"Aucun IRIS trouvé pour la commune {com_code!r}")
     return result
@@ -63,7 +63,7 @@ async def get_commune_iris_activity(
 async def get_epci_iris_activity(
     request: Request, epci_code: str, year: Optional[int] = _YEAR_QUERY,
 ):
-    result = iris_activity_svc.get_by_epci(epci_code, year)
+    result = await iris_activity_svc.get_by_epci_async(epci_code, year)
     if not result["iris_list"]:
         raise HTTPException(status_code=404, detail=f"Aucun IRIS trouvé pour l'EPCI {epci_code!r}")
     return result
@@ -74,7 +74,7 @@ async def get_epci_iris_activity(
 async def get_department_iris_activity(
     request: Request, dep_code: str, year: Optional[int] = _YEAR_QUERY,
 ):
-    result = iris_activity_svc.get_by_department(dep_code, year)
+    result = await iris_activity_svc.get_by_department_async(dep_code, year)
     if not result["iris_list"]:
         raise HTTPException(status_code=404, detail=f"Aucun IRIS trouvé pour le département {dep_code!r}")
     return result
@@ -85,7 +85,7 @@ async def get_department_iris_activity(
 async def get_region_iris_activity(
     request: Request, reg_code: str, year: Optional[int] = _YEAR_QUERY,
 ):
-    result = iris_activity_svc.get_by_region(reg_code, year)
+    result = await iris_activity_svc.get_by_region_async(reg_code, year)
     if not result["iris_list"]:
         raise HTTPException(status_code=404, detail=f"Aucun IRIS trouvé pour la région {reg_code!r}")
     return result
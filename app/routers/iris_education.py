@@ -32,7 +32,7 @@ _YEAR_QUERY = Query(
 @router.get("/education/years", summary="Millésimes disponibles — Diplômes et formation")
 @limiter.limit(DEFAULT_RATE)
 async def get_education_years(request: Request):
-    years = iris_edu_svc.get_available_years()
+    years = await iris_edu_svc.get_available_years_async()
     return {"available_years": years, "latest_year": max(years) if years else None}
 
 
@@ -43,7 +43,7 @@ async def get_iris_education(
     iris_code: str,
     year: Optional[int] = _YEAR_QUERY,
 ):
-    result = iris_edu_svc.get_by_iris(iris_code, year)
+    result = await iris_edu_svc.get_by_iris_async(iris_code, year)
     if not result:
         raise HTTPException(status_code=404, detail=f"IRIS {iris_code!r} introuvable")
     return result
@@ -56,7 +56,7 @@ async def get_commune_iris_education(
     com_code: str,
     year: Optional[int] = _YEAR_QUERY,
 ):
-    result = iris_edu_svc.get_by_commune(com_code, year)
+    result = await iris_edu_svc.get_by_commune_async(com_code, year)
     if not result["iris_list"]:
         raise HTTPException(status_code=404, detail=f"Aucun IRIS trouvé pour la commune {com_code!r}")
     return result
@@ -69,7 +69,7 @@ async def get_epci_iris_education(
     epci_code: str,
     year: Optional[int] = _YEAR_QUERY,
 ):
-    result = iris_edu_svc.get_by_epci(epci_code, year)
+    result = await iris_edu_svc.get_by_epci_async(epci_code, year)
     if not result["iris_list"]:
         raise HTTPException(status_code=404, detail=f"Aucun IRIS trouvé pour l'EPCI {epci_code!r}")
     return result
@@ -82,7 +82,7 @@ async def get_department_iris_education(
     dep_code: str,
     year: Optional[int] = _YEAR_QUERY,
 ):
-    result = iris_edu_svc.get_by_department(dep_code, year)
+    result = await iris_edu_svc.get_by_department_async(dep_code, year)
     if not result["iris_list"]:
         raise HTTPException(status_code=404, detail=f"Aucun IRIS trouvé pour le département {dep_code!r}")
     return result
@@ -95,7 +95,7 @@ async def get_region_iris_education(
     reg_code: str,
     year: Optional[int] = _YEAR_QUERY,
 ):
-    result = iris_edu_svc.get_by_region(reg_code, year)
+    result = await iris_edu_svc.get_by_region_async(reg_code, year)
     if not result["iris_list"]:
         raise HTTPException(status_code=404, detail=f"Aucun IRIS trouvé pour la région {reg_code!r}")
     return result
@@ -37,7 +37,7 @@ _YEAR_QUERY = Query(
 )
 @limiter.limit(DEFAULT_RATE)
 async def get_families_years(request: Request):
-    years = iris_fam_svc.get_available_years()
+    years = await iris_fam_svc.get_available_years_async()
     return {"available_years": years, "latest_year": max(years) if years else None}
 
 
@@ -53,7 +53,7 @@ async def get_iris_families(
     iris_code: str,
     year: Optional[int] = _YEAR_QUERY,
 ):
-    result = iris_fam_svc.get_by_iris(iris_code, year)
+    result = await iris_fam_svc.get_by_iris_async(iris_code, year)
     if not result:
         raise HTTPException(status_code=404, detail=f"IRIS {iris_code!r} introuvable")
     return result
@@ -71,7 +71,7 @@ async def get_commune_iris_families(
     com_code: str,
     year: Optional[int] = _YEAR_QUERY,
 ):
-    result = iris_fam_svc.get_by_commune(com_code, year)
+    result = await iris_fam_svc.get_by_commune_async(com_code, year)
     if not result["iris_list"]:
         raise HTTPException(status_code=404, detail=f"Aucun IRIS trouvé pour la commune {com_code!r}")
     return result
@@ -89,7 +89,7 @@ async def get_epci_iris_families(
     epci_code: str,
     year: Optional[int] = _YEAR_QUERY,
 ):
-    result = iris_fam_svc.get_by_epci(epci_code, year)
+    result = await iris_fam_svc.get_by_epci_async(epci_code, year)
     if not result["iris_list"]:
         raise HTTPException(status_code=404, detail=f"Aucun IRIS trouvé pour l'EPCI {epci_code!r}")
     return result
@@ -107,7 +107,7 @@ async def get_department_iris_families(
     dep_code: str,
     year: Optional[int] = _YEAR_QUERY,
 ):
-    result = iris_fam_svc.get_by_department(dep_code, year)
+    result = await iris_fam_svc.get_by_department_async(dep_code, year)
     if not result["iris_list"]:
         raise HTTPException(status_code=404, detail=f"Aucun IRIS trouvé pour le département {dep_code!r}")
     return result
@@ -125,7 +125,7 @@ async def get_region_iris_families(
     reg_code: str,
     year: Optional[int] = _YEAR_QUERY,
 ):
-    result = iris_fam_svc.get_by_region(reg_code, year)
+    result = await iris_fam_svc.get_by_region_async(reg_code, year)
     if not result["iris_list"]:
         raise HTTPException(status_code=404, detail=f"Aucun IRIS trouvé pour la région {reg_code!r}")
     return result
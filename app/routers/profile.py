@@ -0,0 +1,65 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, Request, HTTPException, Query, status
+from app.security import get_current_user
+from slowapi import Limiter
+from slowapi.util import get_remote_address
+
+from app.services.profile_service import ProfileService, PROFILE_LEVELS, available_sections
+from app.territory import get_territory_index_async
+
+# Créer un routeur
+router = APIRouter(
+    prefix="/profile",
+    tags=["Profile"],
+    dependencies=[Depends(get_current_user)]
+)
+
+# Définir les limites de taux (une fiche exécute une quinzaine de requêtes)
+PROFILE_RATE = "20/minute"
+
+# Créer une instance du limiter
+limiter = Limiter(key_func=get_remote_address)
+profile_service = ProfileService()
+
+@router.get("/{level}/{code}",
+    summary="Obtenir la fiche complète d'un territoire",
+    description="Rassemble en un seul appel tous les indicateurs d'un territoire (population, historique, naissances, revenus, accueil du jeune enfant, familles, sécurité, emploi, scolarisation, emploi des parents et thèmes IRIS). Les sections sont interrogées en parallèle, chacune sur sa propre connexion.",
+    response_description="Données par section, erreurs éventuelles par section et temps d'exécution de chaque section en millisecondes")
+@limiter.limit(PROFILE_RATE)
+async def get_profile(
+    request: Request,
+    level: str,
+    code: str,
+    sections: Optional[str] = Query(None, description="Sections à inclure, séparées par des virgules (ex. population,revenues). Toutes les sections disponibles si absent.")
+):
+    """
+    Niveaux : commune, epci, department, region, france (code ignoré, utiliser FR).
+
+    Chaque section est exécutée indépendamment : une section en échec apparaît
+    dans **errors** et n'empêche pas le reste de la fiche. **timings_ms** donne
+    la durée de chaque section et **total_ms** celle de la fiche.
+    """
+    if level not in PROFILE_LEVELS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Niveau inconnu : {level} (attendu : {', '.join(PROFILE_LEVELS)})"
+        )
+    if level != "france" and not (await get_territory_index_async()).contains(level, code):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Territoire {level} {code} introuvable"
+        )
+
+    available = available_sections(level)
+    if sections:
+        requested = list(dict.fromkeys(name.strip() for name in sections.split(",") if name.strip()))
+        unknown = [name for name in requested if name not in available]
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Sections indisponibles pour le niveau {level} : {', '.join(unknown)} (disponibles : {', '.join(available)})"
+            )
+    else:
+        requested = available
+
+    return await profile_service.get_profile(level, code, requested)
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Dict, Optional, List
+from typing import Any, Dict, Literal, Optional, List
 from datetime import datetime
 
 class BirthSchema(BaseModel):
@@ -98,6 +98,28 @@ class PopulationChildrenFrance(BaseModel):
     departments_count: int
     regions_count: int
 
+class CommuneChildrenData(PopulationChildrenRate):
+    code: str
+    name: str
+
+class DepartmentCommunesChildrenResponse(BaseModel):
+    department: str
+    communes_count: int
+    sort_by: str
+    order: str
+    limit: int
+    offset: int
+    communes: List[CommuneChildrenData]
+
+class RegionCommunesChildrenResponse(BaseModel):
+    region: str
+    communes_count: int
+    sort_by: str
+    order: str
+    limit: int
+    offset: int
+    communes: List[CommuneChildrenData]
+
 class GeoCode(BaseModel):
     CODE: str
     LIBELLE: str
@@ -192,6 +214,10 @@ class PublicSafetyResponse(BaseModel):
     department: GeoLevelData
     region: GeoLevelData
 
+class PublicSafetyCommunesResponse(BaseModel):
+    count: int
+    results: List[PublicSafetyResponse]
+
 class EmploymentRates(BaseModel):
     activity_rate: float
     employment_rate: float
@@ -202,7 +228,9 @@ class EmploymentResponse(BaseModel):
     territory_type: str
     code: str
     name: str
+    year: Optional[int] = None
     rates: EmploymentRates
+    rates_by_year: Dict[int, EmploymentRates] = {}
 
 class SchoolingData(BaseModel):
     # Pour les 2 ans
@@ -277,10 +305,38 @@ class CommuneSchoolingRate(BaseModel):
 class EPCICommunesSchoolingResponse(BaseModel):
     epci: str
     epci_name: str
-    year: int
+    year: Optional[int] = None
     communes_count: int
     average_schooling_rate_2y: float
     average_schooling_rate_3_5y: float
+    sort_by: str = "2y"
+    order: str = "desc"
+    limit: Optional[int] = None
+    offset: int = 0
+    communes: List[CommuneSchoolingRate]
+
+class DepartmentCommunesSchoolingResponse(BaseModel):
+    department: str
+    year: Optional[int] = None
+    communes_count: int
+    average_schooling_rate_2y: float
+    average_schooling_rate_3_5y: float
+    sort_by: str
+    order: str
+    limit: Optional[int] = None
+    offset: int
+    communes: List[CommuneSchoolingRate]
+
+class RegionCommunesSchoolingResponse(BaseModel):
+    region: str
+    year: Optional[int] = None
+    communes_count: int
+    average_schooling_rate_2y: float
+    average_schooling_rate_3_5y: float
+    sort_by: str
+    order: str
+    limit: Optional[int] = None
+    offset: int
     communes: List[CommuneSchoolingRate]
 
 class CommuneFamilyData(BaseModel):
@@ -350,6 +406,15 @@ class EPCILargeFamiliesResponse(BaseModel):
     epci_families_4_plus_percentage: float
     communes: List[CommuneLargeFamilyData]
 
+class EPCIFamilyStructureResponse(BaseModel):
+    epci: str
+    epci_name: str
+    year: int
+    communes_count: int
+    couples_with_children: EPCICoupleWithChildrenResponse
+    single_parent_families: EPCISingleParentResponse
+    large_families: EPCILargeFamiliesResponse
+
 class CommuneFamilyEmploymentData(BaseModel):
     code: str
     name: str
@@ -373,6 +438,33 @@ class EPCIFamilyEmploymentResponse(BaseModel):
     epci_single_parent_active_rate: float
     communes: List[CommuneFamilyEmploymentData]
 
+class EPCIFamilyEmploymentAllAgesResponse(BaseModel):
+    epci: str
+    epci_name: str
+    year: int
+    communes_count: int
+    under_3: EPCIFamilyEmploymentResponse
+    three_to_five: EPCIFamilyEmploymentResponse
+
+class DepartmentFamilyEmploymentResponse(BaseModel):
+    department: str
+    year: int
+    age_group: str
+    communes_count: int
+    total_families: float
+    total_dual_active: float
+    total_single_parent_active: float
+    department_dual_active_rate: float
+    department_single_parent_active_rate: float
+    communes: List[CommuneFamilyEmploymentData]
+
+class DepartmentFamilyEmploymentAllAgesResponse(BaseModel):
+    department: str
+    year: int
+    communes_count: int
+    under_3: DepartmentFamilyEmploymentResponse
+    three_to_five: DepartmentFamilyEmploymentResponse
+
 class CommuneEmploymentRates(BaseModel):
     code: str
     name: str
@@ -439,6 +531,43 @@ class EPCIPopulationResponse(BaseModel):
     population_by_age: List[AgePopulationData]
     communes: List[CommunePopulationInfo]
 
+class SubdivisionPopulationInfo(BaseModel):
+    code: str
+    name: str
+    population: float
+
+class DepartmentPopulationResponse(BaseModel):
+    department: str
+    communes_count: int
+    total_population: float
+    men_count: float
+    women_count: float
+    gender_ratio: GenderRatio
+    population_by_age: List[AgePopulationData]
+    communes: List[CommunePopulationInfo]
+
+class RegionPopulationResponse(BaseModel):
+    region: str
+    communes_count: int
+    departments_count: int
+    total_population: float
+    men_count: float
+    women_count: float
+    gender_ratio: GenderRatio
+    population_by_age: List[AgePopulationData]
+    departments: List[SubdivisionPopulationInfo]
+
+class FrancePopulationResponse(BaseModel):
+    communes_count: int
+    departments_count: int
+    regions_count: int
+    total_population: float
+    men_count: float
+    women_count: float
+    gender_ratio: GenderRatio
+    population_by_age: List[AgePopulationData]
+    regions: List[SubdivisionPopulationInfo]
+
 class CommuneHistoricalData(BaseModel):
     code: str
     name: str
@@ -471,3 +600,32 @@ class EPCICommunesBirthsResponse(BaseModel):
     highest_births_commune: Optional[str] = None
     epci_births_by_year: Dict[int, float]  # Nouveau champ pour les naissances par année au niveau EPCI
     communes: List[CommuneBirthData]
+
+class DepartmentCommunesBirthsResponse(BaseModel):
+    department: str
+    communes_count: int
+    total_births: float
+    years_available: List[int]
+    highest_births_commune: Optional[str] = None
+    department_births_by_year: Dict[int, float]
+    communes: List[CommuneBirthData]
+
+class BatchItem(BaseModel):
+    indicator: Literal["population_children", "revenues", "employment_rates", "childcare_coverage"]
+    level: Literal["commune", "epci", "department", "region", "france"]
+    code: Optional[str] = None  # Ignoré pour la France
+    year: Optional[int] = None  # Tous les millésimes (ou le dernier) si absent
+
+class BatchRequest(BaseModel):
+    items: List[BatchItem]
+
+class BatchResult(BaseModel):
+    indicator: str
+    level: str
+    code: str
+    year: Optional[int] = None
+    data: Optional[Dict[Any, Any]] = None
+
+class BatchResponse(BaseModel):
+    count: int
+    results: List[BatchResult]
@@ -28,6 +28,12 @@ else:
 ALGORITHM = os.environ.get("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.environ.get("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
 
+# Utilisateurs autorisés sur les endpoints d'exploitation (/internal/*), séparés
+# par des virgules ; vide : ces endpoints sont refusés à tous
+INTERNAL_API_USERS = {
+    username.strip() for username in os.environ.get("INTERNAL_API_USERS", "").split(",") if username.strip()
+}
+
 # Contexte de cryptage pour les mots de passe
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
@@ -58,7 +64,15 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)):
+def verify_token(token: str) -> Optional[str]:
+    """Vérifie la signature et l'expiration d'un jeton, sans accès à la base (retourne le username ou None)."""
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    return payload.get("sub")
+
+def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -77,3 +91,12 @@ async def get_current_user(db: Session = Depends(get_db), token: str = Depends(o
     if user is None:
         raise credentials_exception
     return user
+
+def get_internal_user(user: User = Depends(get_current_user)):
+    """Utilisateur authentifié et listé dans INTERNAL_API_USERS (endpoints /internal/*)."""
+    if user.username not in INTERNAL_API_USERS:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Accès réservé à l'exploitation",
+        )
+    return user
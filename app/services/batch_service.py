@@ -0,0 +1,167 @@
+from collections import defaultdict
+from sqlalchemy.orm import Session
+from sqlalchemy import tuple_, or_
+from app.database import ReadSessionLocal
+from app.models import PopulationChildrenRollup, Revenue, Childcare
+from app.rollup_engine import FRANCE_CODE
+from app.services.employment_service import EmploymentService
+
+# Indicateurs disponibles dans POST /batch
+BATCH_INDICATORS = ("population_children", "revenues", "employment_rates", "childcare_coverage")
+
+_COVERAGE_COLUMNS = {
+    "eaje_psu": "eaje_psu",
+    "eaje_hors_psu": "eaje_hors_psu",
+    "eaje_total": "eaje_total",
+    "preschool": "preschool",
+    "childminder": "childminder",
+    "home_care": "home_care",
+    "individual_total": "individual_total",
+    "global": "global_rate",
+}
+
+
+def _rate(numerator, denominator):
+    return float(numerator / denominator * 100) if denominator > 0 else 0
+
+
+class BatchService:
+    """
+    Réponses groupées : les demandes (indicateur, niveau, code, année) sont
+    regroupées par indicateur et chaque indicateur est servi par une seule
+    requête ensembliste (IN sur les couples (niveau, code)).
+    """
+
+    def __init__(self, db: Session = None):
+        # Session fournie par la requête (Depends(get_read_db)) ou session propre au service
+        self.db = db if db is not None else ReadSessionLocal()
+
+    def close(self):
+        """Ferme la connexion à la base de données"""
+        self.db.close()
+
+    def run(self, items: list) -> list:
+        """
+        `items` : liste de tuples (indicator, level, code, year). Retourne les
+        résultats dans l'ordre de la demande (data à None si pas de données).
+        """
+        try:
+            items = [
+                (indicator, level, FRANCE_CODE if level == "france" else str(code), year)
+                for indicator, level, code, year in items
+            ]
+            by_indicator = defaultdict(list)
+            for indicator, level, code, year in items:
+                by_indicator[indicator].append((level, code, year))
+
+            handlers = {
+                "population_children": self._population_children,
+                "revenues": self._revenues,
+                "employment_rates": self._employment_rates,
+                "childcare_coverage": self._childcare_coverage,
+            }
+            found = {}
+            for indicator, requests in by_indicator.items():
+                for key, data in handlers[indicator](requests).items():
+                    found[(indicator, *key)] = data
+
+            return [
+                {
+                    "indicator": indicator,
+                    "level": level,
+                    "code": code,
+                    "year": year,
+                    "data": found.get((indicator, level, code, year)),
+                }
+                for indicator, level, code, year in items
+            ]
+        finally:
+            self.close()
+
+    def _population_children(self, requests: list) -> dict:
+        """Totaux et taux d'enfants, lus dans population_children_rollup (millésime unique)."""
+        pairs = {(level, code) for level, code, _ in requests}
+        rows = self.db.query(PopulationChildrenRollup).filter(
+            tuple_(PopulationChildrenRollup.level, PopulationChildrenRollup.code).in_(pairs)
+        ).all()
+        by_key = {(row.level, row.code): row for row in rows}
+
+        result = {}
+        for level, code, year in requests:
+            row = by_key.get((level, code))
+            if row is not None:
+                result[(level, code, year)] = {
+                    "total_population": float(row.total),
+                    "children_under_3": float(row.under_3),
+                    "children_3_to_5": float(row.three_to_five),
+                    "under_3_rate": _rate(row.under_3, row.total),
+                    "three_to_five_rate": _rate(row.three_to_five, row.total),
+                }
+        return result
+
+    def _revenues(self, requests: list) -> dict:
+        """Revenus médians et taux de pauvreté par année (tous les millésimes si year est absent)."""
+        pairs = {(level, code) for level, code, _ in requests if level != "france"}
+        conditions = []
+        if pairs:
+            conditions.append(tuple_(Revenue.geo_type, Revenue.geo_code).in_(pairs))
+        if any(level == "france" for level, _, _ in requests):
+            conditions.append(Revenue.geo_type == "france")
+        rows = self.db.query(
+            Revenue.geo_type, Revenue.geo_code, Revenue.year, Revenue.median_revenue, Revenue.poverty_rate
+        ).filter(or_(*conditions)).order_by(Revenue.year).all()
+
+        by_key = defaultdict(list)
+        for row in rows:
+            by_key[(row.geo_type, FRANCE_CODE if row.geo_type == "france" else row.geo_code)].append(row)
+
+        result = {}
+        for level, code, year in requests:
+            records = [r for r in by_key.get((level, code), []) if year is None or r.year == year]
+            if records:
+                result[(level, code, year)] = {
+                    "median_revenues": {r.year: r.median_revenue for r in records},
+                    "poverty_rates": {r.year: r.poverty_rate for r in records},
+                }
+        return result
+
+    def _employment_rates(self, requests: list) -> dict:
+        """
+        Taux d'emploi des femmes, servis par le moteur d'agrégation (tous niveaux,
+        toutes années) ; une requête par demande tant que ses agrégats ne sont pas prêts.
+        """
+        employment = EmploymentService(self.db)
+        result = {}
+        for level, code, year in requests:
+            rates_by_year = employment.rates_by_year(level, code, year)
+            if rates_by_year:
+                resolved_year = year if year is not None else max(rates_by_year)
+                result[(level, code, year)] = {"year": resolved_year, **rates_by_year[resolved_year]}
+        return result
+
+    def _childcare_coverage(self, requests: list) -> dict:
+        """Taux de couverture des modes d'accueil par année."""
+        pairs = {(level, code) for level, code, _ in requests}
+        rows = self.db.query(Childcare).filter(
+            tuple_(Childcare.territory_type, Childcare.territory_code).in_(pairs)
+        ).order_by(Childcare.year.desc()).all()
+
+        by_key = defaultdict(list)
+        for row in rows:
+            by_key[(row.territory_type, row.territory_code)].append(row)
+
+        result = {}
+        for level, code, year in requests:
+            records = [r for r in by_key.get((level, code), []) if year is None or r.year == year]
+            if records:
+                result[(level, code, year)] = {
+                    r.year: {
+                        "territory_name": r.territory_name,
+                        "coverage_rates": {
+                            name: getattr(r, column) if getattr(r, column) is not None else 0.0
+                            for name, column in _COVERAGE_COLUMNS.items()
+                        },
+                    }
+                    for r in records
+                }
+        return result
@@ -1,11 +1,17 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from app.database import SessionLocal
+from sqlalchemy import func, and_
+from app.database import ReadSessionLocal
 from app.models import Birth, GeoCode
+from app.territory import get_territory_index
 
 class BirthService:
-    def __init__(self):
-        self.db = SessionLocal()
+    def __init__(self, db: Session = None):
+        # Session fournie par la requête (Depends(get_read_db)) ou session propre au service
+        self.db = db if db is not None else ReadSessionLocal()
+
+    def close(self):
+        """Ferme la connexion à la base de données"""
+        self.db.close()
 
     def get_by_code(self, geo: str):
         """
@@ -31,117 +37,122 @@ class BirthService:
         )
         return {year: births for year, births in results}
 
-    def get_births_by_epci_communes(self, epci: str):
+    def _communes_births(self, column, code: str, start_year: int = None, end_year: int = None) -> dict:
+        """
+        Naissances de toutes les communes d'un territoire en 1 requête
+        (commune, année, somme), pivotée en mémoire. Les communes sans naissances
+        sont gardées (LEFT JOIN, filtres sur births dans la condition de jointure).
+        """
+        join_conditions = [Birth.geo == GeoCode.codgeo, Birth.geo_object == "COM"]
+        if start_year is not None:
+            join_conditions.append(Birth.time_period >= start_year)
+        if end_year is not None:
+            join_conditions.append(Birth.time_period <= end_year)
+
+        rows = self.db.query(
+            GeoCode.codgeo,
+            GeoCode.libgeo,
+            Birth.time_period,
+            func.sum(Birth.obs_value).label('births')
+        ).outerjoin(
+            Birth, and_(*join_conditions)
+        ).filter(
+            column == str(code)
+        ).group_by(
+            GeoCode.codgeo,
+            GeoCode.libgeo,
+            Birth.time_period
+        ).order_by(
+            GeoCode.codgeo,
+            Birth.time_period
+        ).all()
+
+        communes = {}
+        births_by_year = {}
+        for codgeo, name, year, births in rows:
+            commune = communes.setdefault(codgeo, {
+                "code": codgeo,
+                "name": name,
+                "births_by_year": {},
+                "total_births": 0.0,
+                "latest_year": None
+            })
+            if year is None:
+                continue
+            count = float(births or 0)
+            commune["births_by_year"][year] = count
+            commune["total_births"] += count
+            commune["latest_year"] = year  # lignes triées par année croissante
+            births_by_year[year] = births_by_year.get(year, 0.0) + count
+
+        # Trier les communes par nombre total de naissances décroissant
+        communes_data = sorted(communes.values(), key=lambda x: x["total_births"], reverse=True)
+        highest = communes_data[0] if communes_data and communes_data[0]["total_births"] > 0 else None
+
+        return {
+            "communes_count": len(communes_data),
+            "total_births": sum(births_by_year.values()),
+            "years_available": sorted(births_by_year),
+            "highest_births_commune": highest["name"] if highest else None,
+            "births_by_year": dict(sorted(births_by_year.items())),
+            "communes": communes_data
+        }
+
+    def get_births_by_epci_communes(self, epci: str, start_year: int = None, end_year: int = None):
         """Récupère les données de naissances pour toutes les communes d'un EPCI"""
         try:
-            # Établir une connexion à la base de données
-            db = SessionLocal()
-
-            # Récupérer les communes de l'EPCI
-            communes = db.query(GeoCode.codgeo, GeoCode.libgeo).filter(GeoCode.epci == str(epci)).all()
-
-            if not communes:
+            data = self._communes_births(GeoCode.epci, epci, start_year, end_year)
+            if not data["communes_count"]:
                 return {
                     "epci": epci,
                     "epci_name": "",
                     "communes_count": 0,
                     "total_births": 0.0,
                     "years_available": [],
+                    "epci_births_by_year": {},
                     "communes": []
                 }
 
-            # Récupérer le nom de l'EPCI
-            epci_info = db.query(GeoCode.libepci).filter(GeoCode.epci == str(epci)).first()
-            epci_name = epci_info[0] if epci_info else f"EPCI {epci}"
-
-            # Récupérer les données pour chaque commune
-            communes_data = []
-            epci_births_by_year = {}
-            all_years = set()
-            highest_births = 0
-            highest_births_commune = None
-
-            for code, name in communes:
-                code_str = str(code).strip()
-
-                print(f"Récupération des naissances pour {name} (code: {code_str})")
-
-                # Filtrer sur geo ET geo_object pour obtenir uniquement les données communales
-                births_data = db.query(
-                    Birth.time_period,
-                    func.sum(Birth.obs_value).label('total_births')
-                ).filter(
-                    Birth.geo == code_str,
-                    Birth.geo_object == "COM"  # Filtrer uniquement les données communales
-                ).group_by(
-                    Birth.time_period
-                ).order_by(
-                    Birth.time_period
-                ).all()
-
-                print(f"  -> {len(births_data)} années trouvées")
-
-                births_by_year = {}
-                total_births = 0
-
-                for year, count in births_data:
-                    count_float = float(count)
-                    births_by_year[year] = count_float
-                    total_births += count_float
-                    all_years.add(year)
-
-                    print(f"  -> Année {year}: {count_float} naissances")
-
-                    # Mettre à jour les totaux de l'EPCI
-                    if year not in epci_births_by_year:
-                        epci_births_by_year[year] = 0
-                    epci_births_by_year[year] += count_float
-
-                latest_year = max(births_by_year.keys()) if births_by_year else None
-
-                communes_data.append({
-                    "code": code_str,
-                    "name": name,
-                    "births_by_year": births_by_year,
-                    "total_births": total_births,
-                    "latest_year": latest_year
-                })
-
-                # Identifier la commune avec le plus de naissances
-                if total_births > highest_births:
-                    highest_births = total_births
-                    highest_births_commune = name
-
-            # Trier les communes par nombre total de naissances décroissant
-            communes_data.sort(key=lambda x: x["total_births"], reverse=True)
-
-            # Calculer le total des naissances pour l'EPCI
-            total_epci_births = sum(epci_births_by_year.values())
-
-            # Trier les années disponibles
-            years_available = sorted(list(all_years))
-
+            epci_births_by_year = data.pop("births_by_year")
             return {
                 "epci": epci,
-                "epci_name": epci_name,
-                "communes_count": len(communes),
-                "total_births": total_epci_births,
-                "years_available": years_available,
-                "highest_births_commune": highest_births_commune,
-                "epci_births_by_year": epci_births_by_year,  # Ajout des naissances par année pour l'EPCI
-                "communes": communes_data
+                "epci_name": get_territory_index().name_of("epci", epci) or f"EPCI {epci}",
+                **data,
+                "epci_births_by_year": epci_births_by_year
             }
         except Exception as e:
             print(f"Erreur lors de la récupération des naissances pour l'EPCI {epci}: {str(e)}")
-            import traceback
-            print(traceback.format_exc())
             return {
                 "epci": epci,
                 "epci_name": "",
                 "communes_count": 0,
                 "total_births": 0.0,
                 "years_available": [],
+                "epci_births_by_year": {},
+                "communes": []
+            }
+        finally:
+            self.close()
+
+    def get_births_by_department_communes(self, dep: str, start_year: int = None, end_year: int = None):
+        """Récupère les données de naissances pour toutes les communes d'un département"""
+        try:
+            data = self._communes_births(GeoCode.dep, dep, start_year, end_year)
+            department_births_by_year = data.pop("births_by_year")
+            return {
+                "department": dep,
+                **data,
+                "department_births_by_year": department_births_by_year
+            }
+        except Exception as e:
+            print(f"Erreur lors de la récupération des naissances pour le département {dep}: {str(e)}")
+            return {
+                "department": dep,
+                "communes_count": 0,
+                "total_births": 0.0,
+                "years_available": [],
+                "department_births_by_year": {},
                 "communes": []
             }
         finally:
-            db.close()
+            self.close()
@@ -1,12 +1,14 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import func, and_, or_, desc
 from typing import Dict, Optional, List, Any
-from app.database import SessionLocal
+from app.database import ReadSessionLocal
 from app.models import Childcare, GeoCode
+from app.request_status import mark_failed
 
 class ChildcareService:
-    def __init__(self):
-        self.db = SessionLocal()
+    def __init__(self, db: Session = None):
+        # Session fournie par la requête (Depends(get_read_db)) ou session propre au service
+        self.db = db if db is not None else ReadSessionLocal()
 
     def close(self):
         """Ferme la connexion à la base de données"""
@@ -68,6 +70,7 @@ class ChildcareService:
 
         except Exception as e:
             print(f"Erreur dans get_coverage_by_commune: {str(e)}")
+            mark_failed()
             return {"error": str(e)}
         finally:
             self.close()
@@ -124,6 +127,7 @@ class ChildcareService:
 
         except Exception as e:
             print(f"Erreur dans get_coverage_by_epci: {str(e)}")
+            mark_failed()
             return {"error": str(e)}
         finally:
             self.close()
@@ -180,6 +184,7 @@ class ChildcareService:
 
         except Exception as e:
             print(f"Erreur dans get_coverage_by_department: {str(e)}")
+            mark_failed()
             return {"error": str(e)}
         finally:
             self.close()
@@ -232,6 +237,7 @@ class ChildcareService:
 
         except Exception as e:
             print(f"Erreur dans get_coverage_by_region: {str(e)}")
+            mark_failed()
             return {"error": str(e)}
         finally:
             self.close()
@@ -281,8 +287,9 @@ class ChildcareService:
             }
 
         except Exception as e:
+            # Pas de réponse d'erreur en 200 : la réponse nationale est mise en cache (cached_response)
             print(f"Erreur dans get_coverage_france: {str(e)}")
-            return {"error": str(e)}
+            raise
         finally:
             self.close()
 
@@ -350,6 +357,7 @@ class ChildcareService:
 
         except Exception as e:
             print(f"Erreur dans get_evolution_by_territory_type: {str(e)}")
+            mark_failed()
             return {"error": str(e)}
         finally:
             self.close()
@@ -400,6 +408,7 @@ class ChildcareService:
 
         except Exception as e:
             print(f"Erreur dans get_comparative_data: {str(e)}")
+            mark_failed()
             return {"error": str(e)}
         finally:
             self.close()
@@ -407,8 +416,7 @@ class ChildcareService:
     def get_communes_coverage_by_epci(self, epci: str, year: int = None):
         """Récupère les taux de couverture pour toutes les communes d'un EPCI"""
         try:
-            # Établir une connexion à la base de données
-            db = SessionLocal()
+            db = self.db
 
             # Récupérer l'année la plus récente si non spécifiée
             if year is None:
@@ -482,4 +490,4 @@ class ChildcareService:
                 "communes": []
             }
         finally:
-            db.close()
+            self.close()
@@ -1,12 +1,50 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from typing import Dict
-from app.database import SessionLocal
+from app.database import ReadSessionLocal
 from app.models import Employment, GeoCode
+from app.territory import get_territory_index
+from app.rollup_engine import RollupSpec, register_rollup, current_rollup, FRANCE_CODE
+
+# Mesures d'emploi des femmes par commune et par année pour le moteur d'agrégation
+# (app/rollup_engine.py) ; mêmes taux que calculate_rates()
+WOMEN_EMPLOYMENT_ROLLUP = register_rollup(RollupSpec(
+    "women_employment", "employment",
+    sql="""
+        SELECT geo_code, year,
+               SUM(women_15_64), SUM(women_active_15_64), SUM(women_employed_15_64),
+               SUM(women_employees_25_54), SUM(women_part_time_25_54),
+               SUM(women_employees_15_64), SUM(women_part_time_15_64)
+        FROM employment
+        GROUP BY geo_code, year
+    """,
+    measures=(
+        "women_15_64", "women_active_15_64", "women_employed_15_64",
+        "women_employees_25_54", "women_part_time_25_54",
+        "women_employees_15_64", "women_part_time_15_64",
+    ),
+    ratios={
+        "activity_rate": ("women_active_15_64", "women_15_64", 100),
+        "employment_rate": ("women_employed_15_64", "women_15_64", 100),
+        "part_time_rate_25_54": ("women_part_time_25_54", "women_employees_25_54", 100),
+        "part_time_rate_15_64": ("women_part_time_15_64", "women_employees_15_64", 100),
+    },
+    key="year",
+))
+
+# Colonne de sélection des communes par niveau (None : France entière)
+_LEVEL_COLUMNS = {
+    "commune": Employment.geo_code,
+    "epci": GeoCode.epci,
+    "department": GeoCode.dep,
+    "region": GeoCode.reg,
+    "france": None,
+}
 
 class EmploymentService:
-    def __init__(self):
-        self.db = SessionLocal()
+    def __init__(self, db: Session = None):
+        # Session fournie par la requête (Depends(get_read_db)) ou session propre au service
+        self.db = db if db is not None else ReadSessionLocal()
 
     def close(self):
         """Ferme la connexion à la base de données"""
@@ -15,251 +53,152 @@ class EmploymentService:
     def calculate_rates(self, data: list) -> Dict:
         """Calcule tous les taux à partir des données"""
         try:
-            if not data:
-                return {
-                    "activity_rate": 0,
-                    "employment_rate": 0,
-                    "part_time_rate_25_54": 0,
-                    "part_time_rate_15_64": 0
-                }
-
-            # Agréger les données
-            women_total = sum(d.women_15_64 or 0 for d in data)
-            women_active = sum(d.women_active_15_64 or 0 for d in data)
-            women_employed = sum(d.women_employed_15_64 or 0 for d in data)
-            women_part_time_25_54 = sum(d.women_part_time_25_54 or 0 for d in data)
-            women_total_25_54 = sum(d.women_employees_25_54 or 0 for d in data)
-            women_part_time_15_64 = sum(d.women_part_time_15_64 or 0 for d in data)
-            women_total_15_64 = sum(d.women_employees_15_64 or 0 for d in data)
-
-            # Calculer les taux
-            activity_rate = (women_active / women_total * 100) if women_total > 0 else 0
-            employment_rate = (women_employed / women_total * 100) if women_total > 0 else 0
-            part_time_rate_25_54 = (women_part_time_25_54 / women_total_25_54 * 100) if women_total_25_54 > 0 else 0
-            part_time_rate_15_64 = (women_part_time_15_64 / women_total_15_64 * 100) if women_total_15_64 > 0 else 0
-
-            return {
-                "activity_rate": round(float(activity_rate), 2),
-                "employment_rate": round(float(employment_rate), 2),
-                "part_time_rate_25_54": round(float(part_time_rate_25_54), 2),
-                "part_time_rate_15_64": round(float(part_time_rate_15_64), 2)
-            }
+            return self._rates_from_sums({
+                measure: sum(getattr(d, measure) or 0 for d in data)
+                for measure in WOMEN_EMPLOYMENT_ROLLUP.measures
+            })
         except Exception as e:
             print(f"Erreur dans calculate_rates: {str(e)}")
             raise
 
-    def get_commune_rates(self, code: str):
-        """Récupère les taux pour une commune"""
+    @staticmethod
+    def _rates_from_sums(sums: Dict) -> Dict:
+        """Taux (arrondis à 2 décimales) à partir des sommes des mesures, 0 si dénominateur nul"""
+        rates = {}
+        for name, (numerator, denominator, scale) in WOMEN_EMPLOYMENT_ROLLUP.ratios.items():
+            den = float(sums.get(denominator) or 0)
+            rates[name] = round(float(sums.get(numerator) or 0) / den * scale, 2) if den > 0 else 0
+        return rates
+
+    def rates_by_year(self, level: str, code: str = None, year: int = None) -> Dict:
+        """
+        Taux par année d'un territoire ({année: taux}), lus dans les agrégats
+        du moteur (WOMEN_EMPLOYMENT_ROLLUP) quand ils sont prêts, sans requête ;
+        sinon calculés en SQL (_rates_by_year). Ne ferme pas la session.
+        """
+        rollup = current_rollup(WOMEN_EMPLOYMENT_ROLLUP)
+        if rollup is None:
+            return self._rates_by_year(_LEVEL_COLUMNS[level], code, year)
+
+        code = FRANCE_CODE if level == "france" else code
+        rates = {}
+        for key in rollup.keys():
+            if year is not None and key != year:
+                continue
+            values = rollup.get(level, code, key)
+            if values is not None:
+                rates[key] = {name: round(float(values[name]), 2) for name in WOMEN_EMPLOYMENT_ROLLUP.ratios}
+        return rates
+
+    def _rates_by_year(self, column=None, code: str = None, year: int = None) -> Dict:
+        """
+        Taux par année en une seule requête : les sept sommes sont calculées en SQL
+        (GROUP BY year), les communes étant sélectionnées par jointure sur geo_codes
+        (colonne `column` = `code`) ; sans colonne, toutes les communes (France).
+        Une commune est filtrée directement sur Employment.geo_code, sans jointure.
+        """
+        query = self.db.query(
+            Employment.year,
+            *(func.sum(getattr(Employment, measure)) for measure in WOMEN_EMPLOYMENT_ROLLUP.measures)
+        )
+        if column is Employment.geo_code:
+            query = query.filter(column == str(code))
+        elif column is not None:
+            query = query.join(GeoCode, GeoCode.codgeo == Employment.geo_code).filter(column == str(code))
+        if year is not None:
+            query = query.filter(Employment.year == year)
+
+        return {
+            row[0]: self._rates_from_sums(dict(zip(WOMEN_EMPLOYMENT_ROLLUP.measures, row[1:])))
+            for row in query.group_by(Employment.year).order_by(Employment.year).all()
+        }
+
+    def _rates_response(self, territory_type: str, code: str, name: str, rates_by_year: Dict, year: int = None) -> Dict:
+        """Réponse d'un territoire : taux de l'année demandée (ou la plus récente) et série annuelle"""
+        if year is None and rates_by_year:
+            year = max(rates_by_year)
+        return {
+            "territory_type": territory_type,
+            "code": code,
+            "name": name,
+            "year": year,
+            "rates": rates_by_year.get(year, self._rates_from_sums({})),
+            "rates_by_year": rates_by_year
+        }
+
+    def get_commune_rates(self, code: str, year: int = None):
+        """Récupère les taux pour une commune (année la plus récente si year est absent)"""
         try:
-            # Récupérer les informations géographiques
-            geo_info = self.db.query(GeoCode).filter(GeoCode.codgeo == str(code)).first()
-            if not geo_info:
-                return {
-                    "territory_type": "commune",
-                    "code": code,
-                    "name": "Commune inconnue",
-                    "rates": {
-                        "activity_rate": 0,
-                        "employment_rate": 0,
-                        "part_time_rate_25_54": 0,
-                        "part_time_rate_15_64": 0
-                    }
-                }
+            # Informations géographiques depuis l'index territorial (sans requête)
+            territories = get_territory_index()
+            if not territories.contains("commune", code):
+                return self._rates_response("commune", code, "Commune inconnue", {}, year)
 
-            # Récupérer les données d'emploi
-            data = self.db.query(Employment).filter(Employment.geo_code == str(code)).all()
-            rates = self.calculate_rates(data)
-
-            return {
-                "territory_type": "commune",
-                "code": code,
-                "name": geo_info.libgeo,
-                "rates": rates
-            }
+            name = territories.name_of("commune", code)
+            return self._rates_response("commune", code, name, self.rates_by_year("commune", code, year), year)
         except Exception as e:
             print(f"Erreur dans get_commune_rates: {str(e)}")
-            return {
-                "territory_type": "commune",
-                "code": code,
-                "name": "Erreur",
-                "rates": {
-                    "activity_rate": 0,
-                    "employment_rate": 0,
-                    "part_time_rate_25_54": 0,
-                    "part_time_rate_15_64": 0
-                }
-            }
+            return self._rates_response("commune", code, "Erreur", {}, year)
         finally:
             self.close()
 
-    def get_epci_rates(self, epci: str):
-        """Récupère les taux pour un EPCI"""
+    def get_epci_rates(self, epci: str, year: int = None):
+        """Récupère les taux pour un EPCI (année la plus récente si year est absent)"""
         try:
-            # Récupérer les communes de l'EPCI
-            communes = self.db.query(GeoCode.codgeo).filter(GeoCode.epci == str(epci)).all()
-            if not communes:
-                return {
-                    "territory_type": "epci",
-                    "code": epci,
-                    "name": "EPCI inconnu",
-                    "rates": {
-                        "activity_rate": 0,
-                        "employment_rate": 0,
-                        "part_time_rate_25_54": 0,
-                        "part_time_rate_15_64": 0
-                    }
-                }
-
-            commune_codes = [c[0] for c in communes]
-            data = self.db.query(Employment).filter(Employment.geo_code.in_(commune_codes)).all()
-            rates = self.calculate_rates(data)
+            territories = get_territory_index()
+            if not territories.contains("epci", epci):
+                return self._rates_response("epci", epci, "EPCI inconnu", {}, year)
 
-            epci_name = self.db.query(GeoCode.libepci).filter(GeoCode.epci == str(epci)).first()
-            name = epci_name[0] if epci_name else f"EPCI {epci}"
-
-            return {
-                "territory_type": "epci",
-                "code": epci,
-                "name": name,
-                "rates": rates
-            }
+            name = territories.name_of("epci", epci) or f"EPCI {epci}"
+            return self._rates_response("epci", epci, name, self.rates_by_year("epci", epci, year), year)
         except Exception as e:
             print(f"Erreur dans get_epci_rates: {str(e)}")
-            return {
-                "territory_type": "epci",
-                "code": epci,
-                "name": "Erreur",
-                "rates": {
-                    "activity_rate": 0,
-                    "employment_rate": 0,
-                    "part_time_rate_25_54": 0,
-                    "part_time_rate_15_64": 0
-                }
-            }
+            return self._rates_response("epci", epci, "Erreur", {}, year)
         finally:
             self.close()
 
-    def get_department_rates(self, dep: str):
-        """Récupère les taux pour un département"""
+    def get_department_rates(self, dep: str, year: int = None):
+        """Récupère les taux pour un département (année la plus récente si year est absent)"""
         try:
-            # Récupérer les communes du département
-            communes = self.db.query(GeoCode.codgeo).filter(GeoCode.dep == str(dep)).all()
-            if not communes:
-                return {
-                    "territory_type": "department",
-                    "code": dep,
-                    "name": "Département inconnu",
-                    "rates": {
-                        "activity_rate": 0,
-                        "employment_rate": 0,
-                        "part_time_rate_25_54": 0,
-                        "part_time_rate_15_64": 0
-                    }
-                }
-
-            commune_codes = [c[0] for c in communes]
-            data = self.db.query(Employment).filter(Employment.geo_code.in_(commune_codes)).all()
-            rates = self.calculate_rates(data)
+            if not get_territory_index().contains("department", dep):
+                return self._rates_response("department", dep, "Département inconnu", {}, year)
 
-            return {
-                "territory_type": "department",
-                "code": dep,
-                "name": f"Département {dep}",
-                "rates": rates
-            }
+            return self._rates_response("department", dep, f"Département {dep}", self.rates_by_year("department", dep, year), year)
         except Exception as e:
             print(f"Erreur dans get_department_rates: {str(e)}")
-            return {
-                "territory_type": "department",
-                "code": dep,
-                "name": "Erreur",
-                "rates": {
-                    "activity_rate": 0,
-                    "employment_rate": 0,
-                    "part_time_rate_25_54": 0,
-                    "part_time_rate_15_64": 0
-                }
-            }
+            return self._rates_response("department", dep, "Erreur", {}, year)
         finally:
             self.close()
 
-    def get_region_rates(self, reg: str):
-        """Récupère les taux pour une région"""
+    def get_region_rates(self, reg: str, year: int = None):
+        """Récupère les taux pour une région (année la plus récente si year est absent)"""
         try:
-            # Récupérer les communes de la région
-            communes = self.db.query(GeoCode.codgeo).filter(GeoCode.reg == str(reg)).all()
-            if not communes:
-                return {
-                    "territory_type": "region",
-                    "code": reg,
-                    "name": "Région inconnue",
-                    "rates": {
-                        "activity_rate": 0,
-                        "employment_rate": 0,
-                        "part_time_rate_25_54": 0,
-                        "part_time_rate_15_64": 0
-                    }
-                }
+            if not get_territory_index().contains("region", reg):
+                return self._rates_response("region", reg, "Région inconnue", {}, year)
 
-            commune_codes = [c[0] for c in communes]
-            data = self.db.query(Employment).filter(Employment.geo_code.in_(commune_codes)).all()
-            rates = self.calculate_rates(data)
-
-            return {
-                "territory_type": "region",
-                "code": reg,
-                "name": f"Région {reg}",
-                "rates": rates
-            }
+            return self._rates_response("region", reg, f"Région {reg}", self.rates_by_year("region", reg, year), year)
         except Exception as e:
             print(f"Erreur dans get_region_rates: {str(e)}")
-            return {
-                "territory_type": "region",
-                "code": reg,
-                "name": "Erreur",
-                "rates": {
-                    "activity_rate": 0,
-                    "employment_rate": 0,
-                    "part_time_rate_25_54": 0,
-                    "part_time_rate_15_64": 0
-                }
-            }
+            return self._rates_response("region", reg, "Erreur", {}, year)
         finally:
             self.close()
 
-    def get_france_rates(self):
-        """Récupère les taux pour la France entière"""
+    def get_france_rates(self, year: int = None):
+        """Récupère les taux pour la France entière (année la plus récente si year est absent)"""
         try:
-            data = self.db.query(Employment).all()
-            rates = self.calculate_rates(data)
-
-            return {
-                "territory_type": "country",
-                "code": "FR",
-                "name": "France",
-                "rates": rates
-            }
+            return self._rates_response("country", "FR", "France", self.rates_by_year("france", year=year), year)
         except Exception as e:
             print(f"Erreur dans get_france_rates: {str(e)}")
-            return {
-                "territory_type": "country",
-                "code": "FR",
-                "name": "Erreur",
-                "rates": {
-                    "activity_rate": 0,
-                    "employment_rate": 0,
-                    "part_time_rate_25_54": 0,
-                    "part_time_rate_15_64": 0
-                }
-            }
+            return self._rates_response("country", "FR", "Erreur", {}, year)
         finally:
             self.close()
 
     def get_communes_rates_by_epci(self, epci: str):
         """Récupère les taux d'emploi des femmes pour toutes les communes d'un EPCI"""
         try:
-            # Récupérer les communes de l'EPCI
-            communes = self.db.query(GeoCode.codgeo, GeoCode.libgeo).filter(GeoCode.epci == str(epci)).all()
+            # Communes et nom de l'EPCI depuis l'index territorial (sans requête)
+            territories = get_territory_index()
+            communes = territories.communes_of("epci", epci)
 
             if not communes:
                 return {
@@ -269,9 +208,7 @@ class EmploymentService:
                     "communes": []
                 }
 
-            # Récupérer le nom de l'EPCI
-            epci_info = self.db.query(GeoCode.libepci).filter(GeoCode.epci == str(epci)).first()
-            epci_name = epci_info[0] if epci_info else f"EPCI {epci}"
+            epci_name = territories.name_of("epci", epci) or f"EPCI {epci}"
 
             # Récupérer les données pour chaque commune
             communes_data = []
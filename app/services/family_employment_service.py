@@ -1,13 +1,15 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import func, and_
 from typing import Dict, List, Optional
-from app.database import SessionLocal
+from app.database import ReadSessionLocal
 from app.models import FamilyEmployment, GeoCode
+from app.territory import get_territory_index
 
 
 class FamilyEmploymentService:
-    def __init__(self):
-        self.db = SessionLocal()
+    def __init__(self, db: Session = None):
+        # Session fournie par la requête (Depends(get_read_db)) ou session propre au service
+        self.db = db if db is not None else ReadSessionLocal()
 
         # Dictionnaire des libellés TF12
         self.tf12_labels = {
@@ -47,42 +49,43 @@ class FamilyEmploymentService:
     # =========================================================================
     # Méthode d'origine (inchangée — pour commune, EPCI, détails communes)
     # =========================================================================
+    def _age_group_label(self, age_group) -> str:
+        return "0-2 ans" if age_group in ["0", "00"] else "3-5 ans"
+
+    def _distribution_from_counts(self, counts: dict, age_group="0"):
+        """Construit la répartition à partir des effectifs par TF12 ({tf12: effectif})"""
+        total = sum(counts.values())
+
+        distributions = {}
+        if total > 0:
+            for tf12 in sorted(counts):
+                count = counts[tf12]
+                key = self.tf12_labels.get(tf12, f"Type {tf12}")
+                distributions[key] = {
+                    "code": str(tf12),
+                    "count": float(count),
+                    "percentage": round(float(count / total * 100), 1)
+                }
+
+        return {
+            "total_count": float(total),
+            "distributions": distributions,
+            "age_group": self._age_group_label(age_group)
+        }
+
     def _calculate_distribution(self, data, age_group="0"):
-        """Calcule la répartition des TF12 pour un groupe d'âge spécifié"""
+        """Calcule la répartition des TF12 pour un groupe d'âge spécifié (une seule passe sur les lignes)"""
         try:
-            # Calculer le total
-            total = sum(row.number for row in data)
-
-            # Calculer les pourcentages pour chaque TF12
-            distributions = {}
-            if total > 0:
-                # Récupérer tous les TF12 uniques
-                unique_tf12 = sorted({row.tf12 for row in data})
-
-                for tf12 in unique_tf12:
-                    count = sum(row.number for row in data if row.tf12 == tf12)
-                    percentage = (count / total * 100) if total > 0 else 0
-
-                    key = self.tf12_labels.get(tf12, f"Type {tf12}")
-                    distributions[key] = {
-                        "code": str(tf12),
-                        "count": float(count),
-                        "percentage": round(float(percentage), 1)
-                    }
-
-            return {
-                "total_count": float(total),
-                "distributions": distributions,
-                "age_group": "0-2 ans" if age_group in ["0", "00"] else "3-5 ans"
-            }
+            counts = {}
+            for row in data:
+                counts[row.tf12] = counts.get(row.tf12, 0) + row.number
+            return self._distribution_from_counts(counts, age_group)
         except Exception as e:
             print(f"Erreur dans le calcul de la distribution: {str(e)}")
-            import traceback
-            print(traceback.format_exc())
             return {
                 "total_count": 0,
                 "distributions": {},
-                "age_group": "0-2 ans" if age_group in ["0", "00"] else "3-5 ans"
+                "age_group": self._age_group_label(age_group)
             }
 
     # =========================================================================
@@ -121,32 +124,15 @@ class FamilyEmploymentService:
             rows = query.all()
 
             # Construire le résultat dans le même format que _calculate_distribution
-            total = sum(float(row.count or 0) for row in rows)
-
-            distributions = {}
-            if total > 0:
-                for row in sorted(rows, key=lambda r: r.tf12):
-                    count = float(row.count or 0)
-                    percentage = (count / total * 100) if total > 0 else 0
-
-                    key = self.tf12_labels.get(row.tf12, f"Type {row.tf12}")
-                    distributions[key] = {
-                        "code": str(row.tf12),
-                        "count": count,
-                        "percentage": round(percentage, 1)
-                    }
-
-            return {
-                "total_count": float(total),
-                "distributions": distributions,
-                "age_group": "0-2 ans" if age_group in ["0", "00"] else "3-5 ans"
-            }
+            return self._distribution_from_counts(
+                {row.tf12: float(row.count or 0) for row in rows}, age_group
+            )
         except Exception as e:
             print(f"Erreur dans _calculate_distribution_sql: {str(e)}")
             return {
                 "total_count": 0,
                 "distributions": {},
-                "age_group": "0-2 ans" if age_group in ["0", "00"] else "3-5 ans"
+                "age_group": self._age_group_label(age_group)
             }
 
     # =========================================================================
@@ -392,119 +378,215 @@ class FamilyEmploymentService:
             self.close()
 
     # =========================================================================
-    # EPCI — détails communes (inchangé)
+    # Listes des communes — 1 requête GROUP BY geo_code, tf12 (pivot en mémoire)
     # =========================================================================
-    def get_communes_distribution_by_epci(self, epci: str, age_group="0", year=None):
-        """Récupère la distribution pour toutes les communes d'un EPCI"""
-        try:
-            db = SessionLocal()
+    def _latest_year(self) -> int:
+        return self.db.query(func.max(FamilyEmployment.year)).scalar() or 2021
 
-            if year is None:
-                available_years = self.get_available_years()
-                year = available_years[-1] if available_years else 2021
+    def _communes_pivot(self, column, code: str, age_groups, year: int):
+        """
+        Effectifs par commune et par TF12 pour un ou plusieurs groupes d'âge en
+        1 requête (geo_codes LEFT JOIN family_employment, GROUP BY commune,
+        groupe d'âge, tf12). Retourne ({code: nom}, {groupe: {code: {tf12: effectif}}}).
+        """
+        formatted = {self._adjust_age_group_format(age_group): age_group for age_group in age_groups}
+        rows = self.db.query(
+            GeoCode.codgeo,
+            GeoCode.libgeo,
+            FamilyEmployment.age_group,
+            FamilyEmployment.tf12,
+            func.sum(FamilyEmployment.number).label('count')
+        ).outerjoin(
+            FamilyEmployment, and_(
+                FamilyEmployment.geo_code == GeoCode.codgeo,
+                FamilyEmployment.age_group.in_(list(formatted)),
+                FamilyEmployment.year == year
+            )
+        ).filter(
+            column == str(code)
+        ).group_by(
+            GeoCode.codgeo,
+            GeoCode.libgeo,
+            FamilyEmployment.age_group,
+            FamilyEmployment.tf12
+        ).order_by(
+            GeoCode.codgeo
+        ).all()
+
+        names = {}
+        counts = {age_group: {} for age_group in age_groups}
+        for codgeo, name, group, tf12, count in rows:
+            names[codgeo] = name
+            if group is not None:
+                counts[formatted[group]].setdefault(codgeo, {})[tf12] = float(count or 0)
+        return names, counts
+
+    def _communes_summary(self, names: dict, counts: dict, age_group="0") -> dict:
+        """Statistiques par commune (double activité, monoparents actifs) et totaux du territoire"""
+        communes_data = []
+        total_families = 0
+        total_dual_active = 0
+        total_single_parent_active = 0
+
+        for code, name in names.items():
+            tf12_counts = counts.get(code)
+            if not tf12_counts:
+                communes_data.append({
+                    "code": code,
+                    "name": name,
+                    "total_families": 0,
+                    "dual_active_count": 0,
+                    "dual_active_rate": 0,
+                    "single_parent_active_count": 0,
+                    "single_parent_active_rate": 0,
+                    "distributions": {}
+                })
+                continue
+
+            distribution = self._distribution_from_counts(tf12_counts, age_group)
+            total_count = distribution["total_count"]
+
+            # 41 : deux parents actifs ayant un emploi ; 11 / 21 : parent seul actif ayant un emploi
+            dual_active_count = tf12_counts.get("41", 0) if total_count > 0 else 0
+            single_parent_active_count = (tf12_counts.get("11", 0) + tf12_counts.get("21", 0)) if total_count > 0 else 0
+
+            communes_data.append({
+                "code": code,
+                "name": name,
+                "total_families": total_count,
+                "dual_active_count": dual_active_count,
+                "dual_active_rate": round(dual_active_count / total_count * 100, 1) if total_count > 0 else 0,
+                "single_parent_active_count": single_parent_active_count,
+                "single_parent_active_rate": round(single_parent_active_count / total_count * 100, 1) if total_count > 0 else 0,
+                "distributions": distribution["distributions"]
+            })
+
+            total_families += total_count
+            total_dual_active += dual_active_count
+            total_single_parent_active += single_parent_active_count
+
+        communes_data.sort(key=lambda x: x["dual_active_rate"], reverse=True)
+
+        return {
+            "age_group": self._age_group_label(age_group),
+            "communes_count": len(names),
+            "total_families": total_families,
+            "total_dual_active": total_dual_active,
+            "total_single_parent_active": total_single_parent_active,
+            "dual_active_rate": round(total_dual_active / total_families * 100, 1) if total_families > 0 else 0,
+            "single_parent_active_rate": round(total_single_parent_active / total_families * 100, 1) if total_families > 0 else 0,
+            "communes": communes_data
+        }
 
-            communes = db.query(GeoCode.codgeo, GeoCode.libgeo).filter(GeoCode.epci == str(epci)).all()
-            if not communes:
-                return {
-                    "epci": epci,
-                    "epci_name": "",
-                    "year": year,
-                    "communes_count": 0,
-                    "communes": []
-                }
+    def _epci_response(self, epci: str, epci_name: str, year: int, summary: dict) -> dict:
+        return {
+            "epci": epci,
+            "epci_name": epci_name,
+            "year": year,
+            "age_group": summary["age_group"],
+            "communes_count": summary["communes_count"],
+            "total_families": summary["total_families"],
+            "total_dual_active": summary["total_dual_active"],
+            "total_single_parent_active": summary["total_single_parent_active"],
+            "epci_dual_active_rate": summary["dual_active_rate"],
+            "epci_single_parent_active_rate": summary["single_parent_active_rate"],
+            "communes": summary["communes"]
+        }
 
-            epci_info = db.query(GeoCode.libepci).filter(GeoCode.epci == str(epci)).first()
-            epci_name = epci_info[0] if epci_info else f"EPCI {epci}"
+    def _department_response(self, dep: str, year: int, summary: dict) -> dict:
+        return {
+            "department": dep,
+            "year": year,
+            "age_group": summary["age_group"],
+            "communes_count": summary["communes_count"],
+            "total_families": summary["total_families"],
+            "total_dual_active": summary["total_dual_active"],
+            "total_single_parent_active": summary["total_single_parent_active"],
+            "department_dual_active_rate": summary["dual_active_rate"],
+            "department_single_parent_active_rate": summary["single_parent_active_rate"],
+            "communes": summary["communes"]
+        }
 
-            formatted_age_group = self._adjust_age_group_format(age_group)
+    def _epci_responses(self, epci: str, age_groups, year=None) -> dict:
+        """Réponses EPCI par groupe d'âge, calculées à partir d'un seul pivot"""
+        year = year if year is not None else self._latest_year()
+        names, counts = self._communes_pivot(GeoCode.epci, epci, age_groups, year)
+        epci_name = (get_territory_index().name_of("epci", epci) or f"EPCI {epci}") if names else ""
+        return {
+            age_group: self._epci_response(epci, epci_name, year, self._communes_summary(names, counts[age_group], age_group))
+            for age_group in age_groups
+        }
 
-            communes_data = []
-            total_families = 0
-            total_dual_active = 0
-            total_single_parent_active = 0
-
-            for code, name in communes:
-                commune_data = db.query(FamilyEmployment).filter(
-                    FamilyEmployment.geo_code == code,
-                    FamilyEmployment.age_group == formatted_age_group,
-                    FamilyEmployment.year == year
-                ).all()
-
-                if commune_data:
-                    distribution = self._calculate_distribution(commune_data, age_group)
-
-                    total_count = distribution["total_count"]
-                    distributions = distribution["distributions"]
-
-                    dual_active_count = distributions.get("Couple avec enfant(s) - Deux parents actifs ayant un emploi", {}).get("count", 0)
-                    dual_active_rate = (dual_active_count / total_count * 100) if total_count > 0 else 0
-
-                    single_parent_active_count = (
-                        distributions.get("Famille monoparentale - Homme actif ayant un emploi", {}).get("count", 0) +
-                        distributions.get("Famille monoparentale - Femme active ayant un emploi", {}).get("count", 0)
-                    )
-                    single_parent_active_rate = (single_parent_active_count / total_count * 100) if total_count > 0 else 0
-
-                    communes_data.append({
-                        "code": code,
-                        "name": name,
-                        "total_families": total_count,
-                        "dual_active_count": dual_active_count,
-                        "dual_active_rate": round(dual_active_rate, 1),
-                        "single_parent_active_count": single_parent_active_count,
-                        "single_parent_active_rate": round(single_parent_active_rate, 1),
-                        "distributions": distributions
-                    })
-
-                    total_families += total_count
-                    total_dual_active += dual_active_count
-                    total_single_parent_active += single_parent_active_count
-                else:
-                    communes_data.append({
-                        "code": code,
-                        "name": name,
-                        "total_families": 0,
-                        "dual_active_count": 0,
-                        "dual_active_rate": 0,
-                        "single_parent_active_count": 0,
-                        "single_parent_active_rate": 0,
-                        "distributions": {}
-                    })
-
-            communes_data.sort(key=lambda x: x["dual_active_rate"], reverse=True)
-
-            epci_dual_active_rate = (total_dual_active / total_families * 100) if total_families > 0 else 0
-            epci_single_parent_active_rate = (total_single_parent_active / total_families * 100) if total_families > 0 else 0
+    def _department_responses(self, dep: str, age_groups, year=None) -> dict:
+        """Réponses départementales par groupe d'âge, calculées à partir d'un seul pivot"""
+        year = year if year is not None else self._latest_year()
+        names, counts = self._communes_pivot(GeoCode.dep, dep, age_groups, year)
+        return {
+            age_group: self._department_response(dep, year, self._communes_summary(names, counts[age_group], age_group))
+            for age_group in age_groups
+        }
 
-            return {
-                "epci": epci,
-                "epci_name": epci_name,
-                "year": year,
-                "age_group": "0-2 ans" if age_group in ["0", "00"] else "3-5 ans",
-                "communes_count": len(communes),
-                "total_families": total_families,
-                "total_dual_active": total_dual_active,
-                "total_single_parent_active": total_single_parent_active,
-                "epci_dual_active_rate": round(epci_dual_active_rate, 1),
-                "epci_single_parent_active_rate": round(epci_single_parent_active_rate, 1),
-                "communes": communes_data
-            }
+    def get_communes_distribution_by_epci(self, epci: str, age_group="0", year=None):
+        """Récupère la distribution pour toutes les communes d'un EPCI"""
+        try:
+            return self._epci_responses(epci, (age_group,), year)[age_group]
         except Exception as e:
             print(f"Erreur pour l'EPCI {epci}: {str(e)}")
-            import traceback
-            print(traceback.format_exc())
-            return {
-                "epci": epci,
-                "epci_name": "",
-                "year": year or 2021,
-                "age_group": "0-2 ans" if age_group in ["0", "00"] else "3-5 ans",
-                "communes_count": 0,
-                "total_families": 0,
-                "total_dual_active": 0,
-                "total_single_parent_active": 0,
-                "epci_dual_active_rate": 0,
-                "epci_single_parent_active_rate": 0,
-                "communes": []
+            return self._epci_response(epci, "", year or 2021, self._communes_summary({}, {}, age_group))
+        finally:
+            self.close()
+
+    def get_communes_distributions_by_epci(self, epci: str, year=None):
+        """Distributions des moins de 3 ans et des 3-5 ans pour toutes les communes d'un EPCI (1 requête)"""
+        try:
+            responses = self._epci_responses(epci, ("0", "3"), year)
+        except Exception as e:
+            print(f"Erreur pour l'EPCI {epci}: {str(e)}")
+            responses = {
+                age_group: self._epci_response(epci, "", year or 2021, self._communes_summary({}, {}, age_group))
+                for age_group in ("0", "3")
+            }
+        finally:
+            self.close()
+
+        under_3 = responses["0"]
+        return {
+            "epci": epci,
+            "epci_name": under_3["epci_name"],
+            "year": under_3["year"],
+            "communes_count": under_3["communes_count"],
+            "under_3": under_3,
+            "three_to_five": responses["3"]
+        }
+
+    def get_communes_distribution_by_department(self, dep: str, age_group="0", year=None):
+        """Récupère la distribution pour toutes les communes d'un département"""
+        try:
+            return self._department_responses(dep, (age_group,), year)[age_group]
+        except Exception as e:
+            print(f"Erreur pour le département {dep}: {str(e)}")
+            return self._department_response(dep, year or 2021, self._communes_summary({}, {}, age_group))
+        finally:
+            self.close()
+
+    def get_communes_distributions_by_department(self, dep: str, year=None):
+        """Distributions des moins de 3 ans et des 3-5 ans pour toutes les communes d'un département (1 requête)"""
+        try:
+            responses = self._department_responses(dep, ("0", "3"), year)
+        except Exception as e:
+            print(f"Erreur pour le département {dep}: {str(e)}")
+            responses = {
+                age_group: self._department_response(dep, year or 2021, self._communes_summary({}, {}, age_group))
+                for age_group in ("0", "3")
             }
         finally:
-            db.close()
+            self.close()
+
+        under_3 = responses["0"]
+        return {
+            "department": dep,
+            "year": under_3["year"],
+            "communes_count": under_3["communes_count"],
+            "under_3": under_3,
+            "three_to_five": responses["3"]
+        }
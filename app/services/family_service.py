@@ -1,15 +1,18 @@
 import math
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy import func
-from app.database import SessionLocal
+from sqlalchemy import func, and_
+from app.database import ReadSessionLocal
 from app.models import Family, GeoCode
+from app.request_status import mark_failed
+from app.territory import get_territory_index
 
 
 class FamilyService:
-    def __init__(self):
+    def __init__(self, db: Session = None):
         """ Initialise la connexion à la base de données """
-        self.db = SessionLocal()
+        # Session fournie par la requête (Depends(get_read_db)) ou session propre au service
+        self.db = db if db is not None else ReadSessionLocal()
 
     def close(self):
         """ Ferme la session de base de données proprement """
@@ -123,6 +126,7 @@ class FamilyService:
             results = self.db.query(Family).filter(Family.geo_code == geo_code).all()
             return self._format_response(results, start_year, end_year)
         except SQLAlchemyError as e:
+            mark_failed()
             return {"error": str(e)}
         finally:
             self.close()
@@ -133,7 +137,7 @@ class FamilyService:
     def get_families_by_epci(self, epci: str, start_year: int = None, end_year: int = None):
         """ Récupère les données agrégées par EPCI """
         try:
-            db = SessionLocal()
+            db = self.db
 
             communes = [geo.codgeo for geo in db.query(GeoCode).filter(GeoCode.epci == epci).all()]
             if not communes:
@@ -143,9 +147,10 @@ class FamilyService:
 
             return self._format_response(results, start_year, end_year)
         except SQLAlchemyError as e:
+            mark_failed()
             return {"error": str(e)}
         finally:
-            db.close()
+            self.close()
 
     # =========================================================================
     # Département — OPTIMISÉ : SQL GROUP BY + JOIN au lieu de IN(...)
@@ -166,6 +171,7 @@ class FamilyService:
                 end_year=end_year
             )
         except SQLAlchemyError as e:
+            mark_failed()
             return {"error": str(e)}
         finally:
             self.close()
@@ -187,6 +193,7 @@ class FamilyService:
                 end_year=end_year
             )
         except SQLAlchemyError as e:
+            mark_failed()
             return {"error": str(e)}
         finally:
             self.close()
@@ -203,6 +210,7 @@ class FamilyService:
                 end_year=end_year
             )
         except SQLAlchemyError as e:
+            mark_failed()
             return {"error": str(e)}
         finally:
             self.close()
@@ -319,333 +327,206 @@ class FamilyService:
         return evolutions
 
     # =========================================================================
-    # EPCI détails communes (inchangés)
+    # EPCI détails communes — 1 requête partagée par les trois vues
     # =========================================================================
-    def get_couples_with_children_by_epci(self, epci: str):
-        """Récupère les statistiques des couples avec enfants pour toutes les communes d'un EPCI"""
-        try:
-            db = SessionLocal()
-
-            communes = db.query(GeoCode.codgeo, GeoCode.libgeo).filter(GeoCode.epci == str(epci)).all()
-
-            if not communes:
-                return {
-                    "epci": epci,
-                    "epci_name": "",
-                    "year": 2021,
-                    "communes_count": 0,
-                    "total_households": 0.0,
-                    "total_couples_with_children": 0.0,
-                    "epci_couples_with_children_percentage": 0.0,
-                    "communes": []
-                }
-
-            epci_info = db.query(GeoCode.libepci).filter(GeoCode.epci == str(epci)).first()
-            epci_name = epci_info[0] if epci_info else f"EPCI {epci}"
-
-            latest_year = db.query(func.max(Family.year)).scalar() or 2021
-
-            communes_data = []
-            total_households = 0
-            total_couples_with_children = 0
+    def _epci_family_frame(self, epci: str):
+        """
+        Données familles de chaque commune de l'EPCI pour le dernier millésime,
+        en 1 requête (geo_codes LEFT JOIN families, MAX(year) en sous-requête).
+        Retourne (epci, epci_name, year, communes) ; les communes sans données
+        ont des valeurs à 0.
+        """
+        latest_year = self.db.query(func.max(Family.year)).scalar_subquery()
+        rows = self.db.query(
+            GeoCode.codgeo,
+            GeoCode.libgeo,
+            latest_year.label('latest_year'),
+            Family.total_households,
+            Family.couples_with_children,
+            Family.single_parent_families,
+            Family.single_fathers,
+            Family.single_mothers,
+            Family.children_under_24_three_siblings,
+            Family.children_under_24_four_or_more_siblings
+        ).outerjoin(
+            Family, and_(Family.geo_code == GeoCode.codgeo, Family.year == latest_year)
+        ).filter(
+            GeoCode.epci == str(epci)
+        ).order_by(
+            GeoCode.codgeo
+        ).all()
+
+        if not rows:
+            return epci, "", 2021, []
+
+        communes = [
+            {
+                "code": row.codgeo,
+                "name": row.libgeo,
+                "total_households": self._safe_float(row.total_households),
+                "couples_with_children": self._safe_float(row.couples_with_children),
+                "single_parent_families": self._safe_float(row.single_parent_families),
+                "single_fathers": self._safe_float(row.single_fathers),
+                "single_mothers": self._safe_float(row.single_mothers),
+                "families_3_children": self._safe_float(row.children_under_24_three_siblings),
+                "families_4_plus_children": self._safe_float(row.children_under_24_four_or_more_siblings),
+            }
+            for row in rows
+        ]
+        epci_name = get_territory_index().name_of("epci", epci) or f"EPCI {epci}"
+        return epci, epci_name, rows[0].latest_year or 2021, communes
+
+    def _percentage(self, part: float, whole: float) -> float:
+        return round(part / whole * 100, 2) if whole > 0 else 0.0
+
+    def _couples_with_children_view(self, epci, epci_name, year, communes) -> dict:
+        """Vue couples avec enfants, dérivée de _epci_family_frame"""
+        communes_data = [
+            {
+                "code": c["code"],
+                "name": c["name"],
+                "total_households": c["total_households"],
+                "couples_with_children": c["couples_with_children"],
+                "couples_with_children_percentage": self._percentage(c["couples_with_children"], c["total_households"])
+            }
+            for c in communes
+        ]
+        communes_data.sort(key=lambda x: x["couples_with_children_percentage"], reverse=True)
 
-            for code, name in communes:
-                commune_data = db.query(Family).filter(
-                    Family.geo_code == code,
-                    Family.year == latest_year
-                ).first()
+        total_households = sum((c["total_households"] for c in communes), 0.0)
+        total_couples_with_children = sum((c["couples_with_children"] for c in communes), 0.0)
+        return {
+            "epci": epci,
+            "epci_name": epci_name,
+            "year": year,
+            "communes_count": len(communes),
+            "total_households": total_households,
+            "total_couples_with_children": total_couples_with_children,
+            "epci_couples_with_children_percentage": self._percentage(total_couples_with_children, total_households),
+            "communes": communes_data
+        }
 
-                if commune_data:
-                    commune_households = self._safe_float(commune_data.total_households)
-                    commune_couples_with_children = self._safe_float(commune_data.couples_with_children)
-                    percentage = (commune_couples_with_children / commune_households * 100) if commune_households > 0 else 0
+    def _single_parent_view(self, epci, epci_name, year, communes) -> dict:
+        """Vue familles monoparentales, dérivée de _epci_family_frame"""
+        communes_data = [
+            {
+                "code": c["code"],
+                "name": c["name"],
+                "total_households": c["total_households"],
+                "single_parent_families": c["single_parent_families"],
+                "single_fathers": c["single_fathers"],
+                "single_mothers": c["single_mothers"],
+                "single_parent_percentage": self._percentage(c["single_parent_families"], c["total_households"]),
+                "single_father_percentage": self._percentage(c["single_fathers"], c["single_parent_families"]),
+                "single_mother_percentage": self._percentage(c["single_mothers"], c["single_parent_families"])
+            }
+            for c in communes
+        ]
+        communes_data.sort(key=lambda x: x["single_parent_percentage"], reverse=True)
+
+        total_households = sum((c["total_households"] for c in communes), 0.0)
+        total_single_parent = sum((c["single_parent_families"] for c in communes), 0.0)
+        total_single_fathers = sum((c["single_fathers"] for c in communes), 0.0)
+        total_single_mothers = sum((c["single_mothers"] for c in communes), 0.0)
+        return {
+            "epci": epci,
+            "epci_name": epci_name,
+            "year": year,
+            "communes_count": len(communes),
+            "total_households": total_households,
+            "total_single_parent_families": total_single_parent,
+            "total_single_fathers": total_single_fathers,
+            "total_single_mothers": total_single_mothers,
+            "epci_single_parent_percentage": self._percentage(total_single_parent, total_households),
+            "epci_single_father_percentage": self._percentage(total_single_fathers, total_single_parent),
+            "epci_single_mother_percentage": self._percentage(total_single_mothers, total_single_parent),
+            "communes": communes_data
+        }
 
-                    communes_data.append({
-                        "code": code,
-                        "name": name,
-                        "total_households": commune_households,
-                        "couples_with_children": commune_couples_with_children,
-                        "couples_with_children_percentage": round(percentage, 2)
-                    })
+    def _large_families_view(self, epci, epci_name, year, communes) -> dict:
+        """Vue familles nombreuses, dérivée de _epci_family_frame"""
+        communes_data = []
+        for c in communes:
+            large_families = c["families_3_children"] + c["families_4_plus_children"]
+            communes_data.append({
+                "code": c["code"],
+                "name": c["name"],
+                "total_households": c["total_households"],
+                "large_families": large_families,
+                "families_3_children": c["families_3_children"],
+                "families_4_plus_children": c["families_4_plus_children"],
+                "large_families_percentage": self._percentage(large_families, c["total_households"]),
+                "families_3_children_percentage": self._percentage(c["families_3_children"], c["total_households"]),
+                "families_4_plus_percentage": self._percentage(c["families_4_plus_children"], c["total_households"])
+            })
+        communes_data.sort(key=lambda x: x["large_families_percentage"], reverse=True)
+
+        total_households = sum((c["total_households"] for c in communes), 0.0)
+        total_3_children = sum((c["families_3_children"] for c in communes), 0.0)
+        total_4_plus = sum((c["families_4_plus_children"] for c in communes), 0.0)
+        total_large_families = total_3_children + total_4_plus
+        return {
+            "epci": epci,
+            "epci_name": epci_name,
+            "year": year,
+            "communes_count": len(communes),
+            "total_households": total_households,
+            "total_large_families": total_large_families,
+            "total_families_3_children": total_3_children,
+            "total_families_4_plus_children": total_4_plus,
+            "epci_large_families_percentage": self._percentage(total_large_families, total_households),
+            "epci_families_3_children_percentage": self._percentage(total_3_children, total_households),
+            "epci_families_4_plus_percentage": self._percentage(total_4_plus, total_households),
+            "communes": communes_data
+        }
 
-                    total_households += commune_households
-                    total_couples_with_children += commune_couples_with_children
-                else:
-                    communes_data.append({
-                        "code": code,
-                        "name": name,
-                        "total_households": 0.0,
-                        "couples_with_children": 0.0,
-                        "couples_with_children_percentage": 0.0
-                    })
-
-            epci_percentage = (total_couples_with_children / total_households * 100) if total_households > 0 else 0
-
-            communes_data.sort(key=lambda x: x["couples_with_children_percentage"], reverse=True)
-
-            return {
-                "epci": epci,
-                "epci_name": epci_name,
-                "year": latest_year,
-                "communes_count": len(communes),
-                "total_households": total_households,
-                "total_couples_with_children": total_couples_with_children,
-                "epci_couples_with_children_percentage": round(epci_percentage, 2),
-                "communes": communes_data
-            }
+    def get_couples_with_children_by_epci(self, epci: str):
+        """Récupère les statistiques des couples avec enfants pour toutes les communes d'un EPCI"""
+        try:
+            return self._couples_with_children_view(*self._epci_family_frame(epci))
         except Exception as e:
             print(f"Erreur lors de la récupération des données des couples avec enfants pour l'EPCI {epci}: {str(e)}")
-            import traceback
-            print(traceback.format_exc())
-            return {
-                "epci": epci,
-                "epci_name": "",
-                "year": 2021,
-                "communes_count": 0,
-                "total_households": 0.0,
-                "total_couples_with_children": 0.0,
-                "epci_couples_with_children_percentage": 0.0,
-                "communes": []
-            }
+            return self._couples_with_children_view(epci, "", 2021, [])
         finally:
-            db.close()
+            self.close()
 
     def get_single_parent_families_by_epci(self, epci: str):
         """Récupère les statistiques des familles monoparentales pour toutes les communes d'un EPCI"""
         try:
-            db = SessionLocal()
-
-            communes = db.query(GeoCode.codgeo, GeoCode.libgeo).filter(GeoCode.epci == str(epci)).all()
-
-            if not communes:
-                return {
-                    "epci": epci,
-                    "epci_name": "",
-                    "year": 2021,
-                    "communes_count": 0,
-                    "total_households": 0.0,
-                    "total_single_parent_families": 0.0,
-                    "total_single_fathers": 0.0,
-                    "total_single_mothers": 0.0,
-                    "epci_single_parent_percentage": 0.0,
-                    "epci_single_father_percentage": 0.0,
-                    "epci_single_mother_percentage": 0.0,
-                    "communes": []
-                }
-
-            epci_info = db.query(GeoCode.libepci).filter(GeoCode.epci == str(epci)).first()
-            epci_name = epci_info[0] if epci_info else f"EPCI {epci}"
-
-            latest_year = db.query(func.max(Family.year)).scalar() or 2021
-
-            communes_data = []
-            total_households = 0
-            total_single_parent = 0
-            total_single_fathers = 0
-            total_single_mothers = 0
-
-            for code, name in communes:
-                commune_data = db.query(Family).filter(
-                    Family.geo_code == code,
-                    Family.year == latest_year
-                ).first()
-
-                if commune_data:
-                    commune_households = self._safe_float(commune_data.total_households)
-                    commune_single_parent = self._safe_float(commune_data.single_parent_families)
-                    commune_single_fathers = self._safe_float(commune_data.single_fathers)
-                    commune_single_mothers = self._safe_float(commune_data.single_mothers)
-
-                    percentage = (commune_single_parent / commune_households * 100) if commune_households > 0 else 0
-                    father_pct = (commune_single_fathers / commune_single_parent * 100) if commune_single_parent > 0 else 0
-                    mother_pct = (commune_single_mothers / commune_single_parent * 100) if commune_single_parent > 0 else 0
-
-                    communes_data.append({
-                        "code": code,
-                        "name": name,
-                        "total_households": commune_households,
-                        "single_parent_families": commune_single_parent,
-                        "single_fathers": commune_single_fathers,
-                        "single_mothers": commune_single_mothers,
-                        "single_parent_percentage": round(percentage, 2),
-                        "single_father_percentage": round(father_pct, 2),
-                        "single_mother_percentage": round(mother_pct, 2)
-                    })
-
-                    total_households += commune_households
-                    total_single_parent += commune_single_parent
-                    total_single_fathers += commune_single_fathers
-                    total_single_mothers += commune_single_mothers
-                else:
-                    communes_data.append({
-                        "code": code,
-                        "name": name,
-                        "total_households": 0.0,
-                        "single_parent_families": 0.0,
-                        "single_fathers": 0.0,
-                        "single_mothers": 0.0,
-                        "single_parent_percentage": 0.0,
-                        "single_father_percentage": 0.0,
-                        "single_mother_percentage": 0.0
-                    })
-
-            epci_pct = (total_single_parent / total_households * 100) if total_households > 0 else 0
-            epci_father_pct = (total_single_fathers / total_single_parent * 100) if total_single_parent > 0 else 0
-            epci_mother_pct = (total_single_mothers / total_single_parent * 100) if total_single_parent > 0 else 0
-
-            communes_data.sort(key=lambda x: x["single_parent_percentage"], reverse=True)
-
-            return {
-                "epci": epci,
-                "epci_name": epci_name,
-                "year": latest_year,
-                "communes_count": len(communes),
-                "total_households": total_households,
-                "total_single_parent_families": total_single_parent,
-                "total_single_fathers": total_single_fathers,
-                "total_single_mothers": total_single_mothers,
-                "epci_single_parent_percentage": round(epci_pct, 2),
-                "epci_single_father_percentage": round(epci_father_pct, 2),
-                "epci_single_mother_percentage": round(epci_mother_pct, 2),
-                "communes": communes_data
-            }
+            return self._single_parent_view(*self._epci_family_frame(epci))
         except Exception as e:
             print(f"Erreur lors de la récupération des familles monoparentales pour l'EPCI {epci}: {str(e)}")
-            import traceback
-            print(traceback.format_exc())
-            return {
-                "epci": epci,
-                "epci_name": "",
-                "year": 2021,
-                "communes_count": 0,
-                "total_households": 0.0,
-                "total_single_parent_families": 0.0,
-                "total_single_fathers": 0.0,
-                "total_single_mothers": 0.0,
-                "epci_single_parent_percentage": 0.0,
-                "epci_single_father_percentage": 0.0,
-                "epci_single_mother_percentage": 0.0,
-                "communes": []
-            }
+            return self._single_parent_view(epci, "", 2021, [])
         finally:
-            db.close()
+            self.close()
 
     def get_large_families_by_epci(self, epci: str):
         """Récupère les statistiques des familles nombreuses pour toutes les communes d'un EPCI"""
         try:
-            db = SessionLocal()
-
-            communes = db.query(GeoCode.codgeo, GeoCode.libgeo).filter(GeoCode.epci == str(epci)).all()
-
-            if not communes:
-                return {
-                    "epci": epci,
-                    "epci_name": "",
-                    "year": 2021,
-                    "communes_count": 0,
-                    "total_households": 0.0,
-                    "total_large_families": 0.0,
-                    "total_families_3_children": 0.0,
-                    "total_families_4_plus_children": 0.0,
-                    "epci_large_families_percentage": 0.0,
-                    "epci_families_3_children_percentage": 0.0,
-                    "epci_families_4_plus_percentage": 0.0,
-                    "communes": []
-                }
-
-            epci_info = db.query(GeoCode.libepci).filter(GeoCode.epci == str(epci)).first()
-            epci_name = epci_info[0] if epci_info else f"EPCI {epci}"
-
-            latest_year = db.query(func.max(Family.year)).scalar() or 2021
-
-            communes_data = []
-            total_households = 0
-            total_large_families = 0
-            total_3_children = 0
-            total_4_plus = 0
-
-            for code, name in communes:
-                commune_data = db.query(Family).filter(
-                    Family.geo_code == code,
-                    Family.year == latest_year
-                ).first()
-
-                if commune_data:
-                    commune_households = self._safe_float(commune_data.total_households)
-                    commune_3 = self._safe_float(commune_data.children_under_24_three_siblings)
-                    commune_4p = self._safe_float(commune_data.children_under_24_four_or_more_siblings)
-                    commune_large = commune_3 + commune_4p
-
-                    large_pct = (commune_large / commune_households * 100) if commune_households > 0 else 0
-                    pct_3 = (commune_3 / commune_households * 100) if commune_households > 0 else 0
-                    pct_4p = (commune_4p / commune_households * 100) if commune_households > 0 else 0
-
-                    communes_data.append({
-                        "code": code,
-                        "name": name,
-                        "total_households": commune_households,
-                        "large_families": commune_large,
-                        "families_3_children": commune_3,
-                        "families_4_plus_children": commune_4p,
-                        "large_families_percentage": round(large_pct, 2),
-                        "families_3_children_percentage": round(pct_3, 2),
-                        "families_4_plus_percentage": round(pct_4p, 2)
-                    })
-
-                    total_households += commune_households
-                    total_large_families += commune_large
-                    total_3_children += commune_3
-                    total_4_plus += commune_4p
-                else:
-                    communes_data.append({
-                        "code": code,
-                        "name": name,
-                        "total_households": 0.0,
-                        "large_families": 0.0,
-                        "families_3_children": 0.0,
-                        "families_4_plus_children": 0.0,
-                        "large_families_percentage": 0.0,
-                        "families_3_children_percentage": 0.0,
-                        "families_4_plus_percentage": 0.0
-                    })
-
-            epci_large_pct = (total_large_families / total_households * 100) if total_households > 0 else 0
-            epci_3_pct = (total_3_children / total_households * 100) if total_households > 0 else 0
-            epci_4p_pct = (total_4_plus / total_households * 100) if total_households > 0 else 0
-
-            communes_data.sort(key=lambda x: x["large_families_percentage"], reverse=True)
-
-            return {
-                "epci": epci,
-                "epci_name": epci_name,
-                "year": latest_year,
-                "communes_count": len(communes),
-                "total_households": total_households,
-                "total_large_families": total_large_families,
-                "total_families_3_children": total_3_children,
-                "total_families_4_plus_children": total_4_plus,
-                "epci_large_families_percentage": round(epci_large_pct, 2),
-                "epci_families_3_children_percentage": round(epci_3_pct, 2),
-                "epci_families_4_plus_percentage": round(epci_4p_pct, 2),
-                "communes": communes_data
-            }
+            return self._large_families_view(*self._epci_family_frame(epci))
         except Exception as e:
             print(f"Erreur lors de la récupération des familles nombreuses pour l'EPCI {epci}: {str(e)}")
-            import traceback
-            print(traceback.format_exc())
-            return {
-                "epci": epci,
-                "epci_name": "",
-                "year": 2021,
-                "communes_count": 0,
-                "total_households": 0.0,
-                "total_large_families": 0.0,
-                "total_families_3_children": 0.0,
-                "total_families_4_plus_children": 0.0,
-                "epci_large_families_percentage": 0.0,
-                "epci_families_3_children_percentage": 0.0,
-                "epci_families_4_plus_percentage": 0.0,
-                "communes": []
-            }
+            return self._large_families_view(epci, "", 2021, [])
+        finally:
+            self.close()
+
+    def get_family_structure_by_epci(self, epci: str):
+        """Couples avec enfants, familles monoparentales et familles nombreuses d'un EPCI (1 requête)"""
+        try:
+            frame = self._epci_family_frame(epci)
+        except Exception as e:
+            print(f"Erreur lors de la récupération de la structure familiale pour l'EPCI {epci}: {str(e)}")
+            frame = (epci, "", 2021, [])
         finally:
-            db.close()
+            self.close()
+
+        epci, epci_name, year, communes = frame
+        return {
+            "epci": epci,
+            "epci_name": epci_name,
+            "year": year,
+            "communes_count": len(communes),
+            "couples_with_children": self._couples_with_children_view(*frame),
+            "single_parent_families": self._single_parent_view(*frame),
+            "large_families": self._large_families_view(*frame)
+        }
@@ -1,10 +1,17 @@
 from sqlalchemy.orm import Session
-from app.database import SessionLocal
-from app.models import GeoCode
+from sqlalchemy import func
+from app.database import ReadSessionLocal
+from app.models import Birth, GeoCode
+from app.territory import get_territory_index
 
 class GeoCodeService:
-    def __init__(self):
-        self.db = SessionLocal()
+    def __init__(self, db: Session = None):
+        # Session fournie par la requête (Depends(get_read_db)) ou session propre au service
+        self.db = db if db is not None else ReadSessionLocal()
+
+    def close(self):
+        """Ferme la connexion à la base de données"""
+        self.db.close()
 
     def get_by_code(self, code: str):
         """Récupère les géocodes pour un code spécifique"""
@@ -18,31 +25,75 @@ class GeoCodeService:
         """Récupère les géocodes pour un département spécifique"""
         return [record.__dict__ for record in self.db.query(GeoCode).filter(GeoCode.dep == dep).all()]
 
-    def aggregate_births_by_epci(self, epci: str, birth_service):
-        """Agrège les naissances par EPCI"""
-        communes = self.db.query(GeoCode.codgeo).filter(GeoCode.epci == epci).all()
-        communes = [c[0] for c in communes]
+    def _births_by_year(self, column=None, code: str = None) -> dict:
+        """
+        Naissances communales par année en 1 requête GROUP BY time_period
+        (JOIN geo_codes filtré sur `column` = `code`, toutes les communes si `column` est None).
+        S'appuie sur l'index births (geo_object, geo, time_period).
+        """
+        query = self.db.query(
+            Birth.time_period,
+            func.sum(Birth.obs_value).label('births')
+        ).filter(Birth.geo_object == "COM")
+        if column is not None:
+            query = query.join(GeoCode, GeoCode.codgeo == Birth.geo).filter(column == str(code))
+        rows = query.group_by(Birth.time_period).order_by(Birth.time_period).all()
+        return {int(year): float(births or 0) for year, births in rows}
 
-        if not communes:
+    def aggregate_births_by_epci(self, epci: str):
+        """Agrège les naissances par EPCI"""
+        territories = get_territory_index()
+        communes_count = territories.count("epci", epci)
+        if not communes_count:
             return {"error": "EPCI non trouvé"}
 
-        epci_name = self.db.query(GeoCode.libepci).filter(GeoCode.epci == epci).first()
+        births_by_year = self._births_by_year(GeoCode.epci, epci)
+        return {
+            "epci": epci,
+            "epci_name": territories.name_of("epci", epci) or "",
+            "total_births": float(sum(births_by_year.values())),
+            "communes_count": communes_count,
+            "births_by_year": births_by_year
+        }
 
-        births_data = []
-        for commune in communes:
-            births_data.extend(birth_service.get_by_code(commune))
+    def aggregate_births_by_department(self, dep: str):
+        """Agrège les naissances par département"""
+        communes_count = get_territory_index().count("department", dep)
+        if not communes_count:
+            return {"error": "Département non trouvé"}
 
-        yearly_births = {}
-        for birth in births_data:
-            year = birth.time_period
-            if year not in yearly_births:
-                yearly_births[year] = 0
-            yearly_births[year] += birth.obs_value
+        births_by_year = self._births_by_year(GeoCode.dep, dep)
+        return {
+            "department": dep,
+            "total_births": float(sum(births_by_year.values())),
+            "communes_count": communes_count,
+            "births_by_year": births_by_year
+        }
+
+    def aggregate_births_by_region(self, reg: str):
+        """Agrège les naissances par région"""
+        territories = get_territory_index()
+        communes_count = territories.count("region", reg)
+        if not communes_count:
+            return {"error": "Région non trouvée"}
 
+        births_by_year = self._births_by_year(GeoCode.reg, reg)
         return {
-            "epci": epci,
-            "epci_name": epci_name[0] if epci_name else "",
-            "total_births": float(sum(birth.obs_value for birth in births_data)),
-            "communes_count": int(len(communes)),
-            "births_by_year": {int(k): float(v) for k, v in yearly_births.items()}
+            "region": reg,
+            "total_births": float(sum(births_by_year.values())),
+            "communes_count": communes_count,
+            "departments_count": territories.count("region", reg, "department"),
+            "births_by_year": births_by_year
+        }
+
+    def aggregate_births_france(self):
+        """Agrège les naissances de toutes les communes de France"""
+        territories = get_territory_index()
+        births_by_year = self._births_by_year()
+        return {
+            "total_births": float(sum(births_by_year.values())),
+            "communes_count": territories.size("commune"),
+            "departments_count": territories.size("department"),
+            "regions_count": territories.size("region"),
+            "births_by_year": births_by_year
         }
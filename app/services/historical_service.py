@@ -1,11 +1,12 @@
 from sqlalchemy.orm import Session
 from typing import List, Dict
-from app.database import SessionLocal
+from app.database import ReadSessionLocal
 from app.models import Historical, GeoCode
 
 class HistoricalService:
-    def __init__(self):
-        self.db = SessionLocal()
+    def __init__(self, db: Session = None):
+        # Session fournie par la requête (Depends(get_read_db)) ou session propre au service
+        self.db = db if db is not None else ReadSessionLocal()
 
     def close(self):
         """Ferme la connexion à la base de données"""
@@ -53,8 +54,7 @@ class HistoricalService:
     def get_communes_historical_by_epci(self, epci: str):
         """Récupère l'évolution historique de population pour toutes les communes d'un EPCI"""
         try:
-            # Établir une connexion à la base de données
-            db = SessionLocal()
+            db = self.db
 
             # Récupérer les communes de l'EPCI
             communes = db.query(GeoCode.codgeo, GeoCode.libgeo).filter(GeoCode.epci == str(epci)).all()
@@ -196,7 +196,7 @@ class HistoricalService:
                 "communes": []
             }
         finally:
-            db.close()
+            self.close()
 
     def _safe_float(self, value):
         """Convertit une valeur en float de manière sécurisée"""
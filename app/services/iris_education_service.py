@@ -2,11 +2,12 @@
 app/services/iris_education_service.py
 """
 import logging
-from functools import lru_cache
 from typing import Optional
 
 from sqlalchemy import text
-from app.database import SessionLocal
+from app.cache import cached, invalidate_dataset
+from app.database import ReadSessionLocal, AsyncReadSessionLocal
+from app.datasets import dataset_watcher
 
 logger = logging.getLogger(__name__)
 
@@ -34,6 +35,32 @@ _SELECT = """
     FROM iris_education
 """
 
+_YEARS_SQL = "SELECT DISTINCT year FROM iris_education ORDER BY year"
+
+_BY_IRIS_SQL = f"{_SELECT} WHERE iris_code = :iris_code AND year = :year LIMIT 1"
+
+# niveau → (clé du code dans la réponse, requête paramétrée par :code et :year)
+_LEVELS = {
+    "commune": ("com_code", f"{_SELECT} WHERE com_code = :code AND year = :year ORDER BY iris_code"),
+    "epci": ("epci_code", """
+        SELECT ie.iris_code, ie.com_code, ie.iris_name, ie.dep_code, ie.reg_code, ie.year,
+               ie.pop_2_5, ie.pop_6_10, ie.pop_11_14, ie.pop_15_17, ie.pop_18_24, ie.pop_25_29, ie.pop_30p,
+               ie.scol_2_5, ie.scol_6_10, ie.scol_11_14, ie.scol_15_17, ie.scol_18_24, ie.scol_25_29, ie.scol_30p,
+               ie.nscol_15p, ie.nscol_15p_no_dip, ie.nscol_15p_bepc, ie.nscol_15p_capbep,
+               ie.nscol_15p_bac, ie.nscol_15p_sup2, ie.nscol_15p_sup34, ie.nscol_15p_sup5,
+               ie.nscol_15p_men, ie.nscol_15p_men_no_dip, ie.nscol_15p_men_bepc, ie.nscol_15p_men_capbep,
+               ie.nscol_15p_men_bac, ie.nscol_15p_men_sup2, ie.nscol_15p_men_sup34, ie.nscol_15p_men_sup5,
+               ie.nscol_15p_women, ie.nscol_15p_women_no_dip, ie.nscol_15p_women_bepc, ie.nscol_15p_women_capbep,
+               ie.nscol_15p_women_bac, ie.nscol_15p_women_sup2, ie.nscol_15p_women_sup34, ie.nscol_15p_women_sup5
+        FROM iris_education ie
+        JOIN geo_codes gc ON gc.codgeo = ie.com_code
+        WHERE gc.epci = :code AND ie.year = :year
+        ORDER BY ie.com_code, ie.iris_code
+    """),
+    "department": ("dep_code", f"{_SELECT} WHERE dep_code = :code AND year = :year ORDER BY com_code, iris_code"),
+    "region": ("reg_code", f"{_SELECT} WHERE reg_code = :code AND year = :year ORDER BY com_code, iris_code"),
+}
+
 
 def _safe_float(value) -> Optional[float]:
     try:
@@ -54,15 +81,23 @@ def _row_to_dict(row) -> dict:
     }
 
 
+def _build_payload(level: str, code: str, year: Optional[int], rows) -> dict:
+    iris_list = [_row_to_dict(r) for r in rows]
+    return {
+        _LEVELS[level][0]: code,
+        "year":       year,
+        "total_iris": len(iris_list),
+        "iris_list":  iris_list,
+    }
+
+
 class IrisEducationService:
 
-    @lru_cache(maxsize=1)
+    @cached("iris_education")
     def get_available_years(self) -> list:
-        db = SessionLocal()
+        db = ReadSessionLocal()
         try:
-            rows = db.execute(
-                text("SELECT DISTINCT year FROM iris_education ORDER BY year")
-            ).fetchall()
+            rows = db.execute(text(_YEARS_SQL)).fetchall()
             return [r[0] for r in rows]
         finally:
             db.close()
@@ -74,96 +109,91 @@ class IrisEducationService:
     def _resolve_year(self, year: Optional[int]) -> Optional[int]:
         return year if year is not None else self.get_latest_year()
 
+    def _fetch_level(self, level: str, code: str, year: Optional[int]) -> dict:
+        resolved_year = self._resolve_year(year)
+        db = ReadSessionLocal()
+        try:
+            rows = db.execute(text(_LEVELS[level][1]), {"code": code, "year": resolved_year}).fetchall()
+            return _build_payload(level, code, resolved_year, rows)
+        finally:
+            db.close()
+
+    # ── Par code IRIS ──────────────────────────────────────────────────────────
     def get_by_iris(self, iris_code: str, year: Optional[int] = None) -> Optional[dict]:
         resolved_year = self._resolve_year(year)
         if resolved_year is None:
             return None
-        db = SessionLocal()
+        db = ReadSessionLocal()
         try:
-            sql = text(f"{_SELECT} WHERE iris_code = :iris_code AND year = :year LIMIT 1")
-            row = db.execute(sql, {"iris_code": iris_code, "year": resolved_year}).fetchone()
+            row = db.execute(text(_BY_IRIS_SQL), {"iris_code": iris_code, "year": resolved_year}).fetchone()
             return _row_to_dict(row) if row else None
         finally:
             db.close()
 
-    @lru_cache(maxsize=1024)
+    # ── Par commune ─────────────────────────────────────────────────────────────
+    @cached("iris_education")
     def get_by_commune(self, com_code: str, year: Optional[int] = None) -> dict:
-        resolved_year = self._resolve_year(year)
-        db = SessionLocal()
-        try:
-            sql = text(f"{_SELECT} WHERE com_code = :com_code AND year = :year ORDER BY iris_code")
-            rows = db.execute(sql, {"com_code": com_code, "year": resolved_year}).fetchall()
-            iris_list = [_row_to_dict(r) for r in rows]
-            return {
-                "com_code":   com_code,
-                "year":       resolved_year,
-                "total_iris": len(iris_list),
-                "iris_list":  iris_list,
-            }
-        finally:
-            db.close()
+        return self._fetch_level("commune", com_code, year)
 
-    @lru_cache(maxsize=512)
+    # ── Par EPCI ────────────────────────────────────────────────────────────────
+    @cached("iris_education")
     def get_by_epci(self, epci_code: str, year: Optional[int] = None) -> dict:
-        resolved_year = self._resolve_year(year)
-        db = SessionLocal()
-        try:
-            sql = text("""
-                SELECT ie.iris_code, ie.com_code, ie.iris_name, ie.dep_code, ie.reg_code, ie.year,
-                       ie.pop_2_5, ie.pop_6_10, ie.pop_11_14, ie.pop_15_17, ie.pop_18_24, ie.pop_25_29, ie.pop_30p,
-                       ie.scol_2_5, ie.scol_6_10, ie.scol_11_14, ie.scol_15_17, ie.scol_18_24, ie.scol_25_29, ie.scol_30p,
-                       ie.nscol_15p, ie.nscol_15p_no_dip, ie.nscol_15p_bepc, ie.nscol_15p_capbep,
-                       ie.nscol_15p_bac, ie.nscol_15p_sup2, ie.nscol_15p_sup34, ie.nscol_15p_sup5,
-                       ie.nscol_15p_men, ie.nscol_15p_men_no_dip, ie.nscol_15p_men_bepc, ie.nscol_15p_men_capbep,
-                       ie.nscol_15p_men_bac, ie.nscol_15p_men_sup2, ie.nscol_15p_men_sup34, ie.nscol_15p_men_sup5,
-                       ie.nscol_15p_women, ie.nscol_15p_women_no_dip, ie.nscol_15p_women_bepc, ie.nscol_15p_women_capbep,
-                       ie.nscol_15p_women_bac, ie.nscol_15p_women_sup2, ie.nscol_15p_women_sup34, ie.nscol_15p_women_sup5
-                FROM iris_education ie
-                JOIN geo_codes gc ON gc.codgeo = ie.com_code
-                WHERE gc.epci = :epci_code AND ie.year = :year
-                ORDER BY ie.com_code, ie.iris_code
-            """)
-            rows = db.execute(sql, {"epci_code": epci_code, "year": resolved_year}).fetchall()
-            iris_list = [_row_to_dict(r) for r in rows]
-            return {
-                "epci_code":  epci_code,
-                "year":       resolved_year,
-                "total_iris": len(iris_list),
-                "iris_list":  iris_list,
-            }
-        finally:
-            db.close()
+        return self._fetch_level("epci", epci_code, year)
 
-    @lru_cache(maxsize=200)
+    # ── Par département ─────────────────────────────────────────────────────────
+    @cached("iris_education")
     def get_by_department(self, dep_code: str, year: Optional[int] = None) -> dict:
-        resolved_year = self._resolve_year(year)
-        db = SessionLocal()
-        try:
-            sql = text(f"{_SELECT} WHERE dep_code = :dep_code AND year = :year ORDER BY com_code, iris_code")
-            rows = db.execute(sql, {"dep_code": dep_code, "year": resolved_year}).fetchall()
-            iris_list = [_row_to_dict(r) for r in rows]
-            return {
-                "dep_code":   dep_code,
-                "year":       resolved_year,
-                "total_iris": len(iris_list),
-                "iris_list":  iris_list,
-            }
-        finally:
-            db.close()
+        return self._fetch_level("department", dep_code, year)
 
-    @lru_cache(maxsize=50)
+    # ── Par région ──────────────────────────────────────────────────────────────
+    @cached("iris_education")
     def get_by_region(self, reg_code: str, year: Optional[int] = None) -> dict:
-        resolved_year = self._resolve_year(year)
-        db = SessionLocal()
-        try:
-            sql = text(f"{_SELECT} WHERE reg_code = :reg_code AND year = :year ORDER BY com_code, iris_code")
-            rows = db.execute(sql, {"reg_code": reg_code, "year": resolved_year}).fetchall()
-            iris_list = [_row_to_dict(r) for r in rows]
-            return {
-                "reg_code":   reg_code,
-                "year":       resolved_year,
-                "total_iris": len(iris_list),
-                "iris_list":  iris_list,
-            }
-        finally:
-            db.close()
+        return self._fetch_level("region", reg_code, year)
+
+    # ── Variantes asynchrones (asyncpg) — utilisées par les endpoints ──────────
+    @cached("iris_education")
+    async def get_available_years_async(self) -> list:
+        async with AsyncReadSessionLocal() as db:
+            result = await db.execute(text(_YEARS_SQL))
+            return [r[0] for r in result.fetchall()]
+
+    async def _resolve_year_async(self, year: Optional[int]) -> Optional[int]:
+        if year is not None:
+            return year
+        years = await self.get_available_years_async()
+        return max(years) if years else None
+
+    async def _fetch_level_async(self, level: str, code: str, year: Optional[int]) -> dict:
+        resolved_year = await self._resolve_year_async(year)
+        async with AsyncReadSessionLocal() as db:
+            result = await db.execute(text(_LEVELS[level][1]), {"code": code, "year": resolved_year})
+            return _build_payload(level, code, resolved_year, result.fetchall())
+
+    async def get_by_iris_async(self, iris_code: str, year: Optional[int] = None) -> Optional[dict]:
+        resolved_year = await self._resolve_year_async(year)
+        if resolved_year is None:
+            return None
+        async with AsyncReadSessionLocal() as db:
+            result = await db.execute(text(_BY_IRIS_SQL), {"iris_code": iris_code, "year": resolved_year})
+            row = result.fetchone()
+            return _row_to_dict(row) if row else None
+
+    @cached("iris_education")
+    async def get_by_commune_async(self, com_code: str, year: Optional[int] = None) -> dict:
+        return await self._fetch_level_async("commune", com_code, year)
+
+    @cached("iris_education")
+    async def get_by_epci_async(self, epci_code: str, year: Optional[int] = None) -> dict:
+        return await self._fetch_level_async("epci", epci_code, year)
+
+    @cached("iris_education")
+    async def get_by_department_async(self, dep_code: str, year: Optional[int] = None) -> dict:
+        return await self._fetch_level_async("department", dep_code, year)
+
+    @cached("iris_education")
+    async def get_by_region_async(self, reg_code: str, year: Optional[int] = None) -> dict:
+        return await self._fetch_level_async("region", reg_code, year)
+
+
+# Nouvelle version de iris_education importée : purge des résultats mis en cache
+dataset_watcher.subscribe("iris_education", invalidate_dataset)
@@ -1,16 +1,78 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func, case, and_
-from app.database import SessionLocal
-from app.models import Population, GeoCode
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, case, and_, select
+from app.database import ReadSessionLocal
+from app.models import Population, GeoCode, PopulationChildrenRollup
+from app.territory import get_territory_index, get_territory_index_async
+
+
+def _children_columns():
+    """Colonnes SUM(nb) totale, moins de 3 ans et 3-5 ans (partagées sync/async)"""
+    return (
+        func.sum(Population.nb).label('total'),
+        func.sum(case(
+            (Population.aged100.in_(['000', '001', '002']), Population.nb),
+            else_=0
+        )).label('under_3'),
+        func.sum(case(
+            (Population.aged100.in_(['003', '004', '005']), Population.nb),
+            else_=0
+        )).label('three_to_five'),
+    )
+
+
+def _children_stats(result) -> dict:
+    """Construit les totaux et taux d'enfants à partir d'une ligne (total, under_3, three_to_five)"""
+    total_pop = float(result.total or 0) if result else 0.0
+    under_3 = float(result.under_3 or 0) if result else 0.0
+    three_to_five = float(result.three_to_five or 0) if result else 0.0
+    return {
+        "total_population": total_pop,
+        "children_under_3": under_3,
+        "children_3_to_5": three_to_five,
+        "under_3_rate": float(under_3 / total_pop * 100) if total_pop > 0 else 0,
+        "three_to_five_rate": float(three_to_five / total_pop * 100) if total_pop > 0 else 0
+    }
+
+
+# Critères de tri des listes de communes (statistiques enfants)
+CHILDREN_SORT_KEYS = (
+    "code", "name", "total_population", "children_under_3", "children_3_to_5",
+    "under_3_rate", "three_to_five_rate",
+)
 
 
 class PopulationService:
-    def __init__(self):
-        self.db = SessionLocal()
+    def __init__(self, db: Session = None):
+        # Session fournie par la requête (Depends(get_read_db)) ou session propre au
+        # service, ouverte au premier usage : les méthodes *_async reçoivent leur
+        # AsyncSession et n'en ouvrent aucune
+        self._db = db
+
+    @property
+    def db(self) -> Session:
+        if self._db is None:
+            self._db = ReadSessionLocal()
+        return self._db
 
     def close(self):
         """Ferme la connexion à la base de données"""
-        self.db.close()
+        if self._db is not None:
+            self._db.close()
+
+    def _children_totals(self, level: str, code: str = "FR", column=None):
+        """
+        Totaux (total, under_3, three_to_five) d'un territoire : une ligne de
+        population_children_rollup lue par clé primaire, ou à défaut (agrégats
+        pas encore calculés) l'agrégat direct sur populations.
+        """
+        row = self.db.get(PopulationChildrenRollup, (level, str(code)))
+        if row is not None:
+            return row
+        query = self.db.query(*_children_columns())
+        if column is not None:
+            query = query.join(GeoCode, Population.codgeo == GeoCode.codgeo).filter(column == str(code))
+        return query.first()
 
     def _safe_float(self, value):
         """Convertit une valeur en float de manière sécurisée"""
@@ -22,6 +84,20 @@ class PopulationService:
         except (ValueError, TypeError):
             return 0.0
 
+    def _format_population(self, results):
+        """Formate les lignes de la pyramide des âges pour l'API"""
+        return [
+            {
+                "NIVGEO": r.nivgeo,
+                "CODGEO": r.codgeo,
+                "LIBGEO": r.libgeo,
+                "SEXE": r.sexe,
+                "AGED100": r.aged100,
+                "NB": r.nb
+            }
+            for r in results
+        ]
+
     # -------------------------------------------------------------------------
     # Commune
     # -------------------------------------------------------------------------
@@ -32,17 +108,7 @@ class PopulationService:
                 Population.codgeo == str(codgeo)
             ).all()
 
-            return [
-                {
-                    "NIVGEO": r.nivgeo,
-                    "CODGEO": r.codgeo,
-                    "LIBGEO": r.libgeo,
-                    "SEXE": r.sexe,
-                    "AGED100": r.aged100,
-                    "NB": r.nb
-                }
-                for r in results
-            ]
+            return self._format_population(results)
         except Exception as e:
             print(f"Erreur lors de la récupération des données de population pour {codgeo}: {str(e)}")
             return []
@@ -54,31 +120,11 @@ class PopulationService:
         try:
             # OPTIMISATION : 1 requête au lieu de 3
             # Calcul identique : SUM(nb), SUM(nb WHERE aged100 IN 000-002), SUM(nb WHERE aged100 IN 003-005)
-            result = self.db.query(
-                func.sum(Population.nb).label('total'),
-                func.sum(case(
-                    (Population.aged100.in_(['000', '001', '002']), Population.nb),
-                    else_=0
-                )).label('under_3'),
-                func.sum(case(
-                    (Population.aged100.in_(['003', '004', '005']), Population.nb),
-                    else_=0
-                )).label('three_to_five'),
-            ).filter(
+            result = self.db.query(*_children_columns()).filter(
                 Population.codgeo == str(code)
             ).first()
 
-            total_pop = float(result.total or 0)
-            under_3 = float(result.under_3 or 0)
-            three_to_five = float(result.three_to_five or 0)
-
-            return {
-                "total_population": total_pop,
-                "children_under_3": under_3,
-                "children_3_to_5": three_to_five,
-                "under_3_rate": float(under_3 / total_pop * 100) if total_pop > 0 else 0,
-                "three_to_five_rate": float(three_to_five / total_pop * 100) if total_pop > 0 else 0
-            }
+            return _children_stats(result)
         except Exception as e:
             print(f"Erreur lors du calcul des taux d'enfants pour {code}: {str(e)}")
             return {
@@ -94,12 +140,13 @@ class PopulationService:
     # -------------------------------------------------------------------------
     # EPCI — 1 requête JOIN au lieu de 4 requêtes avec IN(...)
     # -------------------------------------------------------------------------
-    def aggregate_children_by_epci(self, epci: str, geocode_service):
+    def aggregate_children_by_epci(self, epci: str):
         """Agrège les statistiques des enfants pour un EPCI"""
         try:
-            # Compteur communes depuis geo_codes (identique à l'original)
-            communes = self.db.query(GeoCode.codgeo).filter(GeoCode.epci == str(epci)).all()
-            if not communes:
+            # Compteur communes depuis l'index territorial (sans requête)
+            territories = get_territory_index()
+            communes_count = territories.count("epci", epci)
+            if not communes_count:
                 return {
                     "epci": epci,
                     "epci_name": "",
@@ -111,32 +158,15 @@ class PopulationService:
                     "communes_count": 0
                 }
 
-            communes_count = len(communes)
-
-            # OPTIMISATION : 1 requête JOIN au lieu de 3 requêtes IN(...)
-            result = self.db.query(
-                func.sum(Population.nb).label('total'),
-                func.sum(case(
-                    (Population.aged100.in_(['000', '001', '002']), Population.nb),
-                    else_=0
-                )).label('under_3'),
-                func.sum(case(
-                    (Population.aged100.in_(['003', '004', '005']), Population.nb),
-                    else_=0
-                )).label('three_to_five'),
-            ).join(
-                GeoCode, Population.codgeo == GeoCode.codgeo
-            ).filter(
-                GeoCode.epci == str(epci)
-            ).first()
+            # Agrégat précalculé : 1 lecture par clé primaire
+            result = self._children_totals("epci", epci, GeoCode.epci)
 
             total_pop = float(result.total or 0)
             under_3 = float(result.under_3 or 0)
             three_to_five = float(result.three_to_five or 0)
 
             # Obtenir le nom de l'EPCI
-            epci_info = self.db.query(GeoCode.libepci).filter(GeoCode.epci == str(epci)).first()
-            epci_name = epci_info[0] if epci_info else f"EPCI {epci}"
+            epci_name = territories.name_of("epci", epci) or f"EPCI {epci}"
 
             return {
                 "epci": epci,
@@ -166,12 +196,12 @@ class PopulationService:
     # -------------------------------------------------------------------------
     # Département — 1 requête JOIN au lieu de 4 requêtes avec IN(...)
     # -------------------------------------------------------------------------
-    def aggregate_children_by_department(self, dep: str, geocode_service):
+    def aggregate_children_by_department(self, dep: str):
         """Agrège les statistiques des enfants pour un département"""
         try:
-            # Compteur communes depuis geo_codes (identique à l'original)
-            communes = self.db.query(GeoCode.codgeo).filter(GeoCode.dep == str(dep)).all()
-            if not communes:
+            # Compteur communes depuis l'index territorial (sans requête)
+            communes_count = get_territory_index().count("department", dep)
+            if not communes_count:
                 return {
                     "department": dep,
                     "total_population": 0.0,
@@ -182,24 +212,8 @@ class PopulationService:
                     "communes_count": 0
                 }
 
-            communes_count = len(communes)
-
-            # OPTIMISATION : 1 requête JOIN au lieu de 3 requêtes IN(...)
-            result = self.db.query(
-                func.sum(Population.nb).label('total'),
-                func.sum(case(
-                    (Population.aged100.in_(['000', '001', '002']), Population.nb),
-                    else_=0
-                )).label('under_3'),
-                func.sum(case(
-                    (Population.aged100.in_(['003', '004', '005']), Population.nb),
-                    else_=0
-                )).label('three_to_five'),
-            ).join(
-                GeoCode, Population.codgeo == GeoCode.codgeo
-            ).filter(
-                GeoCode.dep == str(dep)
-            ).first()
+            # Agrégat précalculé : 1 lecture par clé primaire
+            result = self._children_totals("department", dep, GeoCode.dep)
 
             total_pop = float(result.total or 0)
             under_3 = float(result.under_3 or 0)
@@ -231,12 +245,13 @@ class PopulationService:
     # -------------------------------------------------------------------------
     # Région — 1 requête JOIN au lieu de 5 requêtes avec IN(...)
     # -------------------------------------------------------------------------
-    def aggregate_children_by_region(self, reg: str, geocode_service):
+    def aggregate_children_by_region(self, reg: str):
         """Agrège les statistiques des enfants pour une région"""
         try:
-            # Compteurs depuis geo_codes (identique à l'original)
-            communes = self.db.query(GeoCode.codgeo).filter(GeoCode.reg == str(reg)).all()
-            if not communes:
+            # Compteurs depuis l'index territorial (sans requête)
+            territories = get_territory_index()
+            communes_count = territories.count("region", reg)
+            if not communes_count:
                 return {
                     "region": reg,
                     "total_population": 0.0,
@@ -248,28 +263,10 @@ class PopulationService:
                     "departments_count": 0
                 }
 
-            communes_count = len(communes)
-
-            # Compter les départements dans la région (identique à l'original)
-            departments = self.db.query(GeoCode.dep).filter(GeoCode.reg == str(reg)).distinct().all()
-            departments_count = len(departments)
-
-            # OPTIMISATION : 1 requête JOIN au lieu de 3 requêtes IN(...)
-            result = self.db.query(
-                func.sum(Population.nb).label('total'),
-                func.sum(case(
-                    (Population.aged100.in_(['000', '001', '002']), Population.nb),
-                    else_=0
-                )).label('under_3'),
-                func.sum(case(
-                    (Population.aged100.in_(['003', '004', '005']), Population.nb),
-                    else_=0
-                )).label('three_to_five'),
-            ).join(
-                GeoCode, Population.codgeo == GeoCode.codgeo
-            ).filter(
-                GeoCode.reg == str(reg)
-            ).first()
+            departments_count = territories.count("region", reg, "department")
+
+            # Agrégat précalculé : 1 lecture par clé primaire
+            result = self._children_totals("region", reg, GeoCode.reg)
 
             total_pop = float(result.total or 0)
             under_3 = float(result.under_3 or 0)
@@ -303,26 +300,17 @@ class PopulationService:
     # -------------------------------------------------------------------------
     # France — 2 requêtes au lieu de 6
     # -------------------------------------------------------------------------
-    def aggregate_children_france(self, geocode_service):
+    def aggregate_children_france(self):
         """Agrège les statistiques des enfants au niveau national"""
         try:
-            # OPTIMISATION : 1 requête pour population + enfants (au lieu de 3)
-            result = self.db.query(
-                func.sum(Population.nb).label('total'),
-                func.sum(case(
-                    (Population.aged100.in_(['000', '001', '002']), Population.nb),
-                    else_=0
-                )).label('under_3'),
-                func.sum(case(
-                    (Population.aged100.in_(['003', '004', '005']), Population.nb),
-                    else_=0
-                )).label('three_to_five'),
-            ).first()
+            # Agrégat précalculé : 1 lecture par clé primaire (au lieu d'un parcours de populations)
+            result = self._children_totals("france")
 
-            # Compteurs géographiques depuis geo_codes (identique à l'original)
-            communes_count = self.db.query(func.count(GeoCode.codgeo)).scalar() or 0
-            departments_count = self.db.query(func.count(func.distinct(GeoCode.dep))).scalar() or 0
-            regions_count = self.db.query(func.count(func.distinct(GeoCode.reg))).scalar() or 0
+            # Compteurs géographiques depuis l'index territorial (sans requête)
+            territories = get_territory_index()
+            communes_count = territories.size("commune")
+            departments_count = territories.size("department")
+            regions_count = territories.size("region")
 
             total_pop = float(result.total or 0)
             under_3 = float(result.under_3 or 0)
@@ -354,15 +342,179 @@ class PopulationService:
             self.close()
 
     # -------------------------------------------------------------------------
-    # EPCI — liste des communes avec statistiques enfants (inchangé)
+    # Variantes asynchrones (AsyncSession / asyncpg) — utilisées par les
+    # endpoints `async def` pour ne pas bloquer la boucle d'événements.
+    # Mêmes requêtes et même format de réponse que les méthodes synchrones ;
+    # comptages et libellés viennent de l'index territorial (sans requête).
     # -------------------------------------------------------------------------
-    def get_children_by_epci_communes(self, epci: str, geocode_service):
-        """Récupère les statistiques des enfants pour toutes les communes d'un EPCI"""
+    async def _children_totals_async(self, db: AsyncSession, level: str, column=None, value="FR"):
+        row = await db.get(PopulationChildrenRollup, (level, str(value)))
+        if row is not None:
+            return row
+        stmt = select(*_children_columns())
+        if column is not None:
+            stmt = stmt.join(GeoCode, Population.codgeo == GeoCode.codgeo).where(column == str(value))
+        return (await db.execute(stmt)).first()
+
+    async def get_by_code_async(self, db: AsyncSession, codgeo: str):
+        """Récupère la pyramide des âges d'une commune"""
         try:
-            # Obtenir les communes de l'EPCI
-            communes = self.db.query(GeoCode.codgeo, GeoCode.libgeo).filter(GeoCode.epci == str(epci)).all()
+            result = await db.execute(select(Population).where(Population.codgeo == str(codgeo)))
+            return self._format_population(result.scalars().all())
+        except Exception as e:
+            print(f"Erreur lors de la récupération des données de population pour {codgeo}: {str(e)}")
+            return []
+
+    async def get_population_and_children_rate_async(self, db: AsyncSession, code: str):
+        """Calcule les taux d'enfants par tranches d'âge pour une commune"""
+        try:
+            result = await db.execute(select(*_children_columns()).where(Population.codgeo == str(code)))
+            return _children_stats(result.first())
+        except Exception as e:
+            print(f"Erreur lors du calcul des taux d'enfants pour {code}: {str(e)}")
+            return _children_stats(None)
+
+    async def aggregate_children_by_epci_async(self, db: AsyncSession, epci: str):
+        """Agrège les statistiques des enfants pour un EPCI"""
+        try:
+            territories = await get_territory_index_async()
+            communes_count = territories.count("epci", epci)
+            if not communes_count:
+                return {"epci": epci, "epci_name": "", **_children_stats(None), "communes_count": 0}
 
-            if not communes:
+            result = await self._children_totals_async(db, "epci", GeoCode.epci, epci)
+            epci_name = territories.name_of("epci", epci) or f"EPCI {epci}"
+
+            return {
+                "epci": epci,
+                "epci_name": epci_name,
+                **_children_stats(result),
+                "communes_count": communes_count
+            }
+        except Exception as e:
+            print(f"Erreur lors de l'agrégation pour l'EPCI {epci}: {str(e)}")
+            return {"epci": epci, "epci_name": "", **_children_stats(None), "communes_count": 0}
+
+    async def aggregate_children_by_department_async(self, db: AsyncSession, dep: str):
+        """Agrège les statistiques des enfants pour un département"""
+        try:
+            communes_count = (await get_territory_index_async()).count("department", dep)
+            if not communes_count:
+                return {"department": dep, **_children_stats(None), "communes_count": 0}
+
+            result = await self._children_totals_async(db, "department", GeoCode.dep, dep)
+
+            return {"department": dep, **_children_stats(result), "communes_count": communes_count}
+        except Exception as e:
+            print(f"Erreur lors de l'agrégation pour le département {dep}: {str(e)}")
+            return {"department": dep, **_children_stats(None), "communes_count": 0}
+
+    async def aggregate_children_by_region_async(self, db: AsyncSession, reg: str):
+        """Agrège les statistiques des enfants pour une région"""
+        try:
+            territories = await get_territory_index_async()
+            communes_count = territories.count("region", reg)
+            if not communes_count:
+                return {"region": reg, **_children_stats(None), "communes_count": 0, "departments_count": 0}
+
+            departments_count = territories.count("region", reg, "department")
+            result = await self._children_totals_async(db, "region", GeoCode.reg, reg)
+
+            return {
+                "region": reg,
+                **_children_stats(result),
+                "communes_count": communes_count,
+                "departments_count": departments_count
+            }
+        except Exception as e:
+            print(f"Erreur lors de l'agrégation pour la région {reg}: {str(e)}")
+            return {"region": reg, **_children_stats(None), "communes_count": 0, "departments_count": 0}
+
+    async def aggregate_children_france_async(self, db: AsyncSession):
+        """Agrège les statistiques des enfants au niveau national"""
+        try:
+            result = await self._children_totals_async(db, "france")
+            territories = await get_territory_index_async()
+
+            return {
+                **_children_stats(result),
+                "communes_count": territories.size("commune"),
+                "departments_count": territories.size("department"),
+                "regions_count": territories.size("region")
+            }
+        except Exception as e:
+            # Pas de repli à zéro : la réponse nationale est mise en cache (cached_response)
+            print(f"Erreur lors de l'agrégation pour la France: {str(e)}")
+            raise
+
+    # -------------------------------------------------------------------------
+    # Listes des communes avec statistiques enfants — 1 requête ensembliste
+    # -------------------------------------------------------------------------
+    def _communes_children_query(self, level: str, column, code: str):
+        """
+        Statistiques enfants de toutes les communes d'un territoire en 1 requête :
+        lignes 'commune' de population_children_rollup jointes à geo_codes, ou à
+        défaut (agrégats pas encore calculés) un GROUP BY codgeo sur populations.
+        Les communes sans données de population sont gardées avec des zéros.
+        """
+        if self.db.get(PopulationChildrenRollup, (level, str(code))) is not None:
+            source = self.db.query(
+                PopulationChildrenRollup.code.label('codgeo'),
+                PopulationChildrenRollup.total,
+                PopulationChildrenRollup.under_3,
+                PopulationChildrenRollup.three_to_five
+            ).filter(PopulationChildrenRollup.level == "commune").subquery()
+        else:
+            members = self.db.query(GeoCode.codgeo).filter(column == str(code))
+            source = self.db.query(
+                Population.codgeo,
+                *_children_columns()
+            ).filter(
+                Population.codgeo.in_(members)
+            ).group_by(Population.codgeo).subquery()
+
+        total = func.coalesce(source.c.total, 0)
+        under_3 = func.coalesce(source.c.under_3, 0)
+        three_to_five = func.coalesce(source.c.three_to_five, 0)
+        columns = {
+            "code": GeoCode.codgeo,
+            "name": GeoCode.libgeo,
+            "total_population": total,
+            "children_under_3": under_3,
+            "children_3_to_5": three_to_five,
+            "under_3_rate": case((total > 0, under_3 * 100.0 / total), else_=0),
+            "three_to_five_rate": case((total > 0, three_to_five * 100.0 / total), else_=0),
+        }
+        query = self.db.query(
+            *(expression.label(name) for name, expression in columns.items())
+        ).outerjoin(
+            source, source.c.codgeo == GeoCode.codgeo
+        ).filter(
+            column == str(code)
+        )
+        return query, columns
+
+    def _format_communes_children(self, rows) -> list:
+        return [
+            {
+                "code": row.code,
+                "name": row.name or f"Commune {row.code}",
+                "total_population": float(row.total_population),
+                "children_under_3": float(row.children_under_3),
+                "children_3_to_5": float(row.children_3_to_5),
+                "under_3_rate": float(row.under_3_rate),
+                "three_to_five_rate": float(row.three_to_five_rate)
+            }
+            for row in rows
+        ]
+
+    def get_children_by_epci_communes(self, epci: str):
+        """Récupère les statistiques des enfants pour toutes les communes d'un EPCI (triées par code)"""
+        try:
+            territories = get_territory_index()
+            communes_count = territories.count("epci", epci)
+
+            if not communes_count:
                 return {
                     "epci": epci,
                     "epci_name": "",
@@ -370,22 +522,13 @@ class PopulationService:
                     "communes": []
                 }
 
-            # Récupérer les données pour chaque commune
-            communes_data = []
-            for code, name in communes:
-                commune_data = self.get_population_and_children_rate(code)
-                commune_data["code"] = code
-                commune_data["name"] = name
-                communes_data.append(commune_data)
-
-            # Obtenir le nom de l'EPCI
-            epci_info = self.db.query(GeoCode.libepci).filter(GeoCode.epci == str(epci)).first()
-            epci_name = epci_info[0] if epci_info else f"EPCI {epci}"
+            query, _ = self._communes_children_query("epci", GeoCode.epci, epci)
+            communes_data = self._format_communes_children(query.order_by(GeoCode.codgeo).all())
 
             return {
                 "epci": epci,
-                "epci_name": epci_name,
-                "communes_count": len(communes),
+                "epci_name": territories.name_of("epci", epci) or f"EPCI {epci}",
+                "communes_count": communes_count,
                 "communes": communes_data
             }
         except Exception as e:
@@ -399,131 +542,293 @@ class PopulationService:
         finally:
             self.close()
 
+    def _communes_children_page(self, level: str, column, code: str, sort_by: str, order: str, limit: int, offset: int) -> dict:
+        """Page triée (ORDER BY / LIMIT / OFFSET en SQL) des communes d'un département ou d'une région"""
+        communes_count = get_territory_index().count(level, code)
+        page = {
+            "communes_count": communes_count,
+            "sort_by": sort_by,
+            "order": order,
+            "limit": limit,
+            "offset": offset,
+            "communes": []
+        }
+        if not communes_count:
+            return page
+
+        query, columns = self._communes_children_query(level, column, code)
+        sort_column = columns[sort_by]
+        rows = query.order_by(
+            sort_column.desc() if order == "desc" else sort_column.asc(),
+            GeoCode.codgeo
+        ).limit(limit).offset(offset).all()
+        page["communes"] = self._format_communes_children(rows)
+        return page
+
+    def get_children_by_department_communes(self, dep: str, sort_by: str = "total_population",
+                                            order: str = "desc", limit: int = 100, offset: int = 0):
+        """Récupère les statistiques des enfants des communes d'un département, triées et paginées"""
+        try:
+            return {
+                "department": dep,
+                **self._communes_children_page("department", GeoCode.dep, dep, sort_by, order, limit, offset)
+            }
+        except Exception as e:
+            print(f"Erreur lors de la récupération des données des communes pour le département {dep}: {str(e)}")
+            return {
+                "department": dep,
+                "communes_count": 0,
+                "sort_by": sort_by,
+                "order": order,
+                "limit": limit,
+                "offset": offset,
+                "communes": []
+            }
+        finally:
+            self.close()
+
+    def get_children_by_region_communes(self, reg: str, sort_by: str = "total_population",
+                                        order: str = "desc", limit: int = 100, offset: int = 0):
+        """Récupère les statistiques des enfants des communes d'une région, triées et paginées"""
+        try:
+            return {
+                "region": reg,
+                **self._communes_children_page("region", GeoCode.reg, reg, sort_by, order, limit, offset)
+            }
+        except Exception as e:
+            print(f"Erreur lors de la récupération des données des communes pour la région {reg}: {str(e)}")
+            return {
+                "region": reg,
+                "communes_count": 0,
+                "sort_by": sort_by,
+                "order": order,
+                "limit": limit,
+                "offset": offset,
+                "communes": []
+            }
+        finally:
+            self.close()
+
     # -------------------------------------------------------------------------
-    # EPCI — pyramide des âges complète (inchangé)
+    # Pyramide des âges complète — requêtes ensemblistes (EPCI, département, région, France)
     # -------------------------------------------------------------------------
+    def _empty_pyramid(self) -> dict:
+        return {
+            "total_population": 0,
+            "men_count": 0,
+            "women_count": 0,
+            "gender_ratio": {"men_percentage": 0, "women_percentage": 0},
+            "population_by_age": [],
+        }
+
+    def _age_pyramid(self, column=None, code: str = None) -> dict:
+        """
+        Pyramide des âges d'un territoire en 1 requête GROUP BY âge × sexe
+        (JOIN geo_codes filtré sur `column` = `code`, France entière si `column` est None).
+        """
+        query = self.db.query(
+            Population.aged100,
+            Population.sexe,
+            func.sum(Population.nb).label('total')
+        )
+        if column is not None:
+            query = query.join(GeoCode, Population.codgeo == GeoCode.codgeo).filter(column == str(code))
+        population_data = query.group_by(Population.aged100, Population.sexe).all()
+
+        # Initialiser la structure avec tous les âges de 0 à 100 ('000' à '100')
+        population_by_age = {
+            str(age).zfill(3): {"age": age, "total": 0, "men": 0, "women": 0}
+            for age in range(101)
+        }
+        men_count = 0
+        women_count = 0
+        total_population = 0
+
+        for age, sexe, count in population_data:
+            count_float = self._safe_float(count)
+            total_population += count_float
+            if sexe == "1":  # Homme
+                men_count += count_float
+            elif sexe == "2":  # Femme
+                women_count += count_float
+
+            if age in population_by_age:
+                population_by_age[age]["total"] += count_float
+                if sexe == "1":
+                    population_by_age[age]["men"] += count_float
+                elif sexe == "2":
+                    population_by_age[age]["women"] += count_float
+
+        return {
+            "total_population": total_population,
+            "men_count": men_count,
+            "women_count": women_count,
+            "gender_ratio": {
+                "men_percentage": round(men_count / total_population * 100, 2) if total_population > 0 else 0,
+                "women_percentage": round(women_count / total_population * 100, 2) if total_population > 0 else 0
+            },
+            # Liste ordonnée par âge croissant
+            "population_by_age": list(population_by_age.values())
+        }
+
+    def _communes_population(self, column, code: str) -> list:
+        """Population de chaque commune d'un territoire avec son nom (1 requête GROUP BY), décroissante"""
+        rows = self.db.query(
+            GeoCode.codgeo,
+            GeoCode.libgeo,
+            func.coalesce(func.sum(Population.nb), 0).label('population')
+        ).outerjoin(
+            Population, Population.codgeo == GeoCode.codgeo
+        ).filter(
+            column == str(code)
+        ).group_by(
+            GeoCode.codgeo,
+            GeoCode.libgeo
+        ).all()
+
+        communes_info = [
+            {
+                "code": row.codgeo,
+                "name": row.libgeo or f"Commune {row.codgeo}",
+                "population": float(row.population)
+            }
+            for row in rows
+        ]
+        communes_info.sort(key=lambda x: x["population"], reverse=True)
+        return communes_info
+
+    def _subdivisions_population(self, group_column, label: str, column=None, code: str = None) -> list:
+        """Population de chaque département / région d'un territoire (1 requête GROUP BY), décroissante"""
+        query = self.db.query(
+            group_column.label('code'),
+            func.sum(Population.nb).label('population')
+        ).join(GeoCode, Population.codgeo == GeoCode.codgeo)
+        if column is not None:
+            query = query.filter(column == str(code))
+        rows = query.group_by(group_column).all()
+
+        # geo_codes ne contient pas les libellés des départements et des régions
+        subdivisions = [
+            {
+                "code": row.code,
+                "name": f"{label} {row.code}",
+                "population": self._safe_float(row.population)
+            }
+            for row in rows
+        ]
+        subdivisions.sort(key=lambda x: x["population"], reverse=True)
+        return subdivisions
+
     def get_epci_population(self, epci: str):
-        """Récupère la pyramide des âges d'un EPCI en agrégeant les communes membres"""
+        """Récupère la pyramide des âges d'un EPCI (2 requêtes : âge × sexe, puis par commune)"""
         try:
-            # Récupérer les communes de l'EPCI
-            communes = self.db.query(GeoCode.codgeo).filter(GeoCode.epci == str(epci)).all()
+            territories = get_territory_index()
+            communes_count = territories.count("epci", epci)
 
-            if not communes:
+            if not communes_count:
                 return {
                     "epci": epci,
                     "epci_name": "",
                     "communes_count": 0,
-                    "total_population": 0,
-                    "men_count": 0,
-                    "women_count": 0,
-                    "population_by_age": {},
+                    **self._empty_pyramid(),
                     "communes": []
                 }
 
-            commune_codes = [c[0] for c in communes]
-
-            # Récupérer le nom de l'EPCI
-            epci_info = self.db.query(GeoCode.libepci).filter(GeoCode.epci == str(epci)).first()
-            epci_name = epci_info[0] if epci_info else f"EPCI {epci}"
-
-            # Récupérer les données agrégées par sexe et âge pour toutes les communes de l'EPCI
-            population_data = self.db.query(
-                Population.aged100,
-                Population.sexe,
-                func.sum(Population.nb).label('total')
-            ).filter(
-                Population.codgeo.in_(commune_codes)
-            ).group_by(
-                Population.aged100,
-                Population.sexe
-            ).all()
-
-            # Préparer la structure pour la réponse
-            population_by_age = {}
-            men_count = 0
-            women_count = 0
-            total_population = 0
-
-            # Initialiser la structure avec tous les âges de 0 à 100
-            for age in range(101):  # 0 à 100 inclus
-                age_str = str(age).zfill(3)  # Formater comme '000', '001', ..., '100'
-                population_by_age[age_str] = {"total": 0, "men": 0, "women": 0, "age": age}
-
-            # Organiser les données par âge et sexe
-            for age, sexe, count in population_data:
-                count_float = self._safe_float(count)
-                total_population += count_float
-
-                # Différencier par sexe
-                if sexe == "1":  # Homme
-                    men_count += count_float
-                elif sexe == "2":  # Femme
-                    women_count += count_float
-
-                # Ajouter à la structure par âge
-                if age in population_by_age:
-                    population_by_age[age]["total"] += count_float
-
-                    if sexe == "1":
-                        population_by_age[age]["men"] += count_float
-                    elif sexe == "2":
-                        population_by_age[age]["women"] += count_float
-
-            # Récupérer la liste complète des communes avec leur population
-            communes_info = []
-            for code in commune_codes:
-                commune_name = self.db.query(GeoCode.libgeo).filter(GeoCode.codgeo == code).first()
-                commune_pop = self.db.query(func.sum(Population.nb)).filter(Population.codgeo == code).scalar() or 0
-
-                communes_info.append({
-                    "code": code,
-                    "name": commune_name[0] if commune_name else f"Commune {code}",
-                    "population": float(commune_pop)
-                })
-
-            # Trier les communes par population décroissante
-            communes_info.sort(key=lambda x: x["population"], reverse=True)
-
-            # Convertir le dictionnaire population_by_age en liste pour faciliter l'accès âge par âge
-            population_by_age_list = []
-            for age in range(101):  # 0 à 100 inclus
-                age_str = str(age).zfill(3)
-                if age_str in population_by_age:
-                    data = population_by_age[age_str]
-                    population_by_age_list.append({
-                        "age": age,
-                        "total": data["total"],
-                        "men": data["men"],
-                        "women": data["women"]
-                    })
-
             return {
                 "epci": epci,
-                "epci_name": epci_name,
-                "communes_count": len(commune_codes),
-                "total_population": total_population,
-                "men_count": men_count,
-                "women_count": women_count,
-                "gender_ratio": {
-                    "men_percentage": round(men_count / total_population * 100, 2) if total_population > 0 else 0,
-                    "women_percentage": round(women_count / total_population * 100, 2) if total_population > 0 else 0
-                },
-                "population_by_age": population_by_age_list,  # Liste ordonnée par âge croissant
-                "communes": communes_info
+                "epci_name": territories.name_of("epci", epci) or f"EPCI {epci}",
+                "communes_count": communes_count,
+                **self._age_pyramid(GeoCode.epci, epci),
+                "communes": self._communes_population(GeoCode.epci, epci)
             }
         except Exception as e:
             print(f"Erreur lors de l'agrégation de la population pour l'EPCI {epci}: {str(e)}")
-            import traceback
-            print(traceback.format_exc())
             return {
                 "epci": epci,
                 "epci_name": "",
                 "communes_count": 0,
-                "total_population": 0,
-                "men_count": 0,
-                "women_count": 0,
-                "population_by_age": [],
+                **self._empty_pyramid(),
+                "communes": []
+            }
+        finally:
+            self.close()
+
+    def get_department_population(self, dep: str):
+        """Récupère la pyramide des âges d'un département (2 requêtes : âge × sexe, puis par commune)"""
+        try:
+            communes_count = get_territory_index().count("department", dep)
+            if not communes_count:
+                return {
+                    "department": dep,
+                    "communes_count": 0,
+                    **self._empty_pyramid(),
+                    "communes": []
+                }
+
+            return {
+                "department": dep,
+                "communes_count": communes_count,
+                **self._age_pyramid(GeoCode.dep, dep),
+                "communes": self._communes_population(GeoCode.dep, dep)
+            }
+        except Exception as e:
+            print(f"Erreur lors de l'agrégation de la population pour le département {dep}: {str(e)}")
+            return {
+                "department": dep,
+                "communes_count": 0,
+                **self._empty_pyramid(),
                 "communes": []
             }
         finally:
             self.close()
+
+    def get_region_population(self, reg: str):
+        """Récupère la pyramide des âges d'une région (2 requêtes : âge × sexe, puis par département)"""
+        try:
+            territories = get_territory_index()
+            communes_count = territories.count("region", reg)
+            if not communes_count:
+                return {
+                    "region": reg,
+                    "communes_count": 0,
+                    "departments_count": 0,
+                    **self._empty_pyramid(),
+                    "departments": []
+                }
+
+            return {
+                "region": reg,
+                "communes_count": communes_count,
+                "departments_count": territories.count("region", reg, "department"),
+                **self._age_pyramid(GeoCode.reg, reg),
+                "departments": self._subdivisions_population(GeoCode.dep, "Département", GeoCode.reg, reg)
+            }
+        except Exception as e:
+            print(f"Erreur lors de l'agrégation de la population pour la région {reg}: {str(e)}")
+            return {
+                "region": reg,
+                "communes_count": 0,
+                "departments_count": 0,
+                **self._empty_pyramid(),
+                "departments": []
+            }
+        finally:
+            self.close()
+
+    def get_france_population(self):
+        """Récupère la pyramide des âges de la France (2 requêtes : âge × sexe, puis par région)"""
+        try:
+            territories = get_territory_index()
+            return {
+                "communes_count": territories.size("commune"),
+                "departments_count": territories.size("department"),
+                "regions_count": territories.size("region"),
+                **self._age_pyramid(),
+                "regions": self._subdivisions_population(GeoCode.reg, "Région")
+            }
+        except Exception as e:
+            # Pas de repli à zéro : la réponse nationale est mise en cache (cached_response)
+            print(f"Erreur lors de l'agrégation de la population pour la France: {str(e)}")
+            raise
+        finally:
+            self.close()
@@ -0,0 +1,193 @@
+"""
+app/services/profile_service.py
+-------------------------------
+Fiche territoire : tous les indicateurs d'un territoire en un seul appel.
+
+Chaque section est une fonction indépendante qui ouvre sa propre session de
+lecture (donc sa propre connexion du pool) ; les sections tournent en parallèle
+dans le threadpool, les thèmes IRIS (services asynchrones) sur la boucle
+asyncio. Une fiche coûte ainsi à peu près le temps de la section la plus lente
+au lieu de la somme des sections.
+"""
+import asyncio
+import os
+import time
+
+from starlette.concurrency import run_in_threadpool
+
+from app.database import ReadSessionLocal
+from app.services.population_service import PopulationService
+from app.services.historical_service import HistoricalService
+from app.services.birth_service import BirthService
+from app.services.geocode_service import GeoCodeService
+from app.services.revenue_service import RevenueService
+from app.services.childcare_service import ChildcareService
+from app.services.family_service import FamilyService
+from app.services.public_safety_service import PublicSafetyService
+from app.services.employment_service import EmploymentService
+from app.services.schooling_service import SchoolingService
+from app.services.family_employment_service import FamilyEmploymentService
+from app.services.iris_population_service import IrisPopulationService
+from app.services.iris_families_service import IrisFamiliesService
+from app.services.iris_housing_service import IrisHousingService
+from app.services.iris_education_service import IrisEducationService
+from app.services.iris_activity_service import IrisActivityService
+
+PROFILE_LEVELS = ("commune", "epci", "department", "region", "france")
+
+# Sections exécutées simultanément pour une même fiche (connexions prises au pool)
+PROFILE_MAX_CONCURRENCY = int(os.environ.get("PROFILE_MAX_CONCURRENCY", 6))
+
+
+def _family_employment(db, method, *args):
+    service = FamilyEmploymentService(db)
+    return {
+        "under_3": getattr(service, method)(*args, age_group="0"),
+        "3_to_5": getattr(service, method)(*args, age_group="3"),
+    }
+
+
+# Sections synchrones : {section: {niveau: fonction(db, code)}}
+_SECTIONS = {
+    "population": {
+        "commune": lambda db, code: PopulationService(db).get_population_and_children_rate(code),
+        "epci": lambda db, code: PopulationService(db).aggregate_children_by_epci(code),
+        "department": lambda db, code: PopulationService(db).aggregate_children_by_department(code),
+        "region": lambda db, code: PopulationService(db).aggregate_children_by_region(code),
+        "france": lambda db, code: PopulationService(db).aggregate_children_france(),
+    },
+    "historical": {
+        "commune": lambda db, code: HistoricalService(db).get_by_code(code),
+    },
+    "births": {
+        "commune": lambda db, code: BirthService(db).get_births_trend(code),
+        "epci": lambda db, code: GeoCodeService(db).aggregate_births_by_epci(code),
+        "department": lambda db, code: GeoCodeService(db).aggregate_births_by_department(code),
+        "region": lambda db, code: GeoCodeService(db).aggregate_births_by_region(code),
+        "france": lambda db, code: GeoCodeService(db).aggregate_births_france(),
+    },
+    "revenues": {
+        "commune": lambda db, code: RevenueService(db).get_median_revenues(code),
+        "epci": lambda db, code: RevenueService(db).get_median_revenues_epci(code),
+        "department": lambda db, code: RevenueService(db).get_median_revenues_department(code),
+        "region": lambda db, code: RevenueService(db).get_median_revenues_region(code),
+        "france": lambda db, code: RevenueService(db).get_median_revenues_france(),
+    },
+    "childcare": {
+        "commune": lambda db, code: ChildcareService(db).get_coverage_by_commune(code),
+        "epci": lambda db, code: ChildcareService(db).get_coverage_by_epci(code),
+        "department": lambda db, code: ChildcareService(db).get_coverage_by_department(code),
+        "region": lambda db, code: ChildcareService(db).get_coverage_by_region(code),
+        "france": lambda db, code: ChildcareService(db).get_coverage_france(),
+    },
+    "families": {
+        "commune": lambda db, code: FamilyService(db).get_families_by_commune(code),
+        "epci": lambda db, code: FamilyService(db).get_families_by_epci(code),
+        "department": lambda db, code: FamilyService(db).get_families_by_department(code),
+        "region": lambda db, code: FamilyService(db).get_families_by_region(code),
+        "france": lambda db, code: FamilyService(db).get_families_france(),
+    },
+    "public_safety": {
+        "commune": lambda db, code: PublicSafetyService(db).get_by_commune(code),
+        "department": lambda db, code: PublicSafetyService(db).get_by_department(code),
+        "region": lambda db, code: PublicSafetyService(db).get_by_region(code),
+    },
+    "employment": {
+        "commune": lambda db, code: EmploymentService(db).get_commune_rates(code),
+        "epci": lambda db, code: EmploymentService(db).get_epci_rates(code),
+        "department": lambda db, code: EmploymentService(db).get_department_rates(code),
+        "region": lambda db, code: EmploymentService(db).get_region_rates(code),
+        "france": lambda db, code: EmploymentService(db).get_france_rates(),
+    },
+    "schooling": {
+        "commune": lambda db, code: SchoolingService(db).get_commune_schooling(code),
+        "epci": lambda db, code: SchoolingService(db).get_epci_schooling(code),
+        "department": lambda db, code: SchoolingService(db).get_department_schooling(code),
+        "region": lambda db, code: SchoolingService(db).get_region_schooling(code),
+        "france": lambda db, code: SchoolingService(db).get_france_schooling(),
+    },
+    "family_employment": {
+        "commune": lambda db, code: _family_employment(db, "get_commune_distribution", code),
+        "epci": lambda db, code: _family_employment(db, "get_epci_distribution", code),
+        "department": lambda db, code: _family_employment(db, "get_department_distribution", code),
+        "region": lambda db, code: _family_employment(db, "get_region_distribution", code),
+        "france": lambda db, code: _family_employment(db, "get_france_distribution"),
+    },
+}
+
+# Thèmes IRIS (services asynchrones, sans état) : agrégats commune / EPCI / département / région
+_IRIS_SERVICES = {
+    "iris_population": IrisPopulationService(),
+    "iris_families": IrisFamiliesService(),
+    "iris_housing": IrisHousingService(),
+    "iris_education": IrisEducationService(),
+    "iris_activity": IrisActivityService(),
+}
+_IRIS_LEVELS = ("commune", "epci", "department", "region")
+
+PROFILE_SECTIONS = tuple(_SECTIONS) + tuple(_IRIS_SERVICES)
+
+
+def available_sections(level: str) -> list:
+    """Sections disponibles pour un niveau, dans l'ordre de la fiche."""
+    sections = [name for name, levels in _SECTIONS.items() if level in levels]
+    if level in _IRIS_LEVELS:
+        sections.extend(_IRIS_SERVICES)
+    return sections
+
+
+def _run_section(name: str, level: str, code: str):
+    """Exécute une section synchrone sur une session dédiée (une connexion du pool)."""
+    db = ReadSessionLocal()
+    try:
+        return _SECTIONS[name][level](db, code)
+    finally:
+        db.close()
+
+
+class ProfileService:
+    """Assemble la fiche d'un territoire en exécutant ses sections en parallèle."""
+
+    def __init__(self, max_concurrency: int = PROFILE_MAX_CONCURRENCY):
+        self.max_concurrency = max_concurrency
+
+    async def _timed_section(self, semaphore, name: str, level: str, code: str):
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                if name in _IRIS_SERVICES:
+                    method = getattr(_IRIS_SERVICES[name], f"get_by_{level}_async")
+                    data = await method(code)
+                else:
+                    data = await run_in_threadpool(_run_section, name, level, code)
+                error = None
+            except Exception as e:
+                print(f"Erreur dans la section {name} de la fiche {level}/{code}: {str(e)}")
+                data, error = None, str(e)
+            return name, data, error, round((time.perf_counter() - start) * 1000, 1)
+
+    async def get_profile(self, level: str, code: str, sections: list) -> dict:
+        """
+        Fiche `level`/`code` limitée à `sections` (déjà validées pour ce niveau).
+        Une section en échec est signalée dans "errors" sans faire échouer la fiche.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        start = time.perf_counter()
+        results = await asyncio.gather(*(
+            self._timed_section(semaphore, name, level, code) for name in sections
+        ))
+
+        profile = {
+            "level": level,
+            "code": code,
+            "sections": {},
+            "errors": {},
+            "timings_ms": {},
+        }
+        for name, data, error, elapsed in results:
+            profile["sections"][name] = data
+            profile["timings_ms"][name] = elapsed
+            if error is not None:
+                profile["errors"][name] = error
+        profile["total_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        return profile
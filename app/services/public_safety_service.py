@@ -1,12 +1,42 @@
+import re
+import unicodedata
+from collections import defaultdict
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
+from sqlalchemy import func, and_, tuple_
 from typing import Dict, Optional
-from app.database import SessionLocal
-from app.models import PublicSafety, GeoCode, Population
+from app.database import ReadSessionLocal
+from app.models import PublicSafety, GeoCode, Population, PopulationChildrenRollup
+from app.territory import get_territory_index
+
+# Codes canoniques des violences intrafamiliales (libellés contenant « famili »)
+# et, à défaut pour une commune, des autres violences intrafamiliales ou conjugales
+DOMESTIC_VIOLENCE_CODE = "violences_intrafamiliales"
+DOMESTIC_VIOLENCE_FALLBACK_CODE = "violences_conjugales"
+
+_DOMESTIC_VIOLENCE_FALLBACK_PATTERN = re.compile(r"violen.*(intraf|conjug)")
+
+
+def indicator_code(label) -> str:
+    """
+    Code canonique d'une classe d'indicateur, calculé à l'import : minuscules,
+    sans accents, mots séparés par « _ ». Les libellés contenant « famili » sont
+    ramenés à DOMESTIC_VIOLENCE_CODE, les autres violences intrafamiliales ou
+    conjugales à DOMESTIC_VIOLENCE_FALLBACK_CODE (utilisé seulement pour une
+    commune sans DOMESTIC_VIOLENCE_CODE, voir get_domestic_violence_by_epci).
+    """
+    ascii_label = unicodedata.normalize("NFKD", str(label)).encode("ascii", "ignore").decode()
+    code = re.sub(r"[^a-z0-9]+", "_", ascii_label.lower()).strip("_")
+    if "famili" in code:
+        return DOMESTIC_VIOLENCE_CODE
+    if _DOMESTIC_VIOLENCE_FALLBACK_PATTERN.search(code):
+        return DOMESTIC_VIOLENCE_FALLBACK_CODE
+    return code[:80]
+
 
 class PublicSafetyService:
-    def __init__(self):
-        self.db = SessionLocal()
+    def __init__(self, db: Session = None):
+        # Session fournie par la requête (Depends(get_read_db)) ou session propre au service
+        self.db = db if db is not None else ReadSessionLocal()
 
     def close(self):
         """Ferme la connexion à la base de données"""
@@ -23,138 +53,146 @@ class PublicSafetyService:
             for item in data
         ]
 
-    def get_by_commune(self, code: str) -> Dict:
-        """Récupère les données de sécurité pour une commune et ses territoires parents"""
-        try:
-            # Récupérer les informations géographiques
-            geo_info = self.db.query(GeoCode).filter(GeoCode.codgeo == str(code)).first()
-
-            if not geo_info:
-                return {
-                    "commune": {"code": code, "name": None, "data": []},
-                    "department": {"code": "", "name": None, "data": []},
-                    "region": {"code": "", "name": None, "data": []}
-                }
-
-            # Récupérer les données pour chaque niveau
-            commune_data = self.db.query(PublicSafety).filter(
-                and_(
-                    PublicSafety.territory_type == 'commune',
-                    PublicSafety.territory_code == str(code)
-                )
-            ).all()
+    def _series(self, territories) -> Dict:
+        """
+        Séries de plusieurs territoires en une requête : IN sur les couples
+        (territory_type, territory_code), servi par l'index composite
+        (territory_type, territory_code, year). Retourne {(type, code): [données]}.
+        """
+        pairs = {(territory_type, str(code)) for territory_type, code in territories if code}
+        if not pairs:
+            return {}
+        rows = self.db.query(
+            PublicSafety.territory_type,
+            PublicSafety.territory_code,
+            PublicSafety.year,
+            PublicSafety.indicator_class,
+            PublicSafety.rate
+        ).filter(
+            tuple_(PublicSafety.territory_type, PublicSafety.territory_code).in_(pairs)
+        ).order_by(
+            PublicSafety.territory_type, PublicSafety.territory_code, PublicSafety.year, PublicSafety.indicator_class
+        ).all()
+
+        series = defaultdict(list)
+        for row in rows:
+            series[(row.territory_type, row.territory_code)].append(row)
+        return {key: self._format_safety_data(data) for key, data in series.items()}
+
+    def _empty_response(self, commune: str = "", dep: str = "", reg: str = "") -> Dict:
+        return {
+            "commune": {"code": commune, "name": None, "data": []},
+            "department": {"code": dep, "name": None, "data": []},
+            "region": {"code": reg, "name": None, "data": []}
+        }
+
+    def _commune_response(self, code: str, series: Dict, territories) -> Dict:
+        """Comparaison commune / département / région d'une commune à partir des séries chargées"""
+        dep = territories.parent_of("commune", code, "department") or ""
+        reg = territories.parent_of("commune", code, "region") or ""
+        return {
+            "commune": {
+                "code": code,
+                "name": territories.name_of("commune", code),
+                "data": series.get(("commune", str(code)), [])
+            },
+            "department": {
+                "code": dep,
+                "name": f"Département {dep}" if dep else None,
+                "data": series.get(("department", dep), [])
+            },
+            "region": {
+                "code": reg,
+                "name": f"Région {reg}" if reg else None,
+                "data": series.get(("region", reg), [])
+            }
+        }
 
-            department_data = self.db.query(PublicSafety).filter(
-                and_(
-                    PublicSafety.territory_type == 'department',
-                    PublicSafety.territory_code == str(geo_info.dep)
-                )
-            ).all()
+    def _commune_territories(self, code: str, territories) -> list:
+        return [
+            ("commune", code),
+            ("department", territories.parent_of("commune", code, "department")),
+            ("region", territories.parent_of("commune", code, "region")),
+        ]
 
-            region_data = self.db.query(PublicSafety).filter(
-                and_(
-                    PublicSafety.territory_type == 'region',
-                    PublicSafety.territory_code == str(geo_info.reg)
-                )
-            ).all()
+    def get_by_commune(self, code: str) -> Dict:
+        """Récupère les données de sécurité pour une commune et ses territoires parents (1 requête)"""
+        try:
+            # Département et région lus dans l'index territorial (sans requête)
+            territories = get_territory_index()
+            if not territories.contains("commune", code):
+                return self._empty_response(commune=code)
 
-            return {
-                "commune": {
-                    "code": code,
-                    "name": geo_info.libgeo,
-                    "data": self._format_safety_data(commune_data)
-                },
-                "department": {
-                    "code": geo_info.dep,
-                    "name": f"Département {geo_info.dep}",
-                    "data": self._format_safety_data(department_data)
-                },
-                "region": {
-                    "code": geo_info.reg,
-                    "name": f"Région {geo_info.reg}",
-                    "data": self._format_safety_data(region_data)
-                }
-            }
+            series = self._series(self._commune_territories(code, territories))
+            return self._commune_response(code, series, territories)
 
         except Exception as e:
             print(f"Erreur dans get_by_commune: {str(e)}")
-            return {
-                "commune": {"code": code, "name": None, "data": []},
-                "department": {"code": "", "name": None, "data": []},
-                "region": {"code": "", "name": None, "data": []}
-            }
+            return self._empty_response(commune=code)
         finally:
             self.close()
 
-    def get_by_department(self, dep: str) -> Dict:
-        """Récupère les données de sécurité pour un département et sa région parente"""
+    def get_by_communes(self, codes: list) -> list:
+        """
+        Comparaison commune / département / région de plusieurs communes en une
+        seule requête (territoires parents partagés chargés une fois). Les
+        résultats suivent l'ordre de `codes`.
+        """
         try:
-            # Récupérer les informations géographiques
-            geo_info = self.db.query(GeoCode).filter(GeoCode.dep == str(dep)).first()
+            territories = get_territory_index()
+            known = [code for code in dict.fromkeys(str(code) for code in codes) if territories.contains("commune", code)]
+            series = self._series(
+                pair for code in known for pair in self._commune_territories(code, territories)
+            )
+            return [
+                self._commune_response(str(code), series, territories)
+                if territories.contains("commune", code) else self._empty_response(commune=str(code))
+                for code in codes
+            ]
 
-            if not geo_info:
-                return {
-                    "commune": {"code": "", "name": None, "data": []},
-                    "department": {"code": dep, "name": None, "data": []},
-                    "region": {"code": "", "name": None, "data": []}
-                }
+        except Exception as e:
+            print(f"Erreur dans get_by_communes: {str(e)}")
+            return [self._empty_response(commune=str(code)) for code in codes]
+        finally:
+            self.close()
 
-            # Récupérer les données
-            department_data = self.db.query(PublicSafety).filter(
-                and_(
-                    PublicSafety.territory_type == 'department',
-                    PublicSafety.territory_code == str(dep)
-                )
-            ).all()
+    def get_by_department(self, dep: str) -> Dict:
+        """Récupère les données de sécurité pour un département et sa région parente (1 requête)"""
+        try:
+            territories = get_territory_index()
+            if not territories.contains("department", dep):
+                return self._empty_response(dep=dep)
 
-            region_data = self.db.query(PublicSafety).filter(
-                and_(
-                    PublicSafety.territory_type == 'region',
-                    PublicSafety.territory_code == str(geo_info.reg)
-                )
-            ).all()
+            reg = territories.parent_of("department", dep, "region") or ""
+            series = self._series([("department", dep), ("region", reg)])
 
             return {
                 "commune": {"code": "", "name": None, "data": []},
                 "department": {
                     "code": dep,
                     "name": f"Département {dep}",
-                    "data": self._format_safety_data(department_data)
+                    "data": series.get(("department", str(dep)), [])
                 },
                 "region": {
-                    "code": geo_info.reg,
-                    "name": f"Région {geo_info.reg}",
-                    "data": self._format_safety_data(region_data)
+                    "code": reg,
+                    "name": f"Région {reg}" if reg else None,
+                    "data": series.get(("region", reg), [])
                 }
             }
 
         except Exception as e:
             print(f"Erreur dans get_by_department: {str(e)}")
-            return {
-                "commune": {"code": "", "name": None, "data": []},
-                "department": {"code": dep, "name": None, "data": []},
-                "region": {"code": "", "name": None, "data": []}
-            }
+            return self._empty_response(dep=dep)
         finally:
             self.close()
 
     def get_by_region(self, reg: str) -> Dict:
         """Récupère les données de sécurité pour une région"""
         try:
-            # Récupérer les données
-            region_data = self.db.query(PublicSafety).filter(
-                and_(
-                    PublicSafety.territory_type == 'region',
-                    PublicSafety.territory_code == str(reg)
-                )
-            ).all()
+            region_data = self._series([("region", reg)]).get(("region", str(reg)))
 
             if not region_data:
-                return {
-                    "commune": {"code": "", "name": None, "data": []},
-                    "department": {"code": "", "name": None, "data": []},
-                    "region": {"code": reg, "name": None, "data": []}
-                }
+                return self._empty_response(reg=reg)
 
             return {
                 "commune": {"code": "", "name": None, "data": []},
@@ -162,138 +200,112 @@ class PublicSafetyService:
                 "region": {
                     "code": reg,
                     "name": f"Région {reg}",
-                    "data": self._format_safety_data(region_data)
+                    "data": region_data
                 }
             }
 
         except Exception as e:
             print(f"Erreur dans get_by_region: {str(e)}")
-            return {
-                "commune": {"code": "", "name": None, "data": []},
-                "department": {"code": "", "name": None, "data": []},
-                "region": {"code": reg, "name": None, "data": []}
-            }
+            return self._empty_response(reg=reg)
         finally:
             self.close()
 
+    def _communes_population_source(self, epci: str):
+        """
+        Population des communes : lignes 'commune' de population_children_rollup
+        (précalculées), ou à défaut un GROUP BY codgeo sur populations.
+        """
+        if self.db.get(PopulationChildrenRollup, ("epci", str(epci))) is not None:
+            return self.db.query(
+                PopulationChildrenRollup.code.label('codgeo'),
+                PopulationChildrenRollup.total.label('population')
+            ).filter(PopulationChildrenRollup.level == "commune").subquery()
+
+        members = self.db.query(GeoCode.codgeo).filter(GeoCode.epci == str(epci))
+        return self.db.query(
+            Population.codgeo,
+            func.sum(Population.nb).label('population')
+        ).filter(Population.codgeo.in_(members)).group_by(Population.codgeo).subquery()
+
     def get_domestic_violence_by_epci(self, epci: str):
         """Récupère les données de violences intrafamiliales pour toutes les communes d'un EPCI"""
         try:
-            # Récupérer les communes de l'EPCI
-            communes = self.db.query(GeoCode.codgeo).filter(GeoCode.epci == str(epci)).all()
-
-            if not communes:
+            territories = get_territory_index()
+            if not territories.count("epci", epci):
                 return {
                     "epci": epci,
                     "epci_name": "",
                     "communes_count": 0,
+                    "total_population": 0,
+                    "epci_average_rate": 0,
                     "communes": []
                 }
 
-            commune_codes = [c[0] for c in communes]
-
-            # Récupérer le nom de l'EPCI
-            epci_info = self.db.query(GeoCode.libepci).filter(GeoCode.epci == str(epci)).first()
-            epci_name = epci_info[0] if epci_info else f"EPCI {epci}"
-
-            # DEBUGGING: Vérifier les types d'indicateurs disponibles pour ces communes
-            sample_commune = commune_codes[0] if commune_codes else None
-            if sample_commune:
-                available_indicators = self.db.query(PublicSafety.indicator_class).filter(
+            # Une requête : communes de l'EPCI, population précalculée et séries
+            # de violences intrafamiliales et de repli (codes canoniques indexés)
+            population = self._communes_population_source(epci)
+            rows = self.db.query(
+                GeoCode.codgeo,
+                GeoCode.libgeo,
+                func.coalesce(population.c.population, 0).label('population'),
+                PublicSafety.indicator_code,
+                PublicSafety.year,
+                PublicSafety.rate
+            ).outerjoin(
+                population, population.c.codgeo == GeoCode.codgeo
+            ).outerjoin(
+                PublicSafety, and_(
+                    PublicSafety.indicator_code.in_((DOMESTIC_VIOLENCE_CODE, DOMESTIC_VIOLENCE_FALLBACK_CODE)),
                     PublicSafety.territory_type == 'commune',
-                    PublicSafety.territory_code == sample_commune
-                ).distinct().all()
-                print(f"Indicateurs disponibles pour {sample_commune}: {[i[0] for i in available_indicators]}")
-
-            # Récupérer les données pour chaque commune
-            communes_data = []
-            total_population = 0
-
-            for code in commune_codes:
-                # Récupérer les informations géographiques de la commune
-                geo_info = self.db.query(GeoCode).filter(GeoCode.codgeo == str(code)).first()
-
-                if not geo_info:
+                    PublicSafety.territory_code == GeoCode.codgeo
+                )
+            ).filter(
+                GeoCode.epci == str(epci)
+            ).order_by(GeoCode.codgeo, PublicSafety.year).all()
+
+            communes = {}
+            fallback_data = defaultdict(list)
+            for row in rows:
+                commune = communes.get(row.codgeo)
+                if commune is None:
+                    commune = communes[row.codgeo] = {
+                        "code": row.codgeo,
+                        "name": row.libgeo,
+                        "population": float(row.population),
+                        "average_rate": 0,
+                        "yearly_data": []
+                    }
+                if row.year is None:
                     continue
-
-                # Récupérer les données de sécurité liées aux violences intrafamiliales
-                # Utiliser ILIKE pour une recherche insensible à la casse
-                commune_data = self.db.query(PublicSafety).filter(
-                    and_(
-                        PublicSafety.territory_type == 'commune',
-                        PublicSafety.territory_code == str(code),
-                        PublicSafety.indicator_class.ilike('%famili%')  # Recherche plus flexible
-                    )
-                ).order_by(PublicSafety.year).all()
-
-                # Si aucune donnée trouvée, essayer une recherche encore plus large
-                if not commune_data:
-                    commune_data = self.db.query(PublicSafety).filter(
-                        and_(
-                            PublicSafety.territory_type == 'commune',
-                            PublicSafety.territory_code == str(code),
-                            or_(
-                                PublicSafety.indicator_class.ilike('%violen%famili%'),
-                                PublicSafety.indicator_class.ilike('%violen%intraf%'),
-                                PublicSafety.indicator_class.ilike('%violen%conjug%')
-                            )
-                        )
-                    ).order_by(PublicSafety.year).all()
-
-                # DEBUGGING pour une commune qui devrait avoir des données
-                if code == commune_codes[0]:  # Juste pour la première commune
-                    all_data = self.db.query(PublicSafety).filter(
-                        PublicSafety.territory_type == 'commune',
-                        PublicSafety.territory_code == str(code)
-                    ).all()
-                    print(f"Classes d'indicateurs pour {code}: {set(d.indicator_class for d in all_data)}")
-                    print(f"Données trouvées pour {code}: {len(commune_data)} enregistrements")
-
-                # Récupérer la population
-                pop_query = self.db.query(func.sum(Population.nb)).filter(Population.codgeo == str(code))
-                population = pop_query.scalar() or 0
-                total_population += population
-
-                # Formater les données de sécurité par année
-                yearly_data = []
-                for item in commune_data:
-                    yearly_data.append({
-                        "year": item.year,
-                        "rate": float(item.rate),
-                        "indicator_class": item.indicator_class  # Ajouter pour débogage
-                    })
-
-                # Calculer le taux moyen si des données sont disponibles
-                avg_rate = sum(item["rate"] for item in yearly_data) / len(yearly_data) if yearly_data else 0
-
-                communes_data.append({
-                    "code": code,
-                    "name": geo_info.libgeo,
-                    "population": population,
-                    "average_rate": round(avg_rate, 2),
-                    "yearly_data": yearly_data
-                })
+                item = {"year": row.year, "rate": float(row.rate)}
+                if row.indicator_code == DOMESTIC_VIOLENCE_CODE:
+                    commune["yearly_data"].append(item)
+                else:
+                    fallback_data[row.codgeo].append(item)
+
+            all_rates = []
+            for commune in communes.values():
+                # Série de repli seulement pour une commune sans violences intrafamiliales
+                if not commune["yearly_data"]:
+                    commune["yearly_data"] = fallback_data.get(commune["code"], [])
+                rates = [item["rate"] for item in commune["yearly_data"]]
+                commune["average_rate"] = round(sum(rates) / len(rates), 2) if rates else 0
+                all_rates.extend(rates)
 
             # Trier les communes par taux moyen décroissant
-            communes_data.sort(key=lambda x: x["average_rate"], reverse=True)
-
-            # Calculer le taux moyen pour l'EPCI
-            all_rates = [item["rate"] for commune in communes_data for item in commune["yearly_data"]]
-            epci_avg_rate = sum(all_rates) / len(all_rates) if all_rates else 0
+            communes_data = sorted(communes.values(), key=lambda x: x["average_rate"], reverse=True)
 
             return {
                 "epci": epci,
-                "epci_name": epci_name,
+                "epci_name": territories.name_of("epci", epci) or f"EPCI {epci}",
                 "communes_count": len(communes_data),
-                "total_population": total_population,
-                "epci_average_rate": round(epci_avg_rate, 2),
+                "total_population": sum(commune["population"] for commune in communes_data),
+                "epci_average_rate": round(sum(all_rates) / len(all_rates), 2) if all_rates else 0,
                 "communes": communes_data
             }
 
         except Exception as e:
             print(f"Erreur lors de la récupération des données de violences intrafamiliales pour l'EPCI {epci}: {str(e)}")
-            import traceback
-            print(traceback.format_exc())
             return {
                 "epci": epci,
                 "epci_name": "",
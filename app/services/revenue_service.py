@@ -1,12 +1,13 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from typing import Dict, Optional, List
-from app.database import SessionLocal
+from app.database import ReadSessionLocal
 from app.models import Revenue, GeoCode
 
 class RevenueService:
-    def __init__(self):
-        self.db = SessionLocal()
+    def __init__(self, db: Session = None):
+        # Session fournie par la requête (Depends(get_read_db)) ou session propre au service
+        self.db = db if db is not None else ReadSessionLocal()
 
     def close(self):
         """Ferme la connexion à la base de données"""
@@ -1,13 +1,66 @@
-from sqlalchemy import func, case
+import re
+import threading
+
+from sqlalchemy import func, case, and_, text
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
-from app.database import SessionLocal
+from app.database import ReadSessionLocal
+from app.datasets import dataset_watcher
 from app.models import Schooling, GeoCode
+from app.territory import get_territory_index
+
+# Critères de tri des listes de communes : taux à 2 ans, taux à 3-5 ans
+SCHOOLING_SORT_KEYS = ("2y", "3_5y")
+
+# Situations de scolarisation comptées comme « scolarisé »
+SCHOOLED_STATUSES = ['1', '2', '3', '4', '5']
+
+# Bornes des partitions LIST de schooling (« FOR VALUES IN (2021) »)
+_PARTITION_BOUNDS_SQL = text("""
+    SELECT pg_get_expr(c.relpartbound, c.oid)
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = 'schooling'::regclass
+""")
+
+_years_cache = {}
+_years_lock = threading.Lock()
+
+
+def _load_schooling_years(db) -> list:
+    """Années lues dans les bornes des partitions, ou dans les données hors PostgreSQL / sans partition."""
+    years = set()
+    if db.get_bind().dialect.name == "postgresql":
+        for (bound,) in db.execute(_PARTITION_BOUNDS_SQL).all():
+            if bound and bound.startswith("FOR VALUES IN"):
+                years.update(int(value) for value in re.findall(r"\d+", bound))
+    if not years:
+        years.update(year for (year,) in db.query(Schooling.year).distinct().all())
+    return sorted(years)
+
+
+def schooling_years(db) -> list:
+    """
+    Millésimes disponibles (une partition par année), relus à chaque nouvelle
+    version du jeu de données schooling : un nouveau millésime apparaît sans
+    modification du code.
+    """
+    version = dataset_watcher.version("schooling")
+    cached = _years_cache.get("years")
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    with _years_lock:
+        cached = _years_cache.get("years")
+        if cached is None or cached[0] != version:
+            cached = (version, _load_schooling_years(db))
+            _years_cache["years"] = cached
+    return cached[1]
 
 
 class SchoolingService:
-    def __init__(self):
-        self.db = SessionLocal()
+    def __init__(self, db: Session = None):
+        # Session fournie par la requête (Depends(get_read_db)) ou session propre au service
+        self.db = db if db is not None else ReadSessionLocal()
 
     def close(self):
         self.db.close()
@@ -24,170 +77,83 @@ class SchoolingService:
         except (TypeError, ValueError):
             return 0.0
 
-    # =========================================================================
-    # Méthode d'origine (pour commune, EPCI — inchangée)
-    # =========================================================================
-    def _calculate_schooling_rates_optimized(self, year: int, communes: list = None):
-        """Calcule les taux de scolarisation avec des agrégations SQL"""
-        try:
-            # Requête pour les enfants de 2 ans
-            two_years_query = self.db.query(
-                func.coalesce(func.sum(Schooling.number), 0).label('total'),
-                func.coalesce(func.sum(
-                    case(
-                        (Schooling.education_status.in_(['1', '2', '3', '4', '5']), Schooling.number),
-                        else_=0
-                    )
-                ), 0).label('schooled')
-            ).filter(
-                Schooling.year == year,
-                Schooling.sex.in_(['1', '2']),
-                Schooling.age == '002'
-            )
-
-            if communes:
-                two_years_query = two_years_query.filter(Schooling.geo_code.in_(communes))
-
-            two_years = two_years_query.first()
-
-            # Requête pour les enfants de 3-5 ans
-            three_to_five_query = self.db.query(
-                func.coalesce(func.sum(Schooling.number), 0).label('total'),
-                func.coalesce(func.sum(
-                    case(
-                        (Schooling.education_status.in_(['1', '2', '3', '4', '5']), Schooling.number),
-                        else_=0
-                    )
-                ), 0).label('schooled')
-            ).filter(
-                Schooling.year == year,
-                Schooling.sex.in_(['1', '2']),
-                Schooling.age.in_(['003', '004', '005'])
-            )
-
-            if communes:
-                three_to_five_query = three_to_five_query.filter(Schooling.geo_code.in_(communes))
-
-            three_to_five = three_to_five_query.first()
-
-            # Sécurisation des valeurs
-            total_2y = self._safe_float(two_years.total)
-            schooled_2y = self._safe_float(two_years.schooled)
-            rate_2y = (schooled_2y / total_2y * 100) if total_2y > 0 else 0
-
-            total_3_5y = self._safe_float(three_to_five.total)
-            schooled_3_5y = self._safe_float(three_to_five.schooled)
-            rate_3_5y = (schooled_3_5y / total_3_5y * 100) if total_3_5y > 0 else 0
-
-            return {
-                "total_children_2y": total_2y,
-                "schooled_children_2y": schooled_2y,
-                "schooling_rate_2y": round(rate_2y, 1),
-                "total_children_3_5y": total_3_5y,
-                "schooled_children_3_5y": schooled_3_5y,
-                "schooling_rate_3_5y": round(rate_3_5y, 1)
-            }
-        except Exception as e:
-            print(f"Erreur dans le calcul des taux : {str(e)}")
-            return {
-                "total_children_2y": 0.0,
-                "schooled_children_2y": 0.0,
-                "schooling_rate_2y": 0.0,
-                "total_children_3_5y": 0.0,
-                "schooled_children_3_5y": 0.0,
-                "schooling_rate_3_5y": 0.0
-            }
+    def _empty_rates(self):
+        return {
+            "total_children_2y": 0.0,
+            "schooled_children_2y": 0.0,
+            "schooling_rate_2y": 0.0,
+            "total_children_3_5y": 0.0,
+            "schooled_children_3_5y": 0.0,
+            "schooling_rate_3_5y": 0.0
+        }
+
+    def _rates(self, total_2y, schooled_2y, total_3_5y, schooled_3_5y):
+        """Taux de scolarisation (arrondis à 1 décimale) à partir des effectifs"""
+        total_2y = self._safe_float(total_2y)
+        schooled_2y = self._safe_float(schooled_2y)
+        total_3_5y = self._safe_float(total_3_5y)
+        schooled_3_5y = self._safe_float(schooled_3_5y)
+        return {
+            "total_children_2y": total_2y,
+            "schooled_children_2y": schooled_2y,
+            "schooling_rate_2y": round((schooled_2y / total_2y * 100) if total_2y > 0 else 0, 1),
+            "total_children_3_5y": total_3_5y,
+            "schooled_children_3_5y": schooled_3_5y,
+            "schooling_rate_3_5y": round((schooled_3_5y / total_3_5y * 100) if total_3_5y > 0 else 0, 1)
+        }
+
+    def _counts_columns(self):
+        """Effectifs totaux et scolarisés des 2 ans et des 3-5 ans (CASE WHEN sur l'âge)"""
+        schooled = Schooling.education_status.in_(SCHOOLED_STATUSES)
+        is_2y = Schooling.age == '002'
+        is_3_5y = Schooling.age.in_(['003', '004', '005'])
+        return (
+            func.coalesce(func.sum(case((is_2y, Schooling.number), else_=0)), 0).label('total_2y'),
+            func.coalesce(func.sum(case((and_(is_2y, schooled), Schooling.number), else_=0)), 0).label('schooled_2y'),
+            func.coalesce(func.sum(case((is_3_5y, Schooling.number), else_=0)), 0).label('total_3_5y'),
+            func.coalesce(func.sum(case((and_(is_3_5y, schooled), Schooling.number), else_=0)), 0).label('schooled_3_5y'),
+        )
 
     # =========================================================================
-    # OPTIMISÉ : 1 requête par année (touche 1 seule partition) avec JOIN
-    # Au lieu de 2 requêtes par année avec IN(...)
-    # La table schooling est partitionnée par year → 1 requête/partition est optimal
+    # Toutes les années en 1 requête (GROUP BY year)
+    # Le filtre year IN (années des partitions) est une liste de constantes :
+    # le planificateur élague les partitions LIST non concernées.
     # =========================================================================
-    def _calculate_rates_with_join(self, year: int, geo_filter=None):
+    def _rates_by_year(self, column=None, code: str = None):
         """
-        Calcule les taux pour une année en 1 requête avec CASE WHEN + JOIN.
+        Taux de scolarisation de toutes les années disponibles en une requête.
 
         Args:
-            year: année (touche 1 seule partition)
-            geo_filter: tuple (column, value) pour JOIN sur geo_codes, ou None pour France
+            column: colonne de geo_codes filtrée (JOIN), Schooling.geo_code pour
+                une commune (sans JOIN) ou None pour la France
+            code: valeur de la colonne
         """
-        try:
-            query = self.db.query(
-                # Enfants de 2 ans — total
-                func.coalesce(func.sum(case(
-                    (Schooling.age == '002', Schooling.number),
-                    else_=0
-                )), 0).label('total_2y'),
-                # Enfants de 2 ans — scolarisés
-                func.coalesce(func.sum(case(
-                    (Schooling.age == '002',
-                     case(
-                         (Schooling.education_status.in_(['1', '2', '3', '4', '5']), Schooling.number),
-                         else_=0
-                     )),
-                    else_=0
-                )), 0).label('schooled_2y'),
-                # Enfants de 3-5 ans — total
-                func.coalesce(func.sum(case(
-                    (Schooling.age.in_(['003', '004', '005']), Schooling.number),
-                    else_=0
-                )), 0).label('total_3_5y'),
-                # Enfants de 3-5 ans — scolarisés
-                func.coalesce(func.sum(case(
-                    (Schooling.age.in_(['003', '004', '005']),
-                     case(
-                         (Schooling.education_status.in_(['1', '2', '3', '4', '5']), Schooling.number),
-                         else_=0
-                     )),
-                    else_=0
-                )), 0).label('schooled_3_5y'),
-            ).filter(
-                Schooling.year == year,
-                Schooling.sex.in_(['1', '2']),
-                Schooling.age.in_(['002', '003', '004', '005'])
-            )
-
-            # Appliquer le filtre géographique via JOIN
-            if geo_filter:
-                column, value = geo_filter
-                query = query.join(
-                    GeoCode, Schooling.geo_code == GeoCode.codgeo
-                ).filter(column == str(value))
-
-            result = query.first()
-
-            total_2y = self._safe_float(result.total_2y)
-            schooled_2y = self._safe_float(result.schooled_2y)
-            total_3_5y = self._safe_float(result.total_3_5y)
-            schooled_3_5y = self._safe_float(result.schooled_3_5y)
-
-            return {
-                "total_children_2y": total_2y,
-                "schooled_children_2y": schooled_2y,
-                "schooling_rate_2y": round((schooled_2y / total_2y * 100) if total_2y > 0 else 0, 1),
-                "total_children_3_5y": total_3_5y,
-                "schooled_children_3_5y": schooled_3_5y,
-                "schooling_rate_3_5y": round((schooled_3_5y / total_3_5y * 100) if total_3_5y > 0 else 0, 1)
-            }
-        except Exception as e:
-            print(f"Erreur dans _calculate_rates_with_join pour {year}: {str(e)}")
-            return {
-                "total_children_2y": 0.0,
-                "schooled_children_2y": 0.0,
-                "schooling_rate_2y": 0.0,
-                "total_children_3_5y": 0.0,
-                "schooled_children_3_5y": 0.0,
-                "schooling_rate_3_5y": 0.0
-            }
+        years = schooling_years(self.db)
+        query = self.db.query(Schooling.year, *self._counts_columns()).filter(
+            Schooling.year.in_(years),
+            Schooling.sex.in_(['1', '2']),
+            Schooling.age.in_(['002', '003', '004', '005'])
+        )
+
+        if column is Schooling.geo_code:
+            query = query.filter(column == str(code))
+        elif column is not None:
+            query = query.join(GeoCode, Schooling.geo_code == GeoCode.codgeo).filter(column == str(code))
+
+        rows = {row.year: row for row in query.group_by(Schooling.year).all()}
+        return {
+            year: self._rates(rows[year].total_2y, rows[year].schooled_2y, rows[year].total_3_5y, rows[year].schooled_3_5y)
+            if year in rows else self._empty_rates()
+            for year in years
+        }
 
     # =========================================================================
-    # Commune (inchangé)
+    # Commune
     # =========================================================================
     def get_commune_schooling(self, commune: str):
         """Récupère les données de scolarisation pour une commune"""
         try:
-            commune_check = self.db.query(GeoCode.codgeo).filter(GeoCode.codgeo == str(commune)).first()
-            if not commune_check:
+            if not get_territory_index().contains("commune", commune):
                 return {
                     "territory_type": "commune",
                     "code": commune,
@@ -195,16 +161,11 @@ class SchoolingService:
                     "data": {}
                 }
 
-            print(f"\nCommune trouvée: {commune}")
-
-            # Calculer les taux pour chaque année
-            results = {year: self._calculate_schooling_rates_optimized(year, [commune]) for year in range(2017, 2022)}
-
             return {
                 "territory_type": "commune",
                 "code": commune,
                 "name": f"Commune {commune}",
-                "data": results
+                "data": self._rates_by_year(Schooling.geo_code, commune)
             }
         except SQLAlchemyError as e:
             print(f"Erreur pour la commune {commune}: {str(e)}")
@@ -218,19 +179,15 @@ class SchoolingService:
             self.close()
 
     # =========================================================================
-    # EPCI (inchangé)
+    # EPCI
     # =========================================================================
     def get_epci_schooling(self, epci: str):
         """Récupère les données de scolarisation pour un EPCI"""
         try:
-            communes = self.db.query(GeoCode.codgeo).filter(GeoCode.epci == str(epci)).all()
-
-            if not communes:
+            if not get_territory_index().contains("epci", epci):
                 return {"territory_type": "epci", "code": epci, "name": "EPCI inconnu", "data": {}}
 
-            communes = [c[0] for c in communes]
-
-            results = {year: self._calculate_schooling_rates_optimized(year, communes) for year in range(2017, 2022)}
+            results = self._rates_by_year(GeoCode.epci, epci)
 
             return {"territory_type": "epci", "code": epci, "name": f"EPCI {epci}", "data": results}
         except SQLAlchemyError as e:
@@ -240,14 +197,12 @@ class SchoolingService:
             self.close()
 
     # =========================================================================
-    # Département — OPTIMISÉ : 5 requêtes JOIN (1/partition) au lieu de 10 IN
+    # Département
     # =========================================================================
     def get_department_schooling(self, dep: str):
         """Récupère les données de scolarisation pour un département"""
         try:
-            communes = self.db.query(GeoCode.codgeo).filter(GeoCode.dep == str(dep)).all()
-
-            if not communes:
+            if not get_territory_index().contains("department", dep):
                 return {
                     "territory_type": "department",
                     "code": dep,
@@ -255,10 +210,7 @@ class SchoolingService:
                     "data": {}
                 }
 
-            print(f"\nNombre de communes trouvées pour le département {dep}: {len(communes)}")
-
-            # OPTIMISATION : 1 requête par année avec JOIN au lieu de 2 avec IN(...)
-            results = {year: self._calculate_rates_with_join(year, geo_filter=(GeoCode.dep, dep)) for year in range(2017, 2022)}
+            results = self._rates_by_year(GeoCode.dep, dep)
 
             return {
                 "territory_type": "department",
@@ -278,22 +230,15 @@ class SchoolingService:
             self.close()
 
     # =========================================================================
-    # Région — OPTIMISÉ : 5 requêtes JOIN (1/partition) au lieu de 10 IN
+    # Région
     # =========================================================================
     def get_region_schooling(self, reg: str):
         """Récupère les données de scolarisation pour une région"""
         try:
-            region_check = self.db.query(GeoCode.reg).filter(GeoCode.reg == str(reg)).first()
-            if not region_check:
-                return {"territory_type": "region", "code": reg, "name": "Région inconnue", "data": {}}
-
-            communes = self.db.query(GeoCode.codgeo).filter(GeoCode.reg == str(reg)).all()
-
-            if not communes:
+            if not get_territory_index().contains("region", reg):
                 return {"territory_type": "region", "code": reg, "name": "Région inconnue", "data": {}}
 
-            # OPTIMISATION : 1 requête par année avec JOIN au lieu de 2 avec IN(...)
-            results = {year: self._calculate_rates_with_join(year, geo_filter=(GeoCode.reg, reg)) for year in range(2017, 2022)}
+            results = self._rates_by_year(GeoCode.reg, reg)
 
             return {"territory_type": "region", "code": reg, "name": f"Région {reg}", "data": results}
         except SQLAlchemyError as e:
@@ -303,13 +248,12 @@ class SchoolingService:
             self.close()
 
     # =========================================================================
-    # France — OPTIMISÉ : 5 requêtes (1/partition) au lieu de 10
+    # France (pas de filtre géo, pas de JOIN)
     # =========================================================================
     def get_france_schooling(self):
         """Récupère les données de scolarisation pour toute la France"""
         try:
-            # OPTIMISATION : 1 requête par année (pas de filtre géo, pas de JOIN)
-            results = {year: self._calculate_rates_with_join(year) for year in range(2017, 2022)}
+            results = self._rates_by_year()
 
             return {
                 "territory_type": "country",
@@ -318,112 +262,152 @@ class SchoolingService:
                 "data": results
             }
         except SQLAlchemyError as e:
+            # Pas de repli vide : la réponse nationale est mise en cache (cached_response)
             print(f"Erreur pour la France: {str(e)}")
-            return {
-                "territory_type": "country",
-                "code": "FR",
-                "name": "Erreur",
-                "data": {}
-            }
+            raise
         finally:
             self.close()
 
     # =========================================================================
-    # EPCI — liste des communes avec statistiques (inchangé)
+    # Listes de communes (EPCI, département, région) — 1 requête GROUP BY
+    # geo_code sur la partition de l'année, tri et top-N en SQL
     # =========================================================================
-    def get_communes_schooling_by_epci(self, epci: str):
+    def _empty_communes_page(self, sort_by, order, limit, offset, year):
+        return {
+            "year": year,
+            "communes_count": 0,
+            "average_schooling_rate_2y": 0.0,
+            "average_schooling_rate_3_5y": 0.0,
+            "sort_by": sort_by,
+            "order": order,
+            "limit": limit,
+            "offset": offset,
+            "communes": []
+        }
+
+    def _communes_schooling_page(self, level: str, column, code: str, sort_by: str = "2y",
+                                 order: str = "desc", limit: int = None, offset: int = 0, year: int = None) -> dict:
+        """
+        Taux de scolarisation de toutes les communes d'un territoire pour une année
+        (la plus récente par défaut). Les communes sans données sont gardées avec
+        des zéros ; les moyennes du territoire sont des sommes fenêtrées calculées
+        avant le LIMIT, dans la même requête.
+        """
+        if year is None:
+            years = schooling_years(self.db)
+            year = years[-1] if years else None
+
+        page = self._empty_communes_page(sort_by, order, limit, offset, year)
+        page["communes_count"] = get_territory_index().count(level, code)
+        if not page["communes_count"] or year is None:
+            return page
+
+        counts = self.db.query(
+            Schooling.geo_code, *self._counts_columns()
+        ).join(
+            GeoCode, Schooling.geo_code == GeoCode.codgeo
+        ).filter(
+            column == str(code),
+            Schooling.year == year,
+            Schooling.sex.in_(['1', '2']),
+            Schooling.age.in_(['002', '003', '004', '005'])
+        ).group_by(Schooling.geo_code).subquery()
+
+        total_2y = func.coalesce(counts.c.total_2y, 0)
+        schooled_2y = func.coalesce(counts.c.schooled_2y, 0)
+        total_3_5y = func.coalesce(counts.c.total_3_5y, 0)
+        schooled_3_5y = func.coalesce(counts.c.schooled_3_5y, 0)
+        rates = {
+            "2y": case((total_2y > 0, schooled_2y * 100.0 / total_2y), else_=0),
+            "3_5y": case((total_3_5y > 0, schooled_3_5y * 100.0 / total_3_5y), else_=0),
+        }
+        sort_column = rates[sort_by]
+
+        query = self.db.query(
+            GeoCode.codgeo, GeoCode.libgeo,
+            total_2y.label('total_2y'), schooled_2y.label('schooled_2y'),
+            total_3_5y.label('total_3_5y'), schooled_3_5y.label('schooled_3_5y'),
+            func.sum(total_2y).over().label('territory_total_2y'),
+            func.sum(schooled_2y).over().label('territory_schooled_2y'),
+            func.sum(total_3_5y).over().label('territory_total_3_5y'),
+            func.sum(schooled_3_5y).over().label('territory_schooled_3_5y'),
+        ).outerjoin(
+            counts, counts.c.geo_code == GeoCode.codgeo
+        ).filter(
+            column == str(code)
+        ).order_by(
+            sort_column.desc() if order == "desc" else sort_column.asc(),
+            GeoCode.codgeo
+        )
+        if limit is not None:
+            query = query.limit(limit)
+        rows = query.offset(offset).all()
+
+        # Page au-delà de la dernière commune : moyennes relues sur les mêmes effectifs
+        totals = rows[0] if rows else self.db.query(
+            func.sum(counts.c.total_2y).label('territory_total_2y'),
+            func.sum(counts.c.schooled_2y).label('territory_schooled_2y'),
+            func.sum(counts.c.total_3_5y).label('territory_total_3_5y'),
+            func.sum(counts.c.schooled_3_5y).label('territory_schooled_3_5y'),
+        ).one()
+        territory = self._rates(totals.territory_total_2y, totals.territory_schooled_2y,
+                                totals.territory_total_3_5y, totals.territory_schooled_3_5y)
+        page["average_schooling_rate_2y"] = territory["schooling_rate_2y"]
+        page["average_schooling_rate_3_5y"] = territory["schooling_rate_3_5y"]
+
+        for row in rows:
+            commune_rates = self._rates(row.total_2y, row.schooled_2y, row.total_3_5y, row.schooled_3_5y)
+            page["communes"].append({
+                "code": row.codgeo,
+                "name": row.libgeo,
+                "schooling_rate_2y": commune_rates["schooling_rate_2y"],
+                "total_children_2y": commune_rates["total_children_2y"],
+                "schooled_children_2y": commune_rates["schooled_children_2y"],
+                "schooling_rate_3_5y": commune_rates["schooling_rate_3_5y"],
+                "total_children_3_5y": commune_rates["total_children_3_5y"],
+                "schooled_children_3_5y": commune_rates["schooled_children_3_5y"]
+            })
+        return page
+
+    def get_communes_schooling_by_epci(self, epci: str, sort_by: str = "2y", order: str = "desc",
+                                       limit: int = None, offset: int = 0, year: int = None):
         """Récupère les taux de scolarisation pour toutes les communes d'un EPCI"""
         try:
-            # Récupérer les communes de l'EPCI
-            communes = self.db.query(GeoCode.codgeo, GeoCode.libgeo).filter(GeoCode.epci == str(epci)).all()
-
-            if not communes:
-                return {
-                    "epci": epci,
-                    "epci_name": "",
-                    "communes_count": 0,
-                    "communes": []
-                }
-
-            # Récupérer le nom de l'EPCI
-            epci_info = self.db.query(GeoCode.libepci).filter(GeoCode.epci == str(epci)).first()
-            epci_name = epci_info[0] if epci_info else f"EPCI {epci}"
-
-            # Récupérer les données pour chaque commune
-            communes_data = []
-            latest_year = 2021
-
-            for code, name in communes:
-                commune_data = self.get_commune_schooling(code)
-
-                if commune_data and "data" in commune_data and commune_data["data"]:
-                    years = sorted(commune_data["data"].keys())
-                    if years:
-                        latest_year = years[-1]
-                        year_data = commune_data["data"][latest_year]
-                        communes_data.append({
-                            "code": code,
-                            "name": name,
-                            "schooling_rate_2y": year_data.get("schooling_rate_2y", 0),
-                            "total_children_2y": year_data.get("total_children_2y", 0),
-                            "schooled_children_2y": year_data.get("schooled_children_2y", 0),
-                            "schooling_rate_3_5y": year_data.get("schooling_rate_3_5y", 0),
-                            "total_children_3_5y": year_data.get("total_children_3_5y", 0),
-                            "schooled_children_3_5y": year_data.get("schooled_children_3_5y", 0)
-                        })
-                    else:
-                        communes_data.append({
-                            "code": code,
-                            "name": name,
-                            "schooling_rate_2y": 0,
-                            "total_children_2y": 0,
-                            "schooled_children_2y": 0,
-                            "schooling_rate_3_5y": 0,
-                            "total_children_3_5y": 0,
-                            "schooled_children_3_5y": 0
-                        })
-                else:
-                    communes_data.append({
-                        "code": code,
-                        "name": name,
-                        "schooling_rate_2y": 0,
-                        "total_children_2y": 0,
-                        "schooled_children_2y": 0,
-                        "schooling_rate_3_5y": 0,
-                        "total_children_3_5y": 0,
-                        "schooled_children_3_5y": 0
-                    })
-
-            # Trier par taux de scolarisation des 2 ans décroissant
-            communes_data.sort(key=lambda x: x["schooling_rate_2y"], reverse=True)
-
-            # Calculer les moyennes EPCI
-            total_children_2y = sum(commune["total_children_2y"] for commune in communes_data)
-            schooled_children_2y = sum(commune["schooled_children_2y"] for commune in communes_data)
-            avg_schooling_rate_2y = (schooled_children_2y / total_children_2y * 100) if total_children_2y > 0 else 0
-
-            total_children_3_5y = sum(commune["total_children_3_5y"] for commune in communes_data)
-            schooled_children_3_5y = sum(commune["schooled_children_3_5y"] for commune in communes_data)
-            avg_schooling_rate_3_5y = (schooled_children_3_5y / total_children_3_5y * 100) if total_children_3_5y > 0 else 0
-
             return {
                 "epci": epci,
-                "epci_name": epci_name,
-                "year": latest_year,
-                "communes_count": len(communes),
-                "average_schooling_rate_2y": round(avg_schooling_rate_2y, 1),
-                "average_schooling_rate_3_5y": round(avg_schooling_rate_3_5y, 1),
-                "communes": communes_data
+                "epci_name": get_territory_index().name_of("epci", epci) or "",
+                **self._communes_schooling_page("epci", GeoCode.epci, epci, sort_by, order, limit, offset, year)
             }
         except Exception as e:
             print(f"Erreur lors de la récupération des données de scolarisation pour l'EPCI {epci}: {str(e)}")
-            import traceback
-            print(traceback.format_exc())
+            return {"epci": epci, "epci_name": "", **self._empty_communes_page(sort_by, order, limit, offset, year)}
+        finally:
+            self.close()
+
+    def get_communes_schooling_by_department(self, dep: str, sort_by: str = "2y", order: str = "desc",
+                                             limit: int = 100, offset: int = 0, year: int = None):
+        """Récupère les taux de scolarisation des communes d'un département, triés et paginés"""
+        try:
             return {
-                "epci": epci,
-                "epci_name": "",
-                "communes_count": 0,
-                "communes": []
+                "department": dep,
+                **self._communes_schooling_page("department", GeoCode.dep, dep, sort_by, order, limit, offset, year)
             }
+        except Exception as e:
+            print(f"Erreur lors de la récupération des données de scolarisation pour le département {dep}: {str(e)}")
+            return {"department": dep, **self._empty_communes_page(sort_by, order, limit, offset, year)}
+        finally:
+            self.close()
+
+    def get_communes_schooling_by_region(self, reg: str, sort_by: str = "2y", order: str = "desc",
+                                         limit: int = 100, offset: int = 0, year: int = None):
+        """Récupère les taux de scolarisation des communes d'une région, triés et paginés"""
+        try:
+            return {
+                "region": reg,
+                **self._communes_schooling_page("region", GeoCode.reg, reg, sort_by, order, limit, offset, year)
+            }
+        except Exception as e:
+            print(f"Erreur lors de la récupération des données de scolarisation pour la région {reg}: {str(e)}")
+            return {"region": reg, **self._empty_communes_page(sort_by, order, limit, offset, year)}
         finally:
             self.close()
@@ -0,0 +1,208 @@
+"""
+app/territory.py
+----------------
+Index en mémoire de la hiérarchie territoriale (commune → EPCI / département → région).
+
+La table geo_codes (~35 000 lignes) change rarement : elle est chargée une fois
+par processus dans des tableaux compacts (array d'entiers) et des dictionnaires
+code → position, ce qui permet de répondre sans requête SQL aux questions
+enfants-de, parent-de, nom-de et aux comptages.
+
+L'index se recharge quand la table est réimportée (scripts/import_geo_codes.py) :
+le script incrémente la version de geo_codes dans dataset_versions, et le
+watcher de app/datasets.py déclenche le rechargement en arrière-plan.
+"""
+import threading
+from array import array
+
+from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
+
+from app.database import replica_router
+from app.datasets import dataset_watcher
+
+# Niveaux géographiques, du plus fin au plus large
+LEVELS = ("commune", "epci", "department", "region")
+
+# Niveaux parents d'une commune (colonnes epci, dep et reg de geo_codes)
+_PARENT_LEVELS = ("epci", "department", "region")
+
+_LOAD_SQL = text("""
+    SELECT codgeo, libgeo, epci, libepci, dep, reg
+    FROM geo_codes
+    ORDER BY codgeo
+""")
+
+
+class _Level:
+    """Territoires d'un niveau : codes, libellés et communes membres (positions)."""
+
+    __slots__ = ("codes", "names", "positions", "members")
+
+    def __init__(self):
+        self.codes = []
+        self.names = []
+        self.positions = {}
+        self.members = []
+
+    def add(self, code, name, with_members=True):
+        pos = self.positions.get(code)
+        if pos is None:
+            pos = len(self.codes)
+            self.positions[code] = pos
+            self.codes.append(code)
+            self.names.append(name)
+            if with_members:
+                self.members.append(array("i"))
+        elif name and not self.names[pos]:
+            self.names[pos] = name
+        return pos
+
+
+class TerritoryIndex:
+    """
+    Hiérarchie territoriale immuable construite à partir des lignes de geo_codes.
+
+    Les communes sont rangées par code ; pour chaque niveau parent, un tableau
+    `array('i')` donne la position du parent de chaque commune (-1 si absent).
+    """
+
+    def __init__(self, rows):
+        self.communes = _Level()
+        self.parents = {level: _Level() for level in _PARENT_LEVELS}
+        self.parent_of_commune = {level: array("i") for level in _PARENT_LEVELS}
+        self._derived = {}
+
+        # codgeo est la clé primaire de geo_codes : chaque commune n'apparaît qu'une fois
+        for codgeo, libgeo, epci, libepci, dep, reg in rows:
+            commune_pos = self.communes.add(codgeo, libgeo, with_members=False)
+            for level, code, name in (
+                ("epci", epci, libepci),
+                ("department", dep, None),
+                ("region", reg, None),
+            ):
+                if code:
+                    parent_pos = self.parents[level].add(code, name)
+                    self.parents[level].members[parent_pos].append(commune_pos)
+                else:
+                    parent_pos = -1
+                self.parent_of_commune[level].append(parent_pos)
+
+    @classmethod
+    def load(cls, bind=None):
+        with (bind or replica_router.read_engine()).connect() as conn:
+            return cls(conn.execute(_LOAD_SQL).all())
+
+    def _level(self, level: str) -> _Level:
+        if level == "commune":
+            return self.communes
+        try:
+            return self.parents[level]
+        except KeyError:
+            raise ValueError(f"Niveau géographique inconnu : {level}") from None
+
+    def _commune_positions(self, level: str, code: str):
+        if level == "france":
+            return range(len(self.communes.codes))
+        lvl = self._level(level)
+        pos = lvl.positions.get(str(code))
+        if pos is None:
+            return ()
+        if level == "commune":
+            return (pos,)
+        return lvl.members[pos]
+
+    def contains(self, level: str, code: str) -> bool:
+        return str(code) in self._level(level).positions
+
+    def name_of(self, level: str, code: str):
+        """Libellé d'un territoire (None si inconnu ; geo_codes ne nomme ni départements ni régions)."""
+        lvl = self._level(level)
+        pos = lvl.positions.get(str(code))
+        return lvl.names[pos] if pos is not None else None
+
+    def children_of(self, level: str, code: str, child_level: str = "commune") -> list:
+        """
+        Codes des territoires de niveau `child_level` contenus dans `level`/`code`
+        (`level` peut valoir "france"). Triés par code.
+        """
+        if child_level == "commune":
+            return [self.communes.codes[pos] for pos in self._commune_positions(level, code)]
+
+        key = (level, str(code), child_level)
+        cached = self._derived.get(key)
+        if cached is None:
+            parent_positions = self.parent_of_commune[child_level]
+            child_codes = self._level(child_level).codes
+            cached = sorted({
+                child_codes[parent_positions[pos]]
+                for pos in self._commune_positions(level, code)
+                if parent_positions[pos] >= 0
+            })
+            self._derived[key] = cached
+        return list(cached)
+
+    def communes_of(self, level: str, code: str) -> list:
+        """Couples (code, libellé) des communes d'un territoire, triés par code."""
+        codes, names = self.communes.codes, self.communes.names
+        return [(codes[pos], names[pos]) for pos in self._commune_positions(level, code)]
+
+    def parent_of(self, level: str, code: str, parent_level: str):
+        """Code du territoire de niveau `parent_level` contenant `level`/`code` (None si inconnu)."""
+        positions = self._commune_positions(level, code)
+        if not positions:
+            return None
+        parent_pos = self.parent_of_commune[parent_level][positions[0]]
+        return self.parents[parent_level].codes[parent_pos] if parent_pos >= 0 else None
+
+    def count(self, level: str, code: str, child_level: str = "commune") -> int:
+        """Nombre de territoires de niveau `child_level` dans `level`/`code`."""
+        if child_level == "commune":
+            return len(self._commune_positions(level, code))
+        return len(self.children_of(level, code, child_level))
+
+    def size(self, level: str) -> int:
+        """Nombre total de territoires d'un niveau."""
+        return len(self._level(level).codes)
+
+
+# ---------------------------------------------------------------------------
+# Instance partagée par le processus
+# ---------------------------------------------------------------------------
+
+_index = None
+_lock = threading.Lock()
+
+
+def _load_locked() -> TerritoryIndex:
+    global _index
+    _index = TerritoryIndex.load()
+    print(f"✅ Index territorial chargé : {_index.size('commune')} communes, {_index.size('epci')} EPCI")
+    return _index
+
+
+def reload_territory_index() -> TerritoryIndex:
+    """Recharge l'index depuis geo_codes et le publie (les lecteurs gardent l'ancien entre-temps)."""
+    with _lock:
+        return _load_locked()
+
+
+def get_territory_index() -> TerritoryIndex:
+    """Retourne l'index territorial du processus (chargé au premier appel)."""
+    index = _index
+    if index is None:
+        with _lock:
+            index = _index if _index is not None else _load_locked()
+    return index
+
+
+async def get_territory_index_async() -> TerritoryIndex:
+    """Variante pour le code async : sans attente si l'index est chargé, sinon chargement dans le threadpool."""
+    index = _index
+    if index is None:
+        index = await run_in_threadpool(get_territory_index)
+    return index
+
+
+# Réimport de geo_codes → rechargement de l'index (dans le thread du watcher)
+dataset_watcher.subscribe("geo_codes", lambda table_name, millesime: reload_territory_index())
@@ -17,7 +17,21 @@ CREATE INDEX IF NOT EXISTS ix_populations_codgeo_aged100 ON populations(codgeo,
 -- Index sur aged100 seul pour les requêtes France (agrégation totale filtrée par âge)
 CREATE INDEX IF NOT EXISTS ix_populations_aged100 ON populations(aged100);
 
+-- Index composite sur births pour les agrégats de naissances par année
+CREATE INDEX IF NOT EXISTS ix_births_geo_object_geo_time_period
+    ON births(geo_object, geo, time_period) INCLUDE (obs_value);
+
+-- Index composite sur public_safety pour les séries d'un ou plusieurs territoires
+-- (créé par la migration de la table, absent des bases créées par create_all)
+CREATE INDEX IF NOT EXISTS ix_public_safety_territory_year
+    ON public_safety(territory_type, territory_code, year);
+
+-- Index composite sur public_safety pour les séries d'un indicateur (code canonique,
+-- colonne ajoutée par la migration e6f7a8b9c0d1 et renseignée à l'import)
+CREATE INDEX IF NOT EXISTS ix_public_safety_indicator_code_type_code
+    ON public_safety(indicator_code, territory_type, territory_code);
+
 -- Vérification
 SELECT indexname, tablename FROM pg_indexes
-WHERE tablename IN ('geo_codes', 'populations')
+WHERE tablename IN ('geo_codes', 'populations', 'births', 'public_safety')
 ORDER BY tablename, indexname;
@@ -0,0 +1,100 @@
+"""
+Compare les agrégats de naissances en une requête GROUP BY time_period
+(GeoCodeService._births_by_year) à l'ancienne boucle par commune
+(BirthService.get_by_code pour chaque commune, puis somme en Python).
+
+Usage :
+    python scripts/benchmark_births.py [--sample 5]
+"""
+import sys
+import os
+import time
+import random
+import argparse
+import logging
+
+# Ajouter le répertoire racine du projet au chemin d'importation
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from app.database import SessionLocal, engine
+from app.models import GeoCode
+from app.territory import TerritoryIndex
+from app.services.birth_service import BirthService
+from app.services.geocode_service import GeoCodeService
+
+_GEO_COLUMNS = {"epci": GeoCode.epci, "department": GeoCode.dep, "region": GeoCode.reg}
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def per_commune_loop(db, communes) -> dict:
+    """Ancien calcul : une requête par commune."""
+    birth_service = BirthService(db)
+    yearly_births = {}
+    for commune in communes:
+        for birth in birth_service.get_by_code(commune):
+            yearly_births[birth.time_period] = yearly_births.get(birth.time_period, 0) + birth.obs_value
+    return {int(k): float(v) for k, v in yearly_births.items()}
+
+
+def benchmark(index, level, sample):
+    codes = index.parents[level].codes
+    picked = random.sample(codes, min(sample, len(codes)))
+    loop_total = grouped_total = 0.0
+    mismatches = 0
+
+    db = SessionLocal()
+    try:
+        geocode_service = GeoCodeService(db)
+        for code in picked:
+            communes = index.children_of(level, code)
+            expected, loop_time = _timed(lambda: per_commune_loop(db, communes))
+            got, grouped_time = _timed(lambda: geocode_service._births_by_year(_GEO_COLUMNS[level], code))
+            loop_total += loop_time
+            grouped_total += grouped_time
+            if expected.keys() != got.keys() or any(abs(expected[y] - got[y]) > 1e-6 for y in expected):
+                mismatches += 1
+    finally:
+        db.close()
+
+    n = len(picked) or 1
+    logger.info(
+        f"  {level:<10} boucle par commune : {loop_total / n * 1000:9.1f} ms/territoire | "
+        f"GROUP BY time_period : {grouped_total / n * 1000:7.1f} ms/territoire | "
+        f"gain x{loop_total / grouped_total if grouped_total else 0:.0f} | écarts : {mismatches}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark des agrégats de naissances")
+    parser.add_argument("--sample", type=int, default=5, help="Territoires tirés au hasard par niveau")
+    args = parser.parse_args()
+
+    index, load_time = _timed(lambda: TerritoryIndex.load(bind=engine))
+    logger.info(f"✅ Index territorial chargé en {load_time * 1000:.1f} ms")
+
+    for level in _GEO_COLUMNS:
+        benchmark(index, level, args.sample)
+
+    db = SessionLocal()
+    try:
+        _, france_time = _timed(lambda: GeoCodeService(db).aggregate_births_france())
+        logger.info(f"  france     GROUP BY time_period : {france_time * 1000:.1f} ms")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    logger.info("🚀 Benchmark des agrégats de naissances")
+    main()
+    logger.info("🏁 Terminé")
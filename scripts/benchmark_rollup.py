@@ -0,0 +1,127 @@
+"""
+Compare le moteur d'agrégation vectorisé (app/rollup_engine.py) aux requêtes
+SQL d'agrégation par territoire exécutées à chaque appel.
+
+Usage :
+    python scripts/benchmark_rollup.py [--sample 20]
+"""
+import sys
+import os
+import time
+import random
+import argparse
+import logging
+
+# Ajouter le répertoire racine du projet au chemin d'importation
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from sqlalchemy import text
+from app.database import engine
+from app.rollup_engine import Rollup, RollupSpec
+from app.territory import TerritoryIndex
+from app.services.employment_service import WOMEN_EMPLOYMENT_ROLLUP
+
+# Les statistiques enfants de l'API sont servies par population_children_rollup ;
+# cette spec ne sert qu'à mesurer le moteur sur une table volumineuse
+CHILDREN_ROLLUP = RollupSpec(
+    "population_children", "populations",
+    sql="""
+        SELECT codgeo,
+               SUM(nb),
+               SUM(CASE WHEN aged100 IN ('000', '001', '002') THEN nb ELSE 0 END),
+               SUM(CASE WHEN aged100 IN ('003', '004', '005') THEN nb ELSE 0 END)
+        FROM populations
+        GROUP BY codgeo
+    """,
+    measures=("total", "under_3", "three_to_five"),
+    ratios={
+        "under_3_rate": ("under_3", "total", 100),
+        "three_to_five_rate": ("three_to_five", "total", 100),
+    },
+)
+
+# Agrégats « par requête » équivalents à ceux des services (JOIN geo_codes + SUM)
+_GEO_COLUMNS = {"epci": "epci", "department": "dep", "region": "reg"}
+
+_CHILDREN_SQL = """
+    SELECT SUM(p.nb),
+           SUM(CASE WHEN p.aged100 IN ('000', '001', '002') THEN p.nb ELSE 0 END),
+           SUM(CASE WHEN p.aged100 IN ('003', '004', '005') THEN p.nb ELSE 0 END)
+    FROM populations p JOIN geo_codes g ON g.codgeo = p.codgeo
+    WHERE g.{column} = :code
+"""
+
+_EMPLOYMENT_SQL = """
+    SELECT SUM(e.women_15_64), SUM(e.women_active_15_64), SUM(e.women_employed_15_64),
+           SUM(e.women_employees_25_54), SUM(e.women_part_time_25_54),
+           SUM(e.women_employees_15_64), SUM(e.women_part_time_15_64)
+    FROM employment e JOIN geo_codes g ON g.codgeo = e.geo_code
+    WHERE g.{column} = :code AND e.year = :year
+"""
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def benchmark(spec, sql, index, sample, key=None):
+    logger.info(f"📊 {spec.name}")
+
+    rollup, build_time = _timed(lambda: Rollup.load(spec, bind=engine, index=index))
+    if key is None and spec.key:
+        key = max(rollup.keys())
+    logger.info(f"  ⚙️ Construction (requête communale + agrégation NumPy) : {build_time * 1000:.1f} ms")
+
+    for level, column in _GEO_COLUMNS.items():
+        codes = index.parents[level].codes
+        picked = random.sample(codes, min(sample, len(codes)))
+
+        _, lookup_time = _timed(lambda: [rollup.get(level, code, key) for code in codes])
+
+        with engine.connect() as conn:
+            query = text(sql.format(column=column))
+            rows, sql_time = _timed(lambda: [
+                conn.execute(query, {"code": code, "year": key}).first() for code in picked
+            ])
+
+        mismatches = 0
+        for code, row in zip(picked, rows):
+            values = rollup.get(level, code, key) or {}
+            expected = [float(v or 0) for v in row]
+            got = [values.get(measure, 0.0) for measure in spec.measures]
+            if any(abs(a - b) > 1e-6 * max(1.0, abs(a)) for a, b in zip(expected, got)):
+                mismatches += 1
+
+        per_sql = sql_time / len(picked) * 1000 if picked else 0
+        per_lookup = lookup_time / len(codes) * 1000 if codes else 0
+        logger.info(
+            f"  {level:<10} SQL : {per_sql:8.2f} ms/territoire ({len(picked)} échantillons) | "
+            f"moteur : {per_lookup:.4f} ms/territoire ({len(codes)} territoires) | "
+            f"tous les territoires en SQL ≈ {per_sql * len(codes) / 1000:.1f} s | écarts : {mismatches}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du moteur d'agrégation hiérarchique")
+    parser.add_argument("--sample", type=int, default=20, help="Territoires interrogés en SQL par niveau")
+    args = parser.parse_args()
+
+    index, load_time = _timed(lambda: TerritoryIndex.load(bind=engine))
+    logger.info(f"✅ Index territorial chargé en {load_time * 1000:.1f} ms")
+
+    benchmark(CHILDREN_ROLLUP, _CHILDREN_SQL, index, args.sample)
+    benchmark(WOMEN_EMPLOYMENT_ROLLUP, _EMPLOYMENT_SQL, index, args.sample)
+
+
+if __name__ == "__main__":
+    logger.info("🚀 Benchmark du moteur d'agrégation")
+    main()
+    logger.info("🏁 Terminé")
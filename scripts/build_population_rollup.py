@@ -0,0 +1,55 @@
+"""
+Reconstruit la table population_children_rollup sans réimporter populations
+(première mise en place, ou après un réimport de geo_codes).
+"""
+import sys
+import os
+import logging
+import traceback
+from urllib.parse import urlparse
+
+import psycopg2
+
+# Ajouter le répertoire racine du projet au chemin d'importation
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+from dotenv import load_dotenv
+from app.rollups import refresh_population_children_rollup
+
+load_dotenv()
+
+parsed_url = urlparse(os.environ.get("DATABASE_URL"))
+DB_CONFIG = {
+    "host": parsed_url.hostname,
+    "port": parsed_url.port,
+    "database": parsed_url.path[1:],
+    "user": parsed_url.username,
+    "password": parsed_url.password
+}
+
+
+def build_population_rollup():
+    conn = psycopg2.connect(**DB_CONFIG)
+    cur = conn.cursor()
+    try:
+        cur.execute("SET work_mem = '256MB';")
+        rows = refresh_population_children_rollup(cur)
+        conn.commit()
+        logger.info(f"✅ population_children_rollup reconstruite : {rows} territoires")
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"❌ Erreur lors du calcul des agrégats : {str(e)}")
+        logger.error(traceback.format_exc())
+    finally:
+        cur.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    logger.info("🚀 Calcul des agrégats enfants par territoire")
+    build_population_rollup()
+    logger.info("🏁 Terminé")
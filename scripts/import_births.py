@@ -18,6 +18,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.database import SessionLocal, engine
 from app.models import Birth
+from app.datasets import record_dataset_version, file_checksum
 
 def clean_births_table():
     """Nettoie la table births en supprimant toutes les données existantes."""
@@ -63,6 +64,7 @@ def import_csv_to_db():
         try:
             logger.info("🗄️ Insertion des données dans la base PostgreSQL...")
             session.bulk_insert_mappings(Birth, df.to_dict(orient="records"))
+            record_dataset_version(session, "births", row_count=len(df), checksum=file_checksum(file_path))
             session.commit()
             logger.info(f"✅ {len(df)} enregistrements importés avec succès dans la table `births` !")
         except Exception as e:
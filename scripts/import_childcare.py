@@ -11,6 +11,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 # Import des modules de base de données - La fonction load_dotenv() est déjà appelée par app.database
 from app.models import Childcare
 from app.database import SessionLocal, Base, engine
+from app.datasets import record_dataset_version, file_checksum
 
 # Configuration du logging
 logging.basicConfig(
@@ -399,6 +400,11 @@ def main():
 
             total_count += count
 
+        # Enregistrer la nouvelle version du jeu de données (invalide les caches de l'API)
+        source_paths = [cfg['path'] for cfg in SOURCE_FILES.values() if Path(cfg['path']).exists()]
+        with engine.begin() as conn:
+            record_dataset_version(conn, "childcare", checksum=file_checksum(*source_paths))
+
         logger.info(f"✨ Import terminé avec succès! {total_count} enregistrements au total.")
 
     except Exception as e:
@@ -15,6 +15,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 # Importer les objets de base de données depuis app.database
 from app.database import SessionLocal, engine
 from app.models import Employment
+from app.datasets import record_dataset_version, file_checksum
 
 def clean_float(val):
     """Nettoie les valeurs float, remplace NaN par None"""
@@ -22,13 +23,12 @@ def clean_float(val):
         return None
     return float(val)
 
-def clean_database():
-    """Nettoie la table employment avant l'import"""
+def clean_database(conn):
+    """Nettoie la table employment avant l'import (dans la transaction d'import)"""
     try:
-        with engine.connect() as conn:
-            logger.info("🗑️ Nettoyage de la table employment...")
-            conn.execute(text("TRUNCATE TABLE employment RESTART IDENTITY CASCADE"))
-            logger.info("✅ Table nettoyée avec succès")
+        logger.info("🗑️ Nettoyage de la table employment...")
+        conn.execute(text("TRUNCATE TABLE employment RESTART IDENTITY CASCADE"))
+        logger.info("✅ Table nettoyée avec succès")
     except Exception as e:
         logger.error(f"❌ Erreur lors du nettoyage de la table : {str(e)}")
         raise
@@ -51,9 +51,6 @@ def import_employment_data():
         # Vérifier les fichiers
         verify_files()
 
-        # Nettoyer la base de données
-        clean_database()
-
         # Charger les données actives
         logger.info("📊 Chargement des données de population active...")
         active_df = pd.read_csv(
@@ -91,23 +88,32 @@ def import_employment_data():
             }
             records.append(record)
 
-        # Insérer les données
+        # Nettoyer, insérer et enregistrer la nouvelle version du jeu de données
+        # (invalide les caches de l'API) dans une seule transaction : la version
+        # devient visible en même temps que les données
         logger.info("💾 Insertion des données en base...")
-        with engine.connect() as conn:
-            for record in records:
-                conn.execute("""
-                    INSERT INTO employment (
-                        geo_code, year,
-                        women_15_64, women_active_15_64, women_employed_15_64,
-                        women_employees_25_54, women_part_time_25_54,
-                        women_employees_15_64, women_part_time_15_64
-                    ) VALUES (
-                        %(geo_code)s, %(year)s,
-                        %(women_15_64)s, %(women_active_15_64)s, %(women_employed_15_64)s,
-                        %(women_employees_25_54)s, %(women_part_time_25_54)s,
-                        %(women_employees_15_64)s, %(women_part_time_15_64)s
-                    )
-                """, record)
+        with engine.begin() as conn:
+            clean_database(conn)
+            conn.execute(text("""
+                INSERT INTO employment (
+                    geo_code, year,
+                    women_15_64, women_active_15_64, women_employed_15_64,
+                    women_employees_25_54, women_part_time_25_54,
+                    women_employees_15_64, women_part_time_15_64
+                ) VALUES (
+                    :geo_code, :year,
+                    :women_15_64, :women_active_15_64, :women_employed_15_64,
+                    :women_employees_25_54, :women_part_time_25_54,
+                    :women_employees_15_64, :women_part_time_15_64
+                )
+            """), records)
+            record_dataset_version(
+                conn, "employment", millesime=2021, row_count=len(records),
+                checksum=file_checksum(
+                    Path("data/employment/activity/base-cc-emploi-pop-active-2021.CSV"),
+                    Path("data/employment/characteristics/base-cc-caract_emp-2021.CSV")
+                )
+            )
 
         logger.info(f"✨ Import terminé avec succès : {len(records)} enregistrements importés")
 
@@ -14,6 +14,7 @@ logger = logging.getLogger(__name__)
 # Import des modules app (load_dotenv est déjà appelé par app.database)
 from app.database import SessionLocal
 from app.models import Family
+from app.datasets import record_dataset_version, file_checksum
 
 # Configuration des fichiers et des années
 DATA_PATH = "data/families/commune"
@@ -121,6 +122,10 @@ def import_family_data():
                 db.commit()
                 logger.info(f"  - Progression: {min(i+batch_size, len(records))}/{len(records)} enregistrements")
 
+            # Enregistrer la nouvelle version du millésime (invalide les caches de l'API)
+            record_dataset_version(db, "families", millesime=year, row_count=len(records), checksum=file_checksum(file_path))
+            db.commit()
+
             total_records += len(df)
             logger.info(f"✅ Importé {len(df)} enregistrements pour {year}")
 
@@ -20,6 +20,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Import des objets depuis app.database
 from app.database import engine
+from app.datasets import record_dataset_version, file_checksum
 from dotenv import load_dotenv
 
 # Charger les variables d'environnement
@@ -150,6 +151,7 @@ def import_data(year, file_path):
 
         # Restaurer les paramètres de table et index après import
         restore_table_settings(cur)
+        record_dataset_version(cur, "family_employment", millesime=year, row_count=total_records, checksum=file_checksum(file_path))
         conn.commit()
 
         logger.info(f"✅ Importé {total_records} enregistrements pour {year}")
@@ -15,6 +15,8 @@ logger = logging.getLogger(__name__)
 # Import des modules app
 from app.database import SessionLocal
 from app.models import GeoCode
+from app.datasets import record_dataset_version, file_checksum
+from app.rollups import refresh_population_children_rollup
 
 # Chemin du fichier CSV
 CSV_FILE = "data/geography/COG_au_01-01-2024.csv"
@@ -118,6 +120,10 @@ def import_geo_codes():
         logger.info(f"✅ Imported {len(geo_entries)} rows.")
 
         # Vérifier après import
+        record_dataset_version(db, "geo_codes", row_count=len(geo_entries), checksum=file_checksum(CSV_FILE))
+        # Les agrégats EPCI / département / région dépendent des rattachements
+        rollup_rows = refresh_population_children_rollup(db)
+        logger.info(f"✅ population_children_rollup recalculée : {rollup_rows} territoires")
         db.commit()  # Assurez-vous que toutes les données sont persistées
         count_5_digits = db.query(GeoCode).filter(GeoCode.codgeo.like('_____')).count()
         logger.info(f"📊 Après import: {count_5_digits} codes à 5 chiffres sur {len(geo_entries)} total")
@@ -16,6 +16,7 @@ logger = logging.getLogger(__name__)
 # Import des modules app (load_dotenv est déjà appelé par app.database)
 from app.database import engine, Base, SessionLocal
 from app.models import Historical
+from app.datasets import record_dataset_version, file_checksum
 
 def clean_database():
     """Nettoie la table historical"""
@@ -95,6 +96,7 @@ def import_historical_data():
             # Option 1: Insertion par lots avec bulk_save_objects
             historical_objects = [Historical(**record) for record in records]
             session.bulk_save_objects(historical_objects)
+            record_dataset_version(session, "historical", row_count=len(records), checksum=file_checksum(file_path))
             session.commit()
 
             # Option 2: Alternative avec bulk_insert_mappings
@@ -27,6 +27,7 @@ from urllib.parse import urlparse
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from dotenv import load_dotenv
 load_dotenv()
+from app.datasets import record_dataset_version, file_checksum
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -210,6 +211,7 @@ def main():
         count = cur.fetchone()[0]
         cur.execute("SELECT DISTINCT year FROM iris_families ORDER BY year;")
         all_years = [r[0] for r in cur.fetchall()]
+        record_dataset_version(cur, "iris_families", millesime=args.year, row_count=count, checksum=file_checksum(args.file))
         conn.commit()
 
         logger.info(f"🎉 Millésime {args.year} importé — {count:,} IRIS")
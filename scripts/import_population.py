@@ -17,6 +17,8 @@ logger = logging.getLogger(__name__)
 
 # Import des modules app
 from dotenv import load_dotenv
+from app.datasets import record_dataset_version, file_checksum
+from app.rollups import refresh_population_children_rollup
 
 # Charger les variables d'environnement
 load_dotenv()
@@ -176,6 +178,12 @@ def import_population_data():
 
             # Restaurer les paramètres normaux et créer les index
             restore_table_settings(cur)
+            record_dataset_version(cur, "populations", row_count=total_records, checksum=file_checksum(file_path))
+
+            # Agrégats enfants précalculés (commune → France), publiés avec les données
+            logger.info("📊 Calcul des agrégats population_children_rollup...")
+            rollup_rows = refresh_population_children_rollup(cur)
+            logger.info(f"✅ {rollup_rows} territoires agrégés")
             conn.commit()
 
             # Vérification finale des données importées
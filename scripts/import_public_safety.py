@@ -15,8 +15,10 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 logger = logging.getLogger(__name__)
 
 # Import des modules app
-from app.database import engine, SessionLocal
+from app.database import SessionLocal
 from app.models import PublicSafety
+from app.datasets import record_dataset_version, file_checksum
+from app.services.public_safety_service import indicator_code
 
 def clean_float(val):
     """Nettoie les valeurs float, remplace NaN par 0"""
@@ -24,18 +26,17 @@ def clean_float(val):
         return 0.0
     return float(val)
 
-def clean_database():
-    """Nettoie la table public_safety avant l'import"""
+def clean_database(session):
+    """Nettoie la table public_safety avant l'import (dans la transaction d'import)"""
     try:
-        with engine.connect() as conn:
-            logger.info("🗑️ Nettoyage de la table public_safety...")
-            conn.execute(text("TRUNCATE TABLE public_safety RESTART IDENTITY"))
-            logger.info("✅ Table nettoyée avec succès")
+        logger.info("🗑️ Nettoyage de la table public_safety...")
+        session.execute(text("TRUNCATE TABLE public_safety RESTART IDENTITY"))
+        logger.info("✅ Table nettoyée avec succès")
     except Exception as e:
         logger.error(f"❌ Erreur lors du nettoyage de la table : {str(e)}")
         raise
 
-def import_commune_data():
+def import_commune_data(session):
     """Importe les données communales depuis le fichier parquet"""
     try:
         df = pd.read_parquet(Path("data/public_safety/commune/donnee-comm-2023.parquet"))
@@ -51,33 +52,25 @@ def import_commune_data():
                 'territory_code': str(row['CODGEO_2023']),
                 'year': int(row['annee']),
                 'indicator_class': str(row['classe']),
+                'indicator_code': indicator_code(row['classe']),
                 'rate': clean_float(row['tauxpourmille'])
             })
 
-        # Import en base avec SQLAlchemy ORM
-        session = SessionLocal()
-        try:
-            # Utiliser bulk_insert_mappings pour insérer efficacement par lots
-            for i in range(0, len(records), 5000):
-                batch = records[i:i+5000]
-                session.bulk_insert_mappings(PublicSafety, batch)
-                session.commit()
-                logger.info(f"🔄 Progression: {min(i+5000, len(records))}/{len(records)} enregistrements communaux insérés")
-
-            logger.info(f"✅ Imported {len(records)} commune records")
-        except Exception as e:
-            session.rollback()
-            logger.error(f"❌ Error importing commune data: {str(e)}")
-            logger.error(traceback.format_exc())
-            raise
-        finally:
-            session.close()
+        # Import en base avec SQLAlchemy ORM (validé par main() avec les autres niveaux)
+        # Utiliser bulk_insert_mappings pour insérer efficacement par lots
+        for i in range(0, len(records), 5000):
+            batch = records[i:i+5000]
+            session.bulk_insert_mappings(PublicSafety, batch)
+            session.flush()
+            logger.info(f"🔄 Progression: {min(i+5000, len(records))}/{len(records)} enregistrements communaux insérés")
+
+        logger.info(f"✅ Imported {len(records)} commune records")
     except Exception as e:
         logger.error(f"❌ Error importing commune data: {str(e)}")
         logger.error(traceback.format_exc())
         raise
 
-def import_department_data():
+def import_department_data(session):
     """Importe les données départementales"""
     try:
         df = pd.read_csv(
@@ -96,28 +89,20 @@ def import_department_data():
                 'territory_code': str(row['Code.département']),
                 'year': int(row['annee']),
                 'indicator_class': str(row['classe']),
+                'indicator_code': indicator_code(row['classe']),
                 'rate': clean_float(row['tauxpourmille'])
             })
 
-        # Import en base avec SQLAlchemy ORM
-        session = SessionLocal()
-        try:
-            session.bulk_insert_mappings(PublicSafety, records)
-            session.commit()
-            logger.info(f"✅ Imported {len(records)} department records")
-        except Exception as e:
-            session.rollback()
-            logger.error(f"❌ Error importing department data: {str(e)}")
-            logger.error(traceback.format_exc())
-            raise
-        finally:
-            session.close()
+        # Import en base avec SQLAlchemy ORM (validé par main() avec les autres niveaux)
+        session.bulk_insert_mappings(PublicSafety, records)
+        session.flush()
+        logger.info(f"✅ Imported {len(records)} department records")
     except Exception as e:
         logger.error(f"❌ Error importing department data: {str(e)}")
         logger.error(traceback.format_exc())
         raise
 
-def import_region_data():
+def import_region_data(session):
     """Importe les données régionales"""
     try:
         df = pd.read_csv(
@@ -139,22 +124,14 @@ def import_region_data():
                 'territory_code': region_code,
                 'year': int(row['annee']),
                 'indicator_class': str(row['classe']),
+                'indicator_code': indicator_code(row['classe']),
                 'rate': clean_float(row['tauxpourmille'])
             })
 
-        # Import en base avec SQLAlchemy ORM
-        session = SessionLocal()
-        try:
-            session.bulk_insert_mappings(PublicSafety, records)
-            session.commit()
-            logger.info(f"✅ Imported {len(records)} region records")
-        except Exception as e:
-            session.rollback()
-            logger.error(f"❌ Error importing region data: {str(e)}")
-            logger.error(traceback.format_exc())
-            raise
-        finally:
-            session.close()
+        # Import en base avec SQLAlchemy ORM (validé par main() avec les autres niveaux)
+        session.bulk_insert_mappings(PublicSafety, records)
+        session.flush()
+        logger.info(f"✅ Imported {len(records)} region records")
     except Exception as e:
         logger.error(f"❌ Error importing region data: {str(e)}")
         logger.error(traceback.format_exc())
@@ -175,13 +152,22 @@ def main():
                 logger.error(f"❌ File not found: {path}")
                 return
 
-        # Nettoyer la base avant import
-        clean_database()
-
-        # Importer les données
-        import_commune_data()
-        import_department_data()
-        import_region_data()
+        # Nettoyer, importer et enregistrer la nouvelle version du jeu de données
+        # (invalide les caches de l'API) dans une seule transaction : la version
+        # devient visible en même temps que les données
+        session = SessionLocal()
+        try:
+            clean_database(session)
+            import_commune_data(session)
+            import_department_data(session)
+            import_region_data(session)
+            record_dataset_version(session, "public_safety", checksum=file_checksum(*files.values()))
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
 
         logger.info("✨ All data imported successfully!")
 
@@ -14,8 +14,9 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 logger = logging.getLogger(__name__)
 
 # Import des modules app
-from app.database import engine, SessionLocal
+from app.database import SessionLocal
 from app.models import Revenue
+from app.datasets import record_dataset_version, file_checksum
 
 def clean_float(val):
     """Nettoie les valeurs float, remplace NaN par None"""
@@ -40,13 +41,12 @@ def clean_geo_code(code):
         code_str = code_str[:-2]
     return code_str
 
-def clean_database():
-    """Nettoie la table revenues avant l'import"""
+def clean_database(session):
+    """Nettoie la table revenues avant l'import (dans la transaction d'import)"""
     try:
-        with engine.connect() as conn:
-            logger.info("🗑️ Nettoyage de la table revenues...")
-            conn.execute(text("TRUNCATE TABLE revenues RESTART IDENTITY CASCADE"))
-            logger.info("✅ Table nettoyée avec succès")
+        logger.info("🗑️ Nettoyage de la table revenues...")
+        session.execute(text("TRUNCATE TABLE revenues RESTART IDENTITY CASCADE"))
+        logger.info("✅ Table nettoyée avec succès")
     except Exception as e:
         logger.error(f"❌ Erreur lors du nettoyage de la table : {str(e)}")
         raise
@@ -62,8 +62,11 @@ def get_file_suffix(level):
     }
     return suffixes.get(level, level.upper())
 
-def import_data_for_level(level, years):
-    """Importe les données pour un niveau géographique spécifique"""
+def import_data_for_level(session, level, years):
+    """
+    Importe les données pour un niveau géographique spécifique dans la
+    transaction d'import ; un fichier en erreur est annulé seul (savepoint).
+    """
     logger.info(f"📊 Importation des données pour le niveau: {level}")
 
     # Obtenir le suffixe correct pour le fichier
@@ -119,25 +122,22 @@ def import_data_for_level(level, years):
                 records.append(record)
 
             # Insérer les données en base
-            session = SessionLocal()
             try:
-                # Utiliser bulk_insert_mappings pour une meilleure performance
-                if records:
-                    # Insérer par lots pour les grands volumes de données
-                    batch_size = 5000
-                    for i in range(0, len(records), batch_size):
-                        batch = records[i:i+batch_size]
-                        session.bulk_insert_mappings(Revenue, batch)
-                        session.commit()
-                        logger.info(f"  - {min(i+batch_size, len(records))}/{len(records)} enregistrements traités")
+                with session.begin_nested():
+                    # Utiliser bulk_insert_mappings pour une meilleure performance
+                    if records:
+                        # Insérer par lots pour les grands volumes de données
+                        batch_size = 5000
+                        for i in range(0, len(records), batch_size):
+                            batch = records[i:i+batch_size]
+                            session.bulk_insert_mappings(Revenue, batch)
+                            session.flush()
+                            logger.info(f"  - {min(i+batch_size, len(records))}/{len(records)} enregistrements traités")
 
                 logger.info(f"✅ Importé {len(records)} enregistrements pour {level}, année {year}")
             except Exception as e:
-                session.rollback()
                 logger.error(f"❌ Erreur lors de l'importation des données {level} pour {year}: {str(e)}")
                 logger.error(traceback.format_exc())
-            finally:
-                session.close()
 
         except Exception as e:
             logger.error(f"❌ Erreur lors du traitement du fichier {level} pour {year}: {str(e)}")
@@ -145,9 +145,12 @@ def import_data_for_level(level, years):
 
 def import_revenue_data():
     """Fonction principale d'importation des données de revenus"""
+    # Nettoyage, import et nouvelles versions dans une seule transaction :
+    # les versions deviennent visibles en même temps que les données
+    session = SessionLocal()
     try:
         # Nettoyage de la base
-        clean_database()
+        clean_database(session)
 
         # Années à traiter
         years = range(2017, 2022)
@@ -157,13 +160,28 @@ def import_revenue_data():
 
         # Importer les données pour chaque niveau
         for level in levels:
-            import_data_for_level(level, years)
-
+            import_data_for_level(session, level, years)
+
+        # Enregistrer une nouvelle version par millésime (invalide les caches de l'API)
+        for year in years:
+            source_paths = [
+                path for path in (
+                    Path(f"data/revenues/{level}/cc_filosofi_{year}_{get_file_suffix(level)}.csv")
+                    for level in levels
+                ) if path.exists()
+            ]
+            checksum = file_checksum(*source_paths) if source_paths else None
+            record_dataset_version(session, "revenues", millesime=year, checksum=checksum)
+
+        session.commit()
         logger.info("✨ Importation des données de revenus terminée avec succès")
 
     except Exception as e:
+        session.rollback()
         logger.error(f"❌ Erreur générale lors de l'importation: {str(e)}")
         logger.error(traceback.format_exc())
+    finally:
+        session.close()
 
 if __name__ == "__main__":
     logger.info("🚀 Démarrage de l'import des données de revenus")
@@ -16,6 +16,7 @@ logger = logging.getLogger(__name__)
 
 # Import des modules app (pour les opérations qui n'utilisent pas COPY)
 from app.database import engine, Base, SessionLocal
+from app.datasets import record_dataset_version, file_checksum
 
 # Définition des constantes manquantes
 DATA_PATH = "data/education/schooling"
@@ -58,6 +59,11 @@ def restore_table_settings(cur):
     cur.execute("CREATE INDEX ix_schooling_year ON schooling(year);")
     cur.execute("ALTER TABLE schooling ENABLE TRIGGER ALL;")
 
+def ensure_year_partitions(cur):
+    """Crée la partition LIST des millésimes importés qui n'en ont pas encore (l'API les découvre d'elle-même)."""
+    for year in YEARS:
+        cur.execute(f"CREATE TABLE IF NOT EXISTS schooling_{int(year)} PARTITION OF schooling FOR VALUES IN ({int(year)});")
+
 def clean_schooling_table(cur):
     """Nettoie rapidement la table avec TRUNCATE au lieu de DELETE."""
     logger.info("🗑️ Nettoyage de la table schooling...")
@@ -90,6 +96,7 @@ def import_schooling_data():
     try:
         # Optimisation des paramètres
         optimize_db_settings(cur)
+        ensure_year_partitions(cur)
         prepare_table_for_import(cur)
 
         # Nettoyage rapide de la table
@@ -147,6 +154,11 @@ def import_schooling_data():
 
         # Restaurer les paramètres normaux
         restore_table_settings(cur)
+        for year in YEARS:
+            record_dataset_version(
+                cur, "schooling", millesime=year,
+                checksum=file_checksum(os.path.join(DATA_PATH, f"TD_FOR1_{year}.csv"))
+            )
         conn.commit()
 
         logger.info(f"✨ Import terminé. Total importé : {total_imported} enregistrements")
@@ -0,0 +1,156 @@
+"""
+Tests du cache partagé (app/cache.py) : budget en octets du TTLCache et
+coalescence des appels simultanés (SingleFlight).
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.cache import TTLCache, SingleFlight, _sizeof
+
+
+def _value(i):
+    return {"code": f"{i:05d}", "rates": [1.0, 2.0, 3.0]}
+
+
+def test_ttl_cache_evicts_least_recently_used_beyond_byte_budget():
+    entry_size = _sizeof(_value(0))
+    cache = TTLCache(max_bytes=entry_size * 3, ttl=60)
+
+    for i in range(3):
+        cache.set(i, _value(i))
+    cache.get(0)  # 0 devient le plus récemment utilisé
+    cache.set(3, _value(3))
+
+    assert cache.get(1) == (False, None)
+    assert cache.get(0) == (True, _value(0))
+    assert cache.get(3) == (True, _value(3))
+    assert cache.evictions == 1
+    assert cache.current_bytes <= cache.max_bytes
+
+
+def test_ttl_cache_rejects_entry_larger_than_budget():
+    cache = TTLCache(max_bytes=64, ttl=60)
+    cache.set("big", list(range(100)))
+
+    assert cache.get("big") == (False, None)
+    assert cache.rejected == 1
+    assert cache.current_bytes == 0
+
+
+def test_ttl_cache_expiration_and_targeted_invalidation():
+    cache = TTLCache(max_bytes=1024 * 1024, ttl=60)
+    cache.set("short", 1, ttl=0.01)
+    cache.set("pop-2020", 2, dataset="populations", year=2020)
+    cache.set("pop-2021", 3, dataset="populations", year=2021)
+    cache.set("pop-latest", 4, dataset="populations")
+    cache.set("births", 5, dataset="births")
+    time.sleep(0.02)
+
+    assert cache.get("short") == (False, None)
+    assert cache.invalidate("populations", 2021) == 2
+    assert cache.get("pop-2020") == (True, 2)
+    assert cache.get("pop-latest") == (False, None)
+    assert cache.get("births") == (True, 5)
+
+
+def test_single_flight_coalesces_concurrent_threads():
+    flight = SingleFlight()
+    calls = []
+    release = threading.Event()
+
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        return {"total": 42}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("k", compute))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    while flight.stats()["coalesced"] < 4:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert results == [{"total": 42}] * 5
+    assert flight.stats() == {"leaders": 1, "coalesced": 4, "in_flight": 0}
+
+
+def test_single_flight_propagates_leader_error_to_followers():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def compute():
+        release.wait(5)
+        raise RuntimeError("base indisponible")
+
+    errors = []
+
+    def call():
+        try:
+            flight.do("k", compute)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=call) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    while flight.stats()["coalesced"] < 2:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert errors == ["base indisponible"] * 3
+    # La clé est libérée : l'appel suivant recalcule
+    assert flight.do("k", lambda: "ok") == "ok"
+
+
+def test_single_flight_async_coalesces_and_propagates_errors():
+    flight = SingleFlight()
+    calls = []
+
+    async def compute(fail):
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        if fail:
+            raise RuntimeError("base indisponible")
+        return "ok"
+
+    async def main():
+        results = await asyncio.gather(*(flight.do_async("ok", compute, False) for _ in range(4)))
+        failures = await asyncio.gather(
+            *(flight.do_async("ko", compute, True) for _ in range(3)), return_exceptions=True
+        )
+        return results, failures
+
+    results, failures = asyncio.run(main())
+
+    assert results == ["ok"] * 4
+    assert all(isinstance(error, RuntimeError) for error in failures)
+    assert len(calls) == 2
+
+
+def test_single_flight_async_survives_leader_cancellation():
+    flight = SingleFlight()
+
+    async def compute():
+        await asyncio.sleep(0.02)
+        return "ok"
+
+    async def main():
+        leader = asyncio.ensure_future(flight.do_async("k", compute))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do_async("k", compute))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(main()) == "ok"
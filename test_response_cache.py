@@ -0,0 +1,124 @@
+"""
+Tests du cache des réponses à deux niveaux (app/response_cache.py) :
+L1 en mémoire (shared_cache), L2 Redis (fakeredis), invalidation par
+version des jeux de données et refus des réponses en échec.
+"""
+import pytest
+from starlette.requests import Request
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from app import response_cache as response_cache_module
+from app.cache import shared_cache
+from app.datasets import dataset_watcher
+from app.request_status import mark_failed, track
+from app.response_cache import ResponseCache, cached_response
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = ResponseCache(client=fakeredis.FakeRedis())
+    monkeypatch.setattr(response_cache_module, "response_cache", cache)
+    monkeypatch.setattr(dataset_watcher, "_versions", {("births", "2021"): ("1", None)})
+    return cache
+
+
+def _request(path="/births/commune/01001", query=b""):
+    return Request({"type": "http", "method": "GET", "path": path, "query_string": query, "headers": []})
+
+
+def test_l1_hit_then_l2_hit_after_local_eviction(cache):
+    key = cache.make_key("/births/commune/01001", [], ("births",))
+    cache.set(key, {"births": 12}, dataset="births")
+
+    assert cache.get(key, "births") == (True, {"births": 12})
+    assert cache.l1_hits == 1
+
+    shared_cache.clear()
+    assert cache.get(key, "births") == (True, {"births": 12})
+    assert cache.l2_hits == 1
+    # La valeur lue en L2 remonte en L1
+    assert cache.get(key, "births") == (True, {"births": 12})
+    assert cache.l1_hits == 2
+
+
+def test_dataset_version_change_invalidates_key(cache, monkeypatch):
+    key = cache.make_key("/births/commune/01001", [], ("births",))
+    cache.set(key, {"births": 12}, dataset="births")
+
+    monkeypatch.setattr(dataset_watcher, "_versions", {("births", "2021"): ("2", None)})
+    new_key = cache.make_key("/births/commune/01001", [], ("births",))
+
+    assert new_key != key
+    assert cache.get(new_key, "births") == (False, None)
+
+
+def test_redis_errors_fall_back_to_memory(cache):
+    class BrokenRedis:
+        def get(self, key):
+            raise ConnectionError("redis down")
+
+        def set(self, key, value, ex=None):
+            raise ConnectionError("redis down")
+
+    broken = ResponseCache(client=BrokenRedis(), retry_interval=60)
+    broken.set("k", {"v": 1})
+
+    assert broken.get("k") == (True, {"v": 1})
+    assert broken.l2_errors == 1
+    assert broken.stats()["redis_available"] is False
+
+
+def test_cached_response_calls_endpoint_once_per_version(cache, monkeypatch):
+    calls = []
+
+    @cached_response("births")
+    def endpoint(request):
+        calls.append(1)
+        return {"births": len(calls)}
+
+    assert endpoint(request=_request()) == {"births": 1}
+    assert endpoint(request=_request()) == {"births": 1}
+    assert endpoint(request=_request(query=b"year=2020")) == {"births": 2}
+
+    monkeypatch.setattr(dataset_watcher, "_versions", {("births", "2021"): ("2", None)})
+    assert endpoint(request=_request()) == {"births": 3}
+    assert len(calls) == 3
+
+
+def test_cached_response_does_not_store_failed_results(cache):
+    calls = []
+
+    @cached_response("births")
+    def endpoint(request):
+        calls.append(1)
+        if len(calls) == 1:
+            mark_failed()
+            return {"births": 0}
+        if len(calls) == 2:
+            return {"error": "Commune non trouvée"}
+        return {"births": 12}
+
+    with track() as status:
+        assert endpoint(request=_request()) == {"births": 0}
+    assert status.failed
+    assert endpoint(request=_request()) == {"error": "Commune non trouvée"}
+    assert endpoint(request=_request()) == {"births": 12}
+    assert endpoint(request=_request()) == {"births": 12}
+    assert len(calls) == 3
+
+
+def test_cached_response_does_not_store_exceptions(cache):
+    calls = []
+
+    @cached_response("births")
+    def endpoint(request):
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("base indisponible")
+        return {"births": 12}
+
+    with pytest.raises(RuntimeError):
+        endpoint(request=_request())
+    assert endpoint(request=_request()) == {"births": 12}
+    assert len(calls) == 2